@@ -0,0 +1,99 @@
+from .cases import suite
+from .run import compare, run
+from argparse import ArgumentParser
+from json import dump, load
+import sys
+
+parser = ArgumentParser(
+    prog="python -m benchmarks",
+    description="Benchmarks parsing and rendering generated templates.",
+)
+parser.add_argument("--suite", choices=["quick", "full"], default="quick")
+parser.add_argument("--match", default="", help="only run cases containing this")
+parser.add_argument("--repeats", type=int, default=5)
+parser.add_argument("--output", help="file to write results to as JSON")
+parser.add_argument("--baseline", help="JSON results to compare against")
+parser.add_argument(
+    "--threshold", type=float, default=0.1, help="allowed slowdown, as a fraction"
+)
+parser.add_argument(
+    "--memory-threshold",
+    type=float,
+    default=0.1,
+    help="allowed memory increase, as a fraction",
+)
+parser.add_argument(
+    "--no-isolate",
+    action="store_true",
+    help="run cases in this process, so peak RSS is cumulative",
+)
+parser.add_argument(
+    "--documents",
+    type=int,
+    default=5000,
+    help="documents to measure parse throughput over, 0 to skip",
+)
+parser.add_argument(
+    "--compositor",
+    choices=["pillow", "numpy"],
+    default="pillow",
+    help="compositor to render with",
+)
+parser.add_argument("--list", action="store_true", help="list cases and exit")
+arguments = parser.parse_args()
+
+cases = [case for case in suite(arguments.suite) if arguments.match in case.name]
+
+if arguments.list:
+    print("\n".join(case.name for case in cases))
+    sys.exit()
+
+
+def report(name: str, results: dict) -> None:
+    if name == "throughput":
+        print(
+            f"{'parse throughput':<48} {results['parse_per_second']:.0f} documents/s  "
+            f"lazily {results['lazy_per_second']:.0f} documents/s"
+        )
+        return
+
+    rss = results["peak_rss"]
+    print(
+        f"{name:<48} parse {results['parse']['median'] * 1000:9.2f}ms  "
+        f"render {results['render']['median'] * 1000:9.2f}ms  "
+        f"rss {'-' if rss is None else f'{rss / 2 ** 20:.0f}MiB':>7}  "
+        f"python peak {results['python_peak'] / 2 ** 20:.1f}MiB"
+    )
+
+
+results = run(
+    cases,
+    repeats=arguments.repeats,
+    isolate=not arguments.no_isolate,
+    report=report,
+    documents=arguments.documents,
+    compositor=arguments.compositor,
+)
+
+if arguments.output:
+    with open(arguments.output, "w", encoding="utf-8") as of:
+        dump(results, of, indent=2)
+
+if arguments.baseline:
+    with open(arguments.baseline, "r", encoding="utf-8") as bf:
+        baseline = load(bf)
+
+    regressions = compare(
+        results,
+        baseline,
+        threshold=arguments.threshold,
+        memory_threshold=arguments.memory_threshold,
+    )
+
+    for name, metric, expected, value in regressions:
+        print(f"Regression: {name} {metric} {expected:.6g} -> {value:.6g}")
+
+    if regressions:
+        sys.exit(1)
+
+    print("No regressions against the baseline.")
@@ -0,0 +1,166 @@
+from collections import namedtuple
+from math import sqrt
+from os import path as os_path
+from PIL import Image
+from random import Random
+
+# Canvas sizes benchmarks are run at
+CANVASES = {
+    "1080p": (1920, 1080),
+    "4k": (3840, 2160),
+    "8k": (7680, 4320),
+}
+
+# canvas: name of a canvas in CANVASES, or (width, height)
+# areas: number of areas, half of them text and half images
+# words: words of text in each text area
+# fit: whether text areas are fitted to their textboxes
+# rotation: rotation of every area
+# blur: filter applied to every image area, or None
+# beneath: fraction of areas placed beneath the image
+Case = namedtuple(
+    "Case", ["name", "canvas", "areas", "words", "fit", "rotation", "blur", "beneath"]
+)
+
+DEFAULTS = {
+    "canvas": "1080p",
+    "areas": 8,
+    "words": 12,
+    "fit": False,
+    "rotation": 0,
+    "blur": None,
+    "beneath": 0.0,
+}
+
+# Values each axis is varied to, one axis at a time, in each suite
+_variations = {
+    "quick": {
+        "canvas": ["4k"],
+        "areas": [32],
+        "words": [96],
+        "fit": [True],
+        "rotation": [30],
+        "blur": ["gaussian_blur"],
+        "beneath": [0.5],
+    },
+    "full": {
+        "canvas": ["4k", "8k"],
+        "areas": [2, 32, 128],
+        "words": [1, 96, 400],
+        "fit": [True],
+        "rotation": [30, 90],
+        "blur": ["gaussian_blur", "box_blur"],
+        "beneath": [0.5, 1.0],
+    },
+}
+
+FONT = os_path.join(os_path.dirname(__file__), "..", "tests", "Manrope.ttf")
+
+_words = (
+    "Rap snitches, telling all their business. Sit in the court and be their own "
+    "star witness. Do you have any idea what we're facing? Interesting images of "
+    "the catalogue, entry thumbnail and typography kerning AVAVA."
+).split()
+
+
+def case(**axes) -> Case:
+    # Returns the case with the given axes, and the defaults for all others
+    values = dict(DEFAULTS, **axes)
+    canvas = values["canvas"]
+
+    if not isinstance(canvas, str):
+        canvas = "x".join(str(side) for side in canvas)
+
+    name = (
+        f"{canvas}-a{values['areas']}-w{values['words']}"
+        f"-{'fit' if values['fit'] else 'nofit'}-r{values['rotation']}"
+        f"-{values['blur'] or 'noblur'}-b{int(values['beneath'] * 100)}"
+    )
+
+    return Case(name=name, **values)
+
+
+def suite(name: str) -> list:
+    # Returns the default case, followed by cases varying each axis from it
+    cases = [case()]
+
+    for axis, values in _variations[name].items():
+        cases.extend(case(**{axis: value}) for value in values)
+
+    return cases
+
+
+def canvas_size(case: Case) -> tuple:
+    if isinstance(case.canvas, str):
+        return CANVASES[case.canvas]
+
+    return tuple(case.canvas)
+
+
+def _image(size: tuple, seed: int) -> Image.Image:
+    # A deterministic image with some detail, so that encoders and filters work
+    red = Image.linear_gradient("L").rotate(seed % 360).resize(size)
+    green = Image.radial_gradient("L").resize(size)
+    blue = Image.linear_gradient("L").rotate(90).resize(size)
+    return Image.merge("RGB", (red, green, blue))
+
+
+def _font_size(wh: list, words: int) -> int:
+    # A size the text roughly fills the textbox at without overflowing it, as text
+    # that overflows is cut off rather than laid out in full
+    return max(int(min(sqrt(wh[0] * wh[1] / (words * 8)), wh[0] / 7, wh[1] / 2)), 4)
+
+
+def build(case: Case, directory: str) -> tuple:
+    """Returns the base image and placements of a case.
+
+    Images of image areas are saved into directory (alternating between PNG and
+    JPEG), so that parsing them includes decoding as it would in use. The same
+    case always builds the same base image and placements.
+    """
+    rng = Random(case.name)
+    width, height = canvas_size(case)
+
+    base = _image((width, height), seed=0).convert("RGBA")
+    places = {}
+
+    for number in range(case.areas):
+        wh = [
+            rng.randint(max(width // 8, 1), max(width // 3, 1)),
+            rng.randint(max(height // 8, 1), max(height // 3, 1)),
+        ]
+        xy = [rng.randint(0, width - wh[0]), rng.randint(0, height - wh[1])]
+
+        area = {
+            "xy": xy,
+            "wh": wh,
+            "rotation": case.rotation,
+            "beneath": rng.random() < case.beneath,
+        }
+
+        if number % 2 == 0:
+            start = rng.randrange(len(_words))
+            text = [_words[(start + word) % len(_words)] for word in range(case.words)]
+
+            area.update(
+                type="text",
+                path=FONT,
+                text=" ".join(text),
+                font_size=_font_size(wh, case.words),
+                font_variant="Bold",
+                fit=case.fit,
+            )
+
+        else:
+            extension = "png" if number % 4 == 1 else "jpg"
+            image_path = os_path.join(directory, f"area{number}.{extension}")
+            _image(tuple(wh), seed=number).save(image_path)
+
+            area.update(type="image", path=image_path)
+
+            if case.blur is not None:
+                area.update(filter=case.blur, filter_data=[max(width // 480, 1)])
+
+        places[f"area{number}"] = area
+
+    return base, places
@@ -0,0 +1,131 @@
+from .cases import build, case as default_case
+from argparse import ArgumentParser
+from asyncio import gather, new_event_loop, sleep
+from PIL import Image
+from src.PrintingPress import AsyncRenderer, Template
+from src.PrintingPress.encoding import encode
+from src.PrintingPress.metrics import Summary, _percentile
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+
+def _summary(durations: list) -> Summary:
+    durations = sorted(durations)
+
+    return Summary(
+        count=len(durations),
+        mean=sum(durations) / len(durations),
+        p50=_percentile(durations, 50),
+        p90=_percentile(durations, 90),
+        p99=_percentile(durations, 99),
+        max=durations[-1],
+    )
+
+
+async def _lag(interval: float, lags: list) -> None:
+    # Records how late the event loop wakes from each sleep of interval
+    while True:
+        expected = perf_counter() + interval
+        await sleep(interval)
+        lags.append(perf_counter() - expected)
+
+
+def measure_loop(
+    template: Template,
+    image: Image.Image,
+    renders: int = 32,
+    concurrency: int = 4,
+    backend: str = "thread",
+    interval: float = 0.005,
+) -> dict:
+    """Measures event loop lag while rendering a template concurrently.
+
+    renders jobs are rendered concurrently with an AsyncRenderer running
+    concurrency at once with backend or, if backend is "blocking", one at a time by
+    calling Template.render in the event loop. Lag is how late a task sleeping
+    interval at a time wakes each time.
+    """
+    loop = new_event_loop()
+    lags = []
+
+    jobs = [
+        {area_name: {"text": f"Job {number}"}}
+        for number in range(renders)
+        for area_name in [next(iter(template.resolve()))]
+    ]
+
+    async def main() -> float:
+        watcher = loop.create_task(_lag(interval, lags))
+        await sleep(interval * 2)
+
+        # Processes are started (and parse the template) before timing
+        start = perf_counter()
+
+        if backend == "blocking":
+            for overrides in jobs:
+                encode(template.render(image, overrides, suppress=True))
+                await sleep(0)
+
+            elapsed = perf_counter() - start
+        else:
+            renderer = AsyncRenderer(
+                template, image, limit=concurrency, backend=backend
+            )
+            await gather(*(renderer.render(overrides) for overrides in jobs))
+            elapsed = perf_counter() - start
+            renderer.close()
+
+        watcher.cancel()
+        return elapsed
+
+    try:
+        elapsed = loop.run_until_complete(main())
+    finally:
+        loop.close()
+
+    return {
+        "renders_per_second": renders / elapsed,
+        "lag": _summary(lags)._asdict(),
+    }
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(
+        prog="python -m benchmarks.loop",
+        description=(
+            "Measures event loop lag while rendering the default benchmark case "
+            "concurrently, blocking the loop and through AsyncRenderer."
+        ),
+    )
+    parser.add_argument("--renders", type=int, default=32)
+    parser.add_argument(
+        "--concurrency", type=int, nargs="+", default=[1, 4, 16]
+    )
+    arguments = parser.parse_args()
+
+    with TemporaryDirectory() as directory:
+        image, places = build(default_case(), directory)
+        template = Template(places)
+
+        runs = [("blocking", 1)] + [
+            (backend, concurrency)
+            for backend in ["thread", "process"]
+            for concurrency in arguments.concurrency
+        ]
+
+        for backend, concurrency in runs:
+            name = backend if backend == "blocking" else f"{backend} x{concurrency}"
+            results = measure_loop(
+                template,
+                image,
+                renders=arguments.renders,
+                concurrency=concurrency,
+                backend=backend,
+            )
+            lag = results["lag"]
+
+            print(
+                f"{name:<14} {results['renders_per_second']:7.1f} renders/s  "
+                f"lag p50 {lag['p50'] * 1000:7.2f}ms  p99 {lag['p99'] * 1000:7.2f}ms  "
+                f"max {lag['max'] * 1000:7.2f}ms"
+            )
@@ -0,0 +1,238 @@
+from .cases import Case, build, canvas_size, case as default_case
+from multiprocessing import get_context
+from platform import platform, python_version
+from PIL import Image, __version__ as pillow_version
+from src.PrintingPress import Placements, operate
+from src.PrintingPress import assets, fit, fonts, layout
+from statistics import median
+from sys import platform as sys_platform
+from tempfile import TemporaryDirectory
+from time import perf_counter
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Metrics compared against a baseline, and whether each is a duration
+COMPARED = {
+    "parse": True,
+    "parse_lazy": True,
+    "render": True,
+    "peak_rss": False,
+    "python_peak": False,
+}
+
+
+def peak_rss() -> int:
+    # Returns the peak resident set size of this process in bytes, or None
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys_platform == "darwin" else peak * 1024
+
+
+def clear_caches() -> None:
+    # Empties the process-wide caches, so the next parse and render start cold
+    fonts.clear_cache()
+    assets.clear_cache()
+    layout.masks.clear()
+    fit.clear_cache()
+
+
+def _durations(durations: list) -> dict:
+    return {
+        "first": durations[0],
+        "median": median(durations),
+        "min": min(durations),
+    }
+
+
+def measure(case: Case, repeats: int = 5, compositor: str = "pillow") -> dict:
+    """Measures a case in this process, returning its results.
+
+    Parsing (lazily and not) and rendering are timed separately, repeats times
+    each, with the first parse being cold. Allocations are then measured over one
+    more parse and render with the caches cleared, as tracing them slows both
+    down, and with warm caches they would only count what is not cached. Areas
+    are composited with compositor (see operate).
+    """
+    with TemporaryDirectory() as directory:
+        image, places = build(case, directory)
+
+        parse, parse_lazy, render = [], [], []
+
+        for _ in range(repeats):
+            start = perf_counter()
+            Placements.parse(places, lazy=True)
+            parse_lazy.append(perf_counter() - start)
+
+            start = perf_counter()
+            parsed = Placements.parse(places)
+            parse.append(perf_counter() - start)
+
+            start = perf_counter()
+            operate(
+                image=image, placements=parsed, suppress=True, compositor=compositor
+            )
+            render.append(perf_counter() - start)
+
+        # Pillow counts the images it allocates, in versions that have stats
+        counted = hasattr(Image.core, "get_stats")
+
+        if counted:
+            Image.core.reset_stats()
+
+        clear_caches()
+        tracemalloc.start()
+        operate(
+            image=image,
+            placements=Placements.parse(places),
+            suppress=True,
+            compositor=compositor,
+        )
+        _, python_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        images = Image.core.get_stats()["new_count"] if counted else None
+
+    return {
+        "case": case._asdict(),
+        "pixels": canvas_size(case)[0] * canvas_size(case)[1],
+        "parse": _durations(parse),
+        "parse_lazy": _durations(parse_lazy),
+        "render": _durations(render),
+        "peak_rss": peak_rss(),
+        "python_peak": python_peak,
+        "images_allocated": images,
+    }
+
+
+def throughput(documents: int = 5000) -> dict:
+    """Measures how many documents per second are parsed, lazily and not.
+
+    Documents are the placements of the default case, each with different text.
+    Parsing them lazily only validates them, as when importing documents in bulk.
+    """
+    with TemporaryDirectory() as directory:
+        _, places = build(default_case(), directory)
+
+        batch = [
+            {
+                area_name: dict(area_data, text=f"Document {number}")
+                if area_data["type"] == "text"
+                else dict(area_data)
+                for area_name, area_data in places.items()
+            }
+            for number in range(documents)
+        ]
+
+        results = {"documents": documents}
+
+        for name, lazy in [("parse_per_second", False), ("lazy_per_second", True)]:
+            Placements.parse(batch[0], lazy=lazy)  # Loads fonts and images once
+            start = perf_counter()
+
+            for document in batch:
+                Placements.parse(document, lazy=lazy)
+
+            results[name] = documents / (perf_counter() - start)
+
+    return results
+
+
+def run(
+    cases: list,
+    repeats: int = 5,
+    isolate: bool = True,
+    report=None,
+    documents: int = 0,
+    compositor: str = "pillow",
+) -> dict:
+    # Measures each case, each in a fresh process if isolate (so that peak RSS is
+    # the case's own), calling report with each case's name and results. Parse
+    # throughput is measured over documents documents, if any.
+    results = {}
+
+    for case in cases:
+        if isolate:
+            with get_context("spawn").Pool(1) as pool:
+                results[case.name] = pool.apply(measure, (case, repeats, compositor))
+        else:
+            results[case.name] = measure(case, repeats, compositor)
+
+        if report is not None:
+            report(case.name, results[case.name])
+
+    measured = {
+        "meta": {
+            "python": python_version(),
+            "pillow": pillow_version,
+            "platform": platform(),
+            "repeats": repeats,
+            "isolated": isolate,
+            "compositor": compositor,
+        },
+        "cases": results,
+    }
+
+    if documents:
+        measured["throughput"] = throughput(documents)
+
+        if report is not None:
+            report("throughput", measured["throughput"])
+
+    return measured
+
+
+def _value(results: dict, metric: str):
+    value = results[metric]
+    return value["median"] if COMPARED[metric] else value
+
+
+def compare(
+    results: dict,
+    baseline: dict,
+    threshold: float = 0.1,
+    memory_threshold: float = 0.1,
+) -> list:
+    """Returns the regressions of results against a baseline.
+
+    Cases are compared by name, and cases missing from either are skipped. Median
+    durations regress if they exceed the baseline's by more than threshold (as a
+    fraction), and memory if it exceeds the baseline's by more than
+    memory_threshold. Throughput regresses if it falls short of the baseline's
+    by more than threshold. Each regression is (case, metric, baseline, result),
+    with throughput under the case name "throughput".
+    """
+    regressions = []
+
+    if "throughput" in results and "throughput" in baseline:
+        for metric in ["parse_per_second", "lazy_per_second"]:
+            value = results["throughput"][metric]
+            expected = baseline["throughput"][metric]
+
+            if value < expected * (1 - threshold):
+                regressions.append(("throughput", metric, expected, value))
+
+    for name, case_results in results["cases"].items():
+        case_baseline = baseline["cases"].get(name)
+
+        if case_baseline is None:
+            continue
+
+        for metric, duration in COMPARED.items():
+            value = _value(case_results, metric)
+            expected = _value(case_baseline, metric)
+
+            if value is None or expected is None:
+                continue
+
+            allowed = threshold if duration else memory_threshold
+
+            if value > expected * (1 + allowed):
+                regressions.append((name, metric, expected, value))
+
+    return regressions
@@ -0,0 +1,193 @@
+from .cases import build, case as default_case
+from .loop import _summary
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from json import dump
+from os import path as os_path
+from signal import SIGINT
+from src.PrintingPress.server import RenderClient
+from subprocess import PIPE, Popen, run
+from tempfile import TemporaryDirectory
+from threading import Event, Thread
+from time import perf_counter, sleep
+import sys
+
+# Renders the case once in a new interpreter, as a consumer running operate
+# in-process would, paying for imports, parsing and decoding each time
+_cold = """
+from src.PrintingPress import Placements, operate
+from PIL import Image
+from json import load
+import sys
+
+with open(sys.argv[1], "r", encoding="utf-8") as pf:
+    placements = Placements.parse(load(pf))
+
+operate(Image.open(sys.argv[2]), placements, suppress=True, format="PNG", preset="fast")
+"""
+
+
+def measure_cold(placements_path: str, image_path: str, runs: int = 3) -> float:
+    # Returns the median seconds of rendering in a new interpreter
+    durations = []
+
+    for _ in range(runs):
+        started = perf_counter()
+        run([sys.executable, "-c", _cold, placements_path, image_path], check=True)
+        durations.append(perf_counter() - started)
+
+    return sorted(durations)[len(durations) // 2]
+
+
+def measure_server(
+    client: RenderClient,
+    name: str,
+    area_name: str,
+    requests: int = 256,
+    concurrency: int = 16,
+    distinct: int = None,
+) -> dict:
+    """Measures the latency of rendering through a render server under load.
+
+    requests renders of the template name are made by concurrency threads, each
+    overriding the text of area_name, with distinct different texts (all different
+    by default), so repeated texts in flight at once may be coalesced. The queue
+    depth is sampled from the metrics endpoint throughout.
+    """
+    distinct = distinct or requests
+    before = client.metrics()["counts"]
+    depths = []
+    done = Event()
+
+    def sample() -> None:
+        sampler = RenderClient(client.address)
+
+        while not done.is_set():
+            depths.append(sampler.metrics()["queue_depth"])
+            sleep(0.01)
+
+        sampler.close()
+
+    def request(number: int) -> float:
+        started = perf_counter()
+        client.render(
+            name,
+            {area_name: {"text": f"Request {number % distinct}"}},
+            preset="fast",
+        )
+        return perf_counter() - started
+
+    sampler = Thread(target=sample)
+    sampler.start()
+    started = perf_counter()
+
+    with ThreadPoolExecutor(concurrency) as executor:
+        latencies = list(executor.map(request, range(requests)))
+
+    elapsed = perf_counter() - started
+    done.set()
+    sampler.join()
+
+    after = client.metrics()["counts"]
+
+    return {
+        "requests_per_second": requests / elapsed,
+        "latency": _summary(latencies)._asdict(),
+        "renders": after["renders"] - before["renders"],
+        "coalesced": after["coalesced"] - before["coalesced"],
+        "max_queue_depth": max(depths, default=0),
+    }
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(
+        prog="python -m benchmarks.server",
+        description=(
+            "Starts a render server on a Unix socket, and measures the latency of "
+            "rendering the default benchmark case through it under concurrent load, "
+            "against rendering it in a new interpreter each time."
+        ),
+    )
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument(
+        "--distinct",
+        type=int,
+        default=8,
+        help="different overrides among the requests of the coalescing runs",
+    )
+    parser.add_argument("--workers", type=int, help="threads the server renders with")
+    arguments = parser.parse_args()
+
+    with TemporaryDirectory() as directory:
+        image, places = build(default_case(), directory)
+        image_path = os_path.join(directory, "base.png")
+        placements_path = os_path.join(directory, "placements.json")
+        socket_path = os_path.join(directory, "server.sock")
+
+        image.save(image_path)
+
+        with open(placements_path, "w", encoding="utf-8") as pf:
+            dump(places, pf)
+
+        command = [
+            sys.executable,
+            "-m",
+            "src.PrintingPress.server",
+            "--socket",
+            socket_path,
+            "--template",
+            "case",
+            placements_path,
+            image_path,
+        ]
+
+        if arguments.workers is not None:
+            command += ["--workers", str(arguments.workers)]
+
+        server = Popen(command, stderr=PIPE)
+        client = RenderClient(socket_path)
+
+        try:
+            server.stderr.readline()  # Serving once registered
+            area_name = next(iter(places))
+
+            cold = measure_cold(placements_path, image_path)
+            print(f"{'cold process':<22} {cold * 1000:9.2f}ms")
+
+            # Each concurrency with every request different, then with requests
+            # repeating distinct overrides, which may be coalesced
+            repeated = arguments.distinct
+            runs = [
+                (f"unique x{concurrency}", concurrency, None)
+                for concurrency in arguments.concurrency
+            ] + [
+                (f"{repeated} distinct x{concurrency}", concurrency, repeated)
+                for concurrency in arguments.concurrency
+                if concurrency > 1
+            ]
+
+            for label, concurrency, distinct in runs:
+                results = measure_server(
+                    client,
+                    "case",
+                    area_name,
+                    requests=arguments.requests,
+                    concurrency=concurrency,
+                    distinct=distinct,
+                )
+                latency = results["latency"]
+
+                print(
+                    f"{label:<22} {results['requests_per_second']:7.1f} requests/s  "
+                    f"p50 {latency['p50'] * 1000:8.2f}ms  "
+                    f"p99 {latency['p99'] * 1000:8.2f}ms  "
+                    f"renders {results['renders']:4d}  "
+                    f"coalesced {results['coalesced']:4d}  "
+                    f"queue <= {results['max_queue_depth']}"
+                )
+
+        finally:
+            client.close()
+            server.send_signal(SIGINT)  # Closes the server, removing its socket
+            server.wait()
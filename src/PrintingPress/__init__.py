@@ -1,3 +1,18 @@
+__version__ = "1.2.1"
+
 from .placements import Placements  # noqa: F401
 from .printingpress import operate  # noqa: F401
 from . import exceptions  # noqa: F401
+from . import fonts  # noqa: F401
+from . import assets  # noqa: F401
+from . import metrics  # noqa: F401
+from . import fit  # noqa: F401
+from . import tiled  # noqa: F401
+from .template import Template  # noqa: F401
+from .batch import render_batch  # noqa: F401
+from .incremental import IncrementalRenderer  # noqa: F401
+from . import renders  # noqa: F401
+from .asynchronous import AsyncRenderer, render_async  # noqa: F401
+from . import encoding  # noqa: F401
+from . import animation  # noqa: F401
+from . import multiscale  # noqa: F401
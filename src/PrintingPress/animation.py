@@ -0,0 +1,330 @@
+from . import compositing as Compositing, internals as Internals
+from .incremental import IncrementalRenderer
+from .tiled import _chunk
+from collections import OrderedDict
+from PIL import Image
+from struct import pack
+from zlib import compressobj
+
+
+def _interpolate(start, end, t: float):
+    # Numbers (and lists of them) are interpolated linearly, staying integers if
+    # both ends are. Anything else is held until the next keyframe.
+    if isinstance(start, bool) or isinstance(end, bool):
+        return start
+
+    if isinstance(start, (int, float)) and isinstance(end, (int, float)):
+        value = start + (end - start) * t
+        return round(value) if isinstance(start + end, int) else value
+
+    if (
+        isinstance(start, list)
+        and isinstance(end, list)
+        and len(start) == len(end)
+    ):
+        return [_interpolate(first, last, t) for first, last in zip(start, end)]
+
+    return start
+
+
+def _copy(value):
+    if isinstance(value, list):
+        return [_copy(elem) for elem in value]
+
+    return value
+
+
+def _freeze(value):
+    if isinstance(value, list):
+        return tuple(_freeze(elem) for elem in value)
+
+    return value
+
+
+def check_keyframes(places: dict, keyframes: dict) -> dict:
+    """Returns keyframes with each area's sorted by frame, checking their shape.
+
+    keyframes maps area names to lists of keyframes, each a dictionary of the
+    keys of the area at the frame given by its "frame" key.
+    """
+    checked = {}
+
+    for area_name, frames in keyframes.items():
+        if area_name == ".meta" or area_name not in places:
+            raise KeyError(f"area {area_name} is not in the placements")
+
+        if not isinstance(frames, list) or not frames:
+            raise TypeError(
+                f"keyframes of area {area_name} is type {type(frames)}, but expected "
+                "a non-empty list"
+            )
+
+        for keyframe in frames:
+            if not isinstance(keyframe, dict) or not isinstance(
+                keyframe.get("frame"), int
+            ):
+                raise TypeError(
+                    f"keyframe {keyframe!r} of area {area_name} is not a dict with "
+                    "an int frame"
+                )
+
+        checked[area_name] = sorted(frames, key=lambda keyframe: keyframe["frame"])
+
+    return checked
+
+
+def values_at(keyframes: list, frame: int) -> dict:
+    # Returns the keys of an area at a frame, from its sorted keyframes
+    values = {}
+    keys = {key for keyframe in keyframes for key in keyframe if key != "frame"}
+
+    for key in keys:
+        points = [
+            (keyframe["frame"], keyframe[key])
+            for keyframe in keyframes
+            if key in keyframe
+        ]
+        value = points[-1][1]
+
+        if frame <= points[0][0]:
+            value = points[0][1]
+        else:
+            for (first, start), (last, end) in zip(points, points[1:]):
+                if frame < last:
+                    value = _interpolate(start, end, (frame - first) / (last - first))
+                    break
+
+        values[key] = _copy(value)
+
+    return values
+
+
+class _Sequence(IncrementalRenderer):
+    # An incremental renderer keeping the layers of animated areas by the values
+    # they were rendered with, within maxbytes of pixels
+
+    def __init__(self, image, places, keys: dict, maxbytes: int, **options):
+        self._keys = keys
+        self._rasters = OrderedDict()
+        self._maxbytes = maxbytes
+        self._currbytes = 0
+
+        super().__init__(image, places, **options)
+
+    def _render_layer(self, area_name: str, suppress: bool, hook) -> None:
+        key = self._keys.get(area_name)
+        layer = self._rasters.get(key)
+
+        if layer is None:
+            super()._render_layer(area_name, suppress=suppress, hook=hook)
+
+            if key is not None:
+                self._put(key, self._layers[area_name])
+
+            return
+
+        self._rasters.move_to_end(key)
+        self._layers[area_name] = layer
+        self._boxes[area_name] = Compositing.clip_box(
+            self._base.size, layer.size, tuple(self._parsed[area_name].xy)
+        )
+
+    def _put(self, key: tuple, layer: Image.Image) -> None:
+        size = layer.width * layer.height * len(layer.getbands())
+
+        if size > self._maxbytes:
+            return
+
+        self._rasters[key] = layer
+        self._currbytes += size
+
+        while self._currbytes > self._maxbytes:
+            _, evicted = self._rasters.popitem(last=False)
+            self._currbytes -= evicted.width * evicted.height * len(evicted.getbands())
+
+
+def render_frames(
+    image: Image.Image,
+    places: dict,
+    keyframes: dict,
+    frames: int,
+    lazy: bool = False,
+    maxbytes: int = 64 * 2 ** 20,
+    suppress: bool = False,
+    hook=None,
+):
+    """Renders frames of placements animated by keyframes, yielding (frame, boxes).
+
+    keyframes maps area names to lists of keyframes, each a dictionary of keys of
+    the area (as taken by IncrementalRenderer.update) at the frame given by its
+    "frame" key. Keys are interpolated linearly between the keyframes holding
+    them, and held before the first and after the last. Numbers and lists of them
+    are interpolated, and other values are held until the next keyframe.
+
+    Frames are rendered from the one before by an IncrementalRenderer, so only
+    areas that change are rendered again, only where they cover composited
+    again, and areas that only move are not rendered at all. Layers of animated
+    areas are also kept by the values they were rendered with (within maxbytes),
+    so values repeated later, such as in loops, are not rendered again. boxes are
+    the (left, top, right, bottom) boxes changed since the previous frame, being
+    the whole image for the first. frame is changed in place by the next frame, so
+    copy it to keep it.
+    """
+    if frames < 1:
+        raise ValueError("frames has to be at least 1")
+
+    keyframes = check_keyframes(places, keyframes)
+
+    # Keys of each animated area at the previous frame, and the key its layer is
+    # kept by at the current one
+    previous = {}
+    keys = {}
+    missing = object()
+
+    def updates(frame: int) -> dict:
+        changed = {}
+
+        for area_name, area_keyframes in keyframes.items():
+            values = values_at(area_keyframes, frame)
+            update = {
+                key: value
+                for key, value in values.items()
+                if previous.get(area_name, {}).get(key, missing) != value
+            }
+
+            keys[area_name] = (area_name,) + tuple(
+                (key, _freeze(value))
+                for key, value in sorted(values.items())
+                if key != "xy"
+            )
+            previous[area_name] = values
+
+            if update:
+                changed[area_name] = update
+
+        return changed
+
+    first = Internals.copy_places(places)
+
+    for area_name, update in updates(0).items():
+        first[area_name] = dict(first[area_name], **update)
+
+    renderer = _Sequence(
+        image, first, keys, maxbytes, lazy=lazy, suppress=suppress, hook=hook
+    )
+
+    yield renderer.image, [(0, 0) + renderer.image.size]
+
+    for frame in range(1, frames):
+        yield renderer.image, renderer.update(
+            updates(frame), suppress=suppress, hook=hook
+        )
+
+
+def _frame_data(image: Image.Image, compress_level: int) -> bytes:
+    # Compresses the rows of an image, each preceded by its filter type, 0 being none
+    compressor = compressobj(compress_level)
+    pixels = memoryview(image.tobytes())
+    row = image.width * 4
+    data = []
+
+    for start in range(0, len(pixels), row):
+        data.append(compressor.compress(b"\x00"))
+        data.append(compressor.compress(pixels[start:start + row]))
+
+    data.append(compressor.flush())
+    return b"".join(data)
+
+
+def write_apng(
+    image: Image.Image,
+    places: dict,
+    keyframes: dict,
+    frames: int,
+    file,
+    duration: int = 40,
+    loop: int = 0,
+    compress_level: int = 6,
+    lazy: bool = False,
+    suppress: bool = False,
+    hook=None,
+) -> None:
+    """Renders frames of placements animated by keyframes into an animated PNG.
+
+    file is a path or a binary file object. Each frame is encoded once rendered,
+    and only the box changed since the previous frame is encoded, so only a frame
+    is held at once. duration is how long each frame is shown in milliseconds, and
+    loop is how many times the animation plays, 0 being forever. See render_frames.
+    """
+    if frames < 1:  # Checked before anything is written
+        raise ValueError("frames has to be at least 1")
+
+    if isinstance(file, (str, bytes)) or hasattr(file, "__fspath__"):
+        with open(file, "wb") as of:
+            return write_apng(
+                image,
+                places,
+                keyframes,
+                frames,
+                of,
+                duration,
+                loop,
+                compress_level,
+                lazy,
+                suppress,
+                hook,
+            )
+
+    width, height = image.size
+    sequence = 0
+
+    file.write(b"\x89PNG\r\n\x1a\n")
+    file.write(_chunk(b"IHDR", pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)))
+    file.write(_chunk(b"acTL", pack(">II", frames, loop)))
+
+    for number, (frame, boxes) in enumerate(
+        render_frames(
+            image,
+            places,
+            keyframes,
+            frames,
+            lazy=lazy,
+            suppress=suppress,
+            hook=hook,
+        )
+    ):
+        if boxes:
+            box = (
+                min(box[0] for box in boxes),
+                min(box[1] for box in boxes),
+                max(box[2] for box in boxes),
+                max(box[3] for box in boxes),
+            )
+        else:  # Frames have at least a pixel, which is unchanged here
+            box = (0, 0, 1, 1)
+
+        # Frames are drawn over the one before without disposing or blending it
+        control = pack(
+            ">IIIIIHHBB",
+            sequence,
+            box[2] - box[0],
+            box[3] - box[1],
+            box[0],
+            box[1],
+            duration,
+            1000,
+            0,
+            0,
+        )
+        file.write(_chunk(b"fcTL", control))
+        sequence += 1
+
+        data = _frame_data(frame.crop(box), compress_level)
+
+        if number == 0:
+            file.write(_chunk(b"IDAT", data))
+        else:
+            file.write(_chunk(b"fdAT", pack(">I", sequence) + data))
+            sequence += 1
+
+    file.write(_chunk(b"IEND", b""))
@@ -0,0 +1,153 @@
+from collections import OrderedDict, namedtuple
+from os import stat
+from PIL import Image
+from threading import RLock
+
+CacheInfo = namedtuple(
+    "CacheInfo",
+    [
+        "source_hits",
+        "source_misses",
+        "variant_hits",
+        "variant_misses",
+        "maxbytes",
+        "currbytes",
+        "currsize",
+    ],
+)
+
+
+def nbytes(image: Image.Image) -> int:
+    return image.width * image.height * len(image.getbands())
+
+
+class AssetCache:
+    """A memory-budgeted LRU cache of decoded images and variants derived from them.
+
+    Source images are keyed by (resolved path, modification time, file size), so
+    they are decoded again if their file changes. Variants are keyed by the key of
+    their source image followed by the transforms made to it. Both share a budget
+    of maxbytes of decoded pixels, and images larger than it are not cached.
+
+    Cached images are shared by every area using them, and must not be modified.
+    """
+
+    def __init__(self, maxbytes: int = 256 * 2 ** 20):
+        self.maxbytes = maxbytes
+        self.currbytes = 0
+
+        self.hits = {"source": 0, "variant": 0}
+        self.misses = {"source": 0, "variant": 0}
+
+        self._images = OrderedDict()
+        self._lock = RLock()
+
+    def open(self, path, draft: tuple = None) -> tuple:
+        # Returns the (key, image) of an image file, decoded to RGBA. If a draft
+        # size is given, JPEG images are downscaled while decoding to the smallest
+        # scale that is still at least that size.
+        status = stat(path)
+        key = ("source", str(path), status.st_mtime_ns, status.st_size, draft)
+
+        image = self._get(key)
+
+        if image is None:
+            image = Image.open(path)
+
+            if draft is not None and image.format == "JPEG":
+                image.draft(image.mode, draft)
+
+            image = image.convert("RGBA")
+            self.put(key, image)
+
+        return key, image
+
+    def variant(self, key: tuple) -> Image.Image:
+        # Returns the variant with the given key, or None if it is not cached
+        return self._get(("variant",) + key)
+
+    def put_variant(self, key: tuple, image: Image.Image) -> None:
+        self.put(("variant",) + key, image)
+
+    def _get(self, key: tuple) -> Image.Image:
+        with self._lock:
+            cached = self._images.get(key)
+
+            if cached is None:
+                self.misses[key[0]] += 1
+                return None
+
+            self._images.move_to_end(key)
+            self.hits[key[0]] += 1
+            return cached[0]
+
+    def put(self, key: tuple, image: Image.Image) -> None:
+        size = nbytes(image)
+
+        with self._lock:
+            if key in self._images:
+                self.currbytes -= self._images.pop(key)[1]
+
+            if size > self.maxbytes:
+                return
+
+            self._images[key] = (image, size)
+            self.currbytes += size
+
+            while self.currbytes > self.maxbytes:
+                _, (_, evicted) = self._images.popitem(last=False)
+                self.currbytes -= evicted
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(
+                source_hits=self.hits["source"],
+                source_misses=self.misses["source"],
+                variant_hits=self.hits["variant"],
+                variant_misses=self.misses["variant"],
+                maxbytes=self.maxbytes,
+                currbytes=self.currbytes,
+                currsize=len(self._images),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._images.clear()
+            self.currbytes = 0
+            self.hits = {"source": 0, "variant": 0}
+            self.misses = {"source": 0, "variant": 0}
+
+
+# Process-wide cache shared by Placements.parse and operate
+cache = AssetCache()
+
+
+class LazyImage:
+    """An image file that is decoded when first rendered, rather than when parsed.
+
+    Decoded images are kept in the asset cache rather than by the area, so memory
+    is only used for images that are rendered, and only within the cache's budget.
+    """
+
+    def __init__(self, path, draft: tuple = None):
+        self.path = path
+        self.draft = draft
+
+    def load(self) -> tuple:
+        # Returns the (key, image) of the decoded image
+        return cache.open(self.path, draft=self.draft)
+
+    def __repr__(self) -> str:
+        return f"LazyImage({str(self.path)!r})"
+
+
+def open_image(path, draft: tuple = None) -> tuple:
+    return cache.open(path, draft=draft)
+
+
+def cache_info() -> CacheInfo:
+    return cache.info()
+
+
+def clear_cache() -> None:
+    cache.clear()
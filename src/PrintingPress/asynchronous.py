@@ -0,0 +1,288 @@
+from .batch import _init_worker, _load, _worker
+from .encoding import encode
+from .exceptions import BusyError
+from .template import Template
+from . import metrics as Metrics
+from asyncio import CancelledError, Semaphore, get_event_loop, wrap_future
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from multiprocessing import Pool
+from os import cpu_count
+from PIL import Image
+from threading import Event, Lock
+import sys
+
+
+class _Cancelled(Exception):
+    # Raised from the hook of a render whose caller stopped waiting for it
+    pass
+
+
+def _cancellable(cancelled: Event, hook):
+    # Returns a hook stopping the render at its next stage once cancelled is set
+    def check(event: Metrics.Event) -> None:
+        if cancelled.is_set():
+            raise _Cancelled()
+
+        if hook is not None:
+            hook(event)
+
+    return check
+
+
+def _render(
+    template: Template,
+    image,
+    overrides: dict,
+    cancelled: Event,
+    format: str,
+    compositor: str,
+    hook,
+    params: dict,
+) -> bytes:
+    if callable(image):
+        image = image()
+
+    rendered = template.render(
+        image=image,
+        overrides=overrides,
+        suppress=True,
+        hook=_cancellable(cancelled, hook),
+        compositor=compositor,
+    )
+
+    if cancelled.is_set():
+        raise _Cancelled()
+
+    return encode(rendered, format=format, **params)
+
+
+def _render_process(overrides: dict, format: str, compositor: str, params: dict):
+    rendered = _worker["template"].render(
+        image=_worker["image"],
+        overrides=overrides,
+        suppress=True,
+        compositor=compositor,
+    )
+    return encode(rendered, format=format, **params)
+
+
+async def load_template(places: dict, executor=None, **options) -> Template:
+    """Makes a Template in executor, so loading fonts and images does not block.
+
+    executor defaults to the event loop's. options are passed to Template.
+    """
+    loop = get_event_loop()
+    return await loop.run_in_executor(executor, partial(Template, places, **options))
+
+
+async def render_async(
+    template: Template,
+    image,
+    overrides: dict = None,
+    executor=None,
+    format: str = "PNG",
+    compositor: str = "pillow",
+    hook=None,
+    **params,
+) -> bytes:
+    """Renders a template in a thread of executor, returning the encoded image.
+
+    image is a PIL Image or the path of one, opened in the thread. executor is a
+    concurrent.futures executor using threads (renders are not pickled), and
+    defaults to the event loop's. If the render is cancelled, it stops at the
+    next stage of rendering (see Metrics.Timer). Remaining keyword arguments (such
+    as preset and quality) are passed to Encoding.encode.
+    """
+    if not isinstance(image, Image.Image):
+        image = partial(_load, image)
+
+    cancelled = Event()
+    function = partial(
+        _render,
+        template,
+        image,
+        overrides,
+        cancelled,
+        format,
+        compositor,
+        hook,
+        params,
+    )
+
+    loop = get_event_loop()
+    future = loop.run_in_executor(executor, function)
+
+    try:
+        return await future
+    except CancelledError:
+        cancelled.set()
+        raise
+
+
+class AsyncRenderer:
+    """Renders a template from asyncio, limiting how many renders run at once.
+
+    At most limit renders run at once, and others wait in order. If max_waiting
+    renders are already waiting, render raises BusyError instead, so services can
+    turn requests away rather than queue them without bound. A render's place is
+    only given to another once its worker has stopped, so cancelled renders still
+    count until then.
+
+    With the thread backend, renders run in threads of executor (limit threads of
+    its own by default), and cancelled renders stop at their next stage of
+    rendering. Parts of rendering and encoding hold the GIL, so the event loop is
+    delayed by up to a stage of each render running. With the process backend,
+    renders run in limit worker processes, each parsing the template's placements
+    once (as with render_batch), which keeps the event loop responsive under load.
+    Cancelled renders stop waiting, but finish if already sent to a process, and
+    hooks are not supported.
+
+    image is a PIL Image or the path of one, opened by the first render's thread
+    or by each process. Renders are encoded as by render_async.
+    """
+
+    def __init__(
+        self,
+        template: Template,
+        image,
+        limit: int = None,
+        max_waiting: int = None,
+        backend: str = "thread",
+        executor=None,
+    ):
+        if backend not in ["process", "thread"]:
+            raise ValueError(
+                f'backend has to be "process" or "thread", not "{backend}"'
+            )
+
+        self.template = template
+        self.limit = limit or cpu_count() or 1
+        self.max_waiting = max_waiting
+        self.backend = backend
+
+        self._image = image
+        self._image_lock = Lock()
+
+        if backend == "process":
+            self._executor = Pool(
+                processes=self.limit,
+                initializer=_init_worker,
+                initargs=(
+                    template.places,
+                    template.flatten,
+                    template.variable,
+                    template.lazy,
+                    image,
+                    sys.stdout is sys.stderr,
+                ),
+            )
+        else:
+            self._owned = executor is None
+            self._executor = executor or ThreadPoolExecutor(max_workers=self.limit)
+
+        # Made by the first render, as semaphores are bound to the running loop in
+        # older versions of Python
+        self._semaphore = None
+        self.waiting = 0
+        self.running = 0
+
+    def _base(self) -> Image.Image:
+        # Opens the base image once, in whichever thread renders first
+        with self._image_lock:
+            if not isinstance(self._image, Image.Image):
+                self._image = _load(self._image)
+
+            return self._image
+
+    def _release(self, loop, future) -> None:
+        # Called by the render's worker once it has stopped
+        def release() -> None:
+            self.running -= 1
+            self._semaphore.release()
+
+        if not loop.is_closed():
+            loop.call_soon_threadsafe(release)
+
+    def _submit(self, overrides, cancelled, format, compositor, hook, params):
+        if self.backend == "thread":
+            return self._executor.submit(
+                _render,
+                self.template,
+                self._base,
+                overrides,
+                cancelled,
+                format,
+                compositor,
+                hook,
+                params,
+            )
+
+        if hook is not None:
+            raise ValueError("hooks are not supported by the process backend")
+
+        # Marked as running, so cancelling it waits for the process to finish
+        future = Future()
+        future.set_running_or_notify_cancel()
+
+        self._executor.apply_async(
+            _render_process,
+            (overrides, format, compositor, params),
+            callback=future.set_result,
+            error_callback=future.set_exception,
+        )
+
+        return future
+
+    async def render(
+        self,
+        overrides: dict = None,
+        format: str = "PNG",
+        compositor: str = "pillow",
+        hook=None,
+        **params,
+    ) -> bytes:
+        loop = get_event_loop()
+
+        if self._semaphore is None:
+            self._semaphore = Semaphore(self.limit)
+
+        if self._semaphore.locked():
+            if self.max_waiting is not None and self.waiting >= self.max_waiting:
+                raise BusyError(f"{self.waiting} renders are already waiting")
+
+        self.waiting += 1
+
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        cancelled = Event()
+        self.running += 1
+
+        try:
+            future = self._submit(
+                overrides, cancelled, format, compositor, hook, params
+            )
+        except BaseException:
+            self.running -= 1
+            self._semaphore.release()
+            raise
+
+        future.add_done_callback(partial(self._release, loop))
+
+        try:
+            return await wrap_future(future)
+        except CancelledError:
+            cancelled.set()
+            raise
+
+    def close(self) -> None:
+        # Waits for renders running to finish, then stops the renderer's workers
+        # (but not an executor given to it)
+        if self.backend == "process":
+            self._executor.close()
+            self._executor.join()
+        elif self._owned:
+            self._executor.shutdown(wait=True)
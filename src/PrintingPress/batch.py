@@ -0,0 +1,181 @@
+from .encoding import encode
+from .template import Template
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from multiprocessing import Pool
+from os import cpu_count
+from PIL import Image
+from time import perf_counter
+import sys
+
+# Template and base image of each worker process, set up once by _init_worker
+_worker = {}
+
+# output: encoded image, or None if the job raised an exception
+# render: seconds taken to render the job
+# encode: seconds taken to encode the job's image
+# error: message of the exception the job raised, or None
+Timed = namedtuple("Timed", ["output", "render", "encode", "error"])
+
+
+def _load(image) -> Image.Image:
+    if not isinstance(image, Image.Image):
+        image = Image.open(image)
+
+    # Loading is not thread-safe, so it is done before any rendering
+    image.load()
+    return image
+
+
+def _timed_job(
+    template: Template, image: Image.Image, overrides: dict, format: str, params: dict
+) -> Timed:
+    started = perf_counter()
+
+    try:
+        rendered = template.render(image=image, overrides=overrides, suppress=True)
+        encoding = perf_counter()
+        output = encode(rendered, format=format, **params)
+    except Exception as e:
+        return Timed(None, perf_counter() - started, 0.0, f"{type(e).__name__}: {e}")
+
+    finished = perf_counter()
+    return Timed(output, encoding - started, finished - encoding, None)
+
+
+def _render_jobs(
+    template: Template,
+    image: Image.Image,
+    jobs: list,
+    format: str,
+    params: dict,
+    timed: bool = False,
+) -> list:
+    if timed:
+        return [
+            _timed_job(template, image, overrides, format, params)
+            for overrides in jobs
+        ]
+
+    return [
+        encode(
+            template.render(image=image, overrides=overrides, suppress=True),
+            format=format,
+            **params,
+        )
+        for overrides in jobs
+    ]
+
+
+def _init_worker(
+    places: dict, flatten: bool, variable: frozenset, lazy: bool, image, stderr: bool
+) -> None:
+    # Parsing here loads fonts and images into the worker's caches once
+    if stderr:  # Warnings follow the caller's stdout, redirected to stderr
+        sys.stdout = sys.stderr
+
+    _worker["template"] = Template(
+        places, flatten=flatten, variable=variable, lazy=lazy
+    )
+    _worker["image"] = _load(image)
+
+
+def _render_chunk(jobs: list, format: str, params: dict, timed: bool) -> list:
+    return _render_jobs(
+        _worker["template"], _worker["image"], jobs, format, params, timed
+    )
+
+
+def _chunks(jobs, chunksize: int):
+    jobs = iter(jobs)
+
+    while True:
+        chunk = list(islice(jobs, chunksize))
+
+        if not chunk:
+            return
+
+        yield chunk
+
+
+def render_batch(
+    template,
+    jobs,
+    image,
+    workers: int = None,
+    chunksize: int = 1,
+    max_in_flight: int = None,
+    backend: str = "process",
+    format: str = "PNG",
+    timed: bool = False,
+    **params,
+):
+    """Renders a template once per job across a pool of workers.
+
+    jobs is an iterable of overrides (as taken by Template.render), and image is
+    the base image or a path to it. Encoded images are yielded in the order of
+    jobs, with at most max_in_flight jobs sent to workers but not yet yielded.
+    Remaining keyword arguments (such as preset and quality) are passed to
+    Encoding.encode.
+
+    With timed, a Timed is yielded for each job instead, and jobs raising an
+    exception yield its message rather than raising it.
+
+    With the process backend, only the template's placements and the base image
+    are sent to each worker, once, and each worker parses them itself. If stdout
+    is redirected to stderr (as by contextlib.redirect_stdout) when the first job
+    is sent, workers print their warnings to stderr too. With the thread backend,
+    workers share the template and base image without pickling.
+    """
+    if not isinstance(template, Template):
+        template = Template(template)
+
+    if chunksize < 1:
+        raise ValueError("chunksize has to be at least 1")
+
+    if backend not in ["process", "thread"]:
+        raise ValueError(f'backend has to be "process" or "thread", not "{backend}"')
+
+    workers = workers or cpu_count() or 1
+    max_in_flight = max_in_flight or workers * chunksize * 2
+    max_chunks = max(1, max_in_flight // chunksize)
+
+    if backend == "thread":
+        image = _load(image)
+        pool = ThreadPoolExecutor(max_workers=workers)
+
+        def submit(chunk: list):
+            future = pool.submit(
+                _render_jobs, template, image, chunk, format, params, timed
+            )
+            return future.result
+
+    else:
+        pool = Pool(
+            processes=workers,
+            initializer=_init_worker,
+            initargs=(
+                template.places,
+                template.flatten,
+                template.variable,
+                template.lazy,
+                image,
+                sys.stdout is sys.stderr,
+            ),
+        )
+
+        def submit(chunk: list):
+            return pool.apply_async(_render_chunk, (chunk, format, params, timed)).get
+
+    with pool:
+        pending = deque()
+
+        for chunk in _chunks(jobs, chunksize):
+            pending.append(submit(chunk))
+
+            if len(pending) >= max_chunks:
+                yield from pending.popleft()()
+
+        while pending:
+            yield from pending.popleft()()
@@ -0,0 +1,235 @@
+from .batch import render_batch
+from .encoding import PRESETS
+from .template import Template
+from argparse import ArgumentParser
+from collections import deque
+from contextlib import redirect_stdout
+from json import dumps, load, loads
+from os import makedirs, path as os_path
+from tarfile import BLOCKSIZE, RECORDSIZE, TarInfo
+from time import perf_counter, time
+import sys
+
+
+class TarStream:
+    """Writes files into a tar stream as they come, without keeping their headers.
+
+    tarfile keeps the header of every file it writes, so memory would grow with
+    the number of jobs rendered.
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self.written = 0
+
+    def add(self, name: str, data: bytes) -> None:
+        info = TarInfo(name)
+        info.size = len(data)
+        info.mtime = int(time())
+
+        padding = -len(data) % BLOCKSIZE
+        self._write(info.tobuf() + data + b"\0" * padding)
+
+    def close(self) -> None:
+        # Two empty blocks end the archive, which is padded to a whole record
+        self._write(b"\0" * BLOCKSIZE * 2)
+        self._write(b"\0" * (-self.written % RECORDSIZE))
+        self.file.flush()
+
+    def _write(self, data: bytes) -> None:
+        self.file.write(data)
+        self.written += len(data)
+
+
+def _parser() -> ArgumentParser:
+    parser = ArgumentParser(
+        prog="printingpress",
+        description=(
+            "Renders a template once per job, reading jobs from a JSON Lines "
+            "stream. Each job is a JSON object of overrides (as taken by "
+            "Template.render), which may name its output with a .name key. A "
+            "JSON Lines report of each job is written to stdout, or stderr if "
+            "images are written to stdout."
+        ),
+    )
+    parser.add_argument("placements", help="JSON file of the template's placements")
+    parser.add_argument("image", help="base image to render onto")
+    parser.add_argument(
+        "--jobs", default="-", help="JSON Lines file of jobs, or - for stdin"
+    )
+
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument("--output", help="directory to write images into")
+    output.add_argument("--tar", help="tar file to write images into, or - for stdout")
+
+    parser.add_argument("--format", default="PNG", help="format to encode images as")
+    parser.add_argument("--quality", type=int, help="quality to encode images at")
+    parser.add_argument(
+        "--preset",
+        choices=list(PRESETS),
+        help="encoder options trading encoding speed against size",
+    )
+    parser.add_argument("--workers", type=int, help="workers to render with")
+    parser.add_argument(
+        "--backend", choices=["process", "thread"], default="process"
+    )
+    parser.add_argument(
+        "--chunksize", type=int, default=4, help="jobs sent to a worker at once"
+    )
+    parser.add_argument(
+        "--flatten", action="store_true", help="flatten static areas into layers"
+    )
+    parser.add_argument(
+        "--variable",
+        action="append",
+        default=[],
+        help="area that is overridden by jobs, when flattening (repeatable)",
+    )
+    parser.add_argument(
+        "--lazy", action="store_true", help="only load fonts and images when used"
+    )
+    return parser
+
+
+def _valid_name(name) -> bool:
+    return (
+        isinstance(name, str)
+        and name not in ("", ".", "..")
+        and os_path.basename(name) == name
+        and "/" not in name
+    )
+
+
+def main(argv: list = None) -> int:
+    arguments = _parser().parse_args(argv)
+    stdout = sys.stdout
+
+    if arguments.tar != "-":
+        return _run(arguments, stdout)
+
+    # Images written to stdout would be corrupted by warnings printed while
+    # parsing and rendering, so they are printed to stderr instead (by workers
+    # too, see render_batch)
+    with redirect_stdout(sys.stderr):
+        return _run(arguments, stdout)
+
+
+def _run(arguments, stdout) -> int:
+    with open(arguments.placements, "r", encoding="utf-8") as pf:
+        template = Template(
+            load(pf),
+            flatten=arguments.flatten,
+            variable=arguments.variable,
+            lazy=arguments.lazy,
+        )
+
+    params = {} if arguments.quality is None else {"quality": arguments.quality}
+
+    if arguments.preset is not None:
+        params["preset"] = arguments.preset
+    extension = arguments.format.lower()
+
+    if arguments.jobs == "-":
+        lines = sys.stdin
+    else:
+        lines = open(arguments.jobs, "r", encoding="utf-8")
+
+    if arguments.tar == "-":
+        tar, report = TarStream(stdout.buffer), sys.stderr
+    elif arguments.tar is not None:
+        tar, report = TarStream(open(arguments.tar, "wb")), sys.stdout
+    else:
+        tar, report = None, sys.stdout
+        makedirs(arguments.output, exist_ok=True)
+
+    counts = {"jobs": 0, "errors": 0}
+    started = perf_counter()
+
+    def write(entry: dict) -> None:
+        if "error" in entry:
+            counts["errors"] += 1
+
+        report.write(dumps(entry) + "\n")
+        report.flush()
+
+    # (number, name) of each job sent to be rendered, in order
+    sent = deque()
+
+    def jobs():
+        # Jobs that cannot be sent are reported straight away
+        for number, line in enumerate(lines):
+            if not line.strip():
+                continue
+
+            counts["jobs"] += 1
+            name = f"{number:08d}.{extension}"
+
+            try:
+                overrides = loads(line)
+
+                if not isinstance(overrides, dict):
+                    raise TypeError(f"job is type {type(overrides)}, but expected dict")
+
+                name = overrides.pop(".name", name)
+
+                if not _valid_name(name):
+                    raise ValueError(f"name {name!r} is not a file name")
+
+            except (ValueError, TypeError) as e:
+                error = f"{type(e).__name__}: {e}"
+                write({"job": number, "name": name, "error": error})
+                continue
+
+            sent.append((number, name))
+            yield overrides
+
+    try:
+        for timed in render_batch(
+            template=template,
+            jobs=jobs(),
+            image=arguments.image,
+            workers=arguments.workers,
+            chunksize=arguments.chunksize,
+            backend=arguments.backend,
+            format=arguments.format,
+            timed=True,
+            **params,
+        ):
+            number, name = sent.popleft()
+            entry = {"job": number, "name": name}
+
+            if timed.error is not None:
+                entry["error"] = timed.error
+                write(entry)
+                continue
+
+            if tar is not None:
+                tar.add(name, timed.output)
+            else:
+                with open(os_path.join(arguments.output, name), "wb") as of:
+                    of.write(timed.output)
+
+            entry.update(
+                bytes=len(timed.output), render=timed.render, encode=timed.encode
+            )
+            write(entry)
+
+    finally:
+        if tar is not None:
+            tar.close()
+
+            if arguments.tar != "-":
+                tar.file.close()
+
+        if lines is not sys.stdin:
+            lines.close()
+
+    write(
+        {
+            "jobs": counts["jobs"],
+            "errors": counts["errors"],
+            "seconds": perf_counter() - started,
+        }
+    )
+
+    return 1 if counts["errors"] else 0
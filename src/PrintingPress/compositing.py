@@ -0,0 +1,197 @@
+from collections import namedtuple
+from PIL import Image
+
+try:
+    import numpy
+except ImportError:  # NumPy is optional, and only used by ArrayPresser
+    numpy = None
+
+# Compositors operate can press areas with
+COMPOSITORS = ("pillow", "numpy")
+
+# An area that has already been rendered into the layer pressed at xy
+LayerArea = namedtuple("LayerArea", ["type", "image", "xy", "beneath"])
+
+# Maps fully transparent alpha values to a full mask, everything else to nothing.
+_TRANSPARENT_LUT = [255] + [0] * 255
+
+
+def clip_box(canvas_size: tuple, layer_size: tuple, xy: tuple):
+    # Returns the (left, top, right, bottom) canvas box covered by a layer placed
+    # at xy, clipped to the canvas, or None if the layer misses the canvas entirely.
+    left, top = max(xy[0], 0), max(xy[1], 0)
+    right = min(xy[0] + layer_size[0], canvas_size[0])
+    bottom = min(xy[1] + layer_size[1], canvas_size[1])
+
+    if left >= right or top >= bottom:
+        return None
+
+    return left, top, right, bottom
+
+
+def clear_transparent(image: Image.Image, box: tuple = None) -> None:
+    # Zeroes the colour of fully transparent pixels (in place) inside box, or
+    # across the entire image if no box is given.
+    if box is None:
+        if image.getextrema()[3][0] > 0:
+            return
+
+        alpha = image.getchannel("A")
+
+    else:
+        alpha = image.crop(box).getchannel("A")
+
+        if alpha.getextrema()[0] > 0:
+            return
+
+    image.paste((0, 0, 0, 0), box, alpha.point(_TRANSPARENT_LUT))
+
+
+def masked_layer(subimage: Image.Image) -> Image.Image:
+    # Pastes a subimage onto a transparent layer using itself as the mask, which
+    # is how text areas have always been pressed onto the operating image.
+    layer = Image.new("RGBA", subimage.size)
+    layer.paste(im=subimage, box=(0, 0), mask=subimage)
+    return layer
+
+
+class Presser:
+    """Presses area layers onto an RGBA image in place.
+
+    Only the box a layer covers is allocated and blended, so the cost of pressing
+    an area scales with the area rather than the operating image. The result is
+    identical to compositing a full-size transparent holder containing the layer.
+    """
+
+    def __init__(self, image: Image.Image):
+        self.image = image
+
+        # Boxes which may hold colour in fully transparent pixels. Compositing the
+        # image over a transparent holder (a beneath area) zeroes these across the
+        # whole image, so they are cleared before the next beneath area is pressed.
+        # A None box stands for the whole image, as the base image is unknown.
+        self._stale = [None]
+
+    def press(self, layer: Image.Image, xy: tuple, beneath: bool = False) -> None:
+        box = clip_box(self.image.size, layer.size, xy)
+
+        if beneath:
+            for stale_box in self._stale:
+                clear_transparent(self.image, stale_box)
+
+            self._stale = []
+
+        if box is None:
+            return
+
+        source = (box[0] - xy[0], box[1] - xy[1], box[2] - xy[0], box[3] - xy[1])
+
+        if beneath:
+            region = Image.alpha_composite(layer.crop(source), self.image.crop(box))
+            self.image.paste(region, box)
+
+            # The layer's own transparent pixels are kept where the image is clear
+            self._stale.append(box)
+
+        else:
+            self.image.alpha_composite(layer, dest=box[:2], source=source)
+
+    def finish(self) -> Image.Image:
+        return self.image
+
+
+class ArrayPresser:
+    """Presses area layers onto an RGBA image with NumPy, blending in place.
+
+    The image is copied once into an array that layers are blended into, over it
+    or beneath it, within the box each layer covers, so no image-sized arrays are
+    allocated for each area. Boxes are blended with Image.alpha_composite, so
+    results match Presser exactly, except for the colour of fully transparent
+    pixels.
+    """
+
+    def __init__(self, image: Image.Image):
+        if numpy is None:
+            raise ImportError("ArrayPresser requires NumPy")
+
+        if image.mode != "RGBA":
+            image = image.convert("RGBA")
+
+        self.pixels = numpy.array(image)
+
+    def press(self, layer: Image.Image, xy: tuple, beneath: bool = False) -> None:
+        height, width = self.pixels.shape[:2]
+        box = clip_box((width, height), layer.size, xy)
+
+        if box is None:
+            return
+
+        source = (box[0] - xy[0], box[1] - xy[1], box[2] - xy[0], box[3] - xy[1])
+
+        # Transparent edges of the layer, such as around text, blend to nothing
+        bbox = layer.crop(source).getbbox()
+
+        if bbox is None:
+            return
+
+        source = (
+            source[0] + bbox[0],
+            source[1] + bbox[1],
+            source[0] + bbox[2],
+            source[1] + bbox[3],
+        )
+        left, top = xy[0] + source[0], xy[1] + source[1]
+        right, bottom = xy[0] + source[2], xy[1] + source[3]
+
+        region = self.pixels[top:bottom, left:right]
+        tile = layer.crop(source)
+
+        if beneath:
+            if region[..., 3].min() == 255:
+                return  # Nothing shows through
+
+        elif numpy.asarray(tile.getchannel("A")).min() == 255:
+            region[...] = tile  # Nothing is blended
+            return
+
+        if beneath:
+            blended = Image.alpha_composite(tile, Image.fromarray(region, "RGBA"))
+        else:
+            blended = Image.alpha_composite(Image.fromarray(region, "RGBA"), tile)
+
+        region[...] = numpy.asarray(blended)
+
+    def finish(self) -> Image.Image:
+        return Image.fromarray(self.pixels, "RGBA")
+
+
+def presser(image: Image.Image, compositor: str = "pillow"):
+    # Returns a presser of the given compositor, pressing onto a copy of image.
+    # The NumPy compositor falls back to Pillow if NumPy is not installed.
+    if compositor not in COMPOSITORS:
+        raise ValueError(
+            f'compositor has to be "pillow" or "numpy", not "{compositor}"'
+        )
+
+    if compositor == "numpy" and numpy is not None:
+        return ArrayPresser(image)
+
+    if "A" not in image.mode:
+        return Presser(image.convert("RGBA"))
+
+    return Presser(image.copy())  # areas are pressed in place
+
+
+def flatten(layers: list, beneath: bool = False) -> LayerArea:
+    # Presses (layer, xy) pairs onto a transparent layer covering all of them,
+    # in order, returning the result as a single area.
+    boxes = [(x, y, x + layer.width, y + layer.height) for layer, (x, y) in layers]
+    left, top = min(box[0] for box in boxes), min(box[1] for box in boxes)
+    right, bottom = max(box[2] for box in boxes), max(box[3] for box in boxes)
+
+    presser = Presser(Image.new("RGBA", (right - left, bottom - top)))
+
+    for layer, (x, y) in layers:
+        presser.press(layer=layer, xy=(x - left, y - top), beneath=beneath)
+
+    return LayerArea(type="layer", image=presser.image, xy=[left, top], beneath=beneath)
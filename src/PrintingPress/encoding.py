@@ -0,0 +1,128 @@
+from . import metrics as Metrics
+from io import BytesIO
+from PIL import Image
+from time import perf_counter
+
+# Encoder options of each preset for each format, from fastest to smallest.
+# Options given to encode override the preset's.
+PRESETS = {
+    "fast": {
+        "PNG": {"compress_level": 1},
+        "WEBP": {"method": 0},
+        "JPEG": {"quality": 75, "subsampling": "4:2:0"},
+    },
+    "balanced": {
+        "PNG": {"compress_level": 6},
+        "WEBP": {"method": 4},
+        "JPEG": {"quality": 75, "subsampling": "4:2:0", "optimize": True},
+    },
+    "small": {
+        "PNG": {"compress_level": 9, "optimize": True},
+        "WEBP": {"method": 6},
+        "JPEG": {
+            "quality": 65,
+            "subsampling": "4:2:0",
+            "optimize": True,
+            "progressive": True,
+        },
+    },
+}
+
+# Formats that cannot store transparency, which images are always saved without
+_opaque_formats = {"JPEG"}
+
+# Mode of each mode with alpha once it is dropped
+_without_alpha = {"RGBA": "RGB", "LA": "L"}
+
+
+def opaque(image: Image.Image) -> bool:
+    # Returns whether every pixel of an image is fully opaque
+    if image.mode not in _without_alpha:
+        return "A" not in image.getbands()
+
+    return image.getextrema()[-1] == (255, 255)
+
+
+class _Counter:
+    # Wraps a file, counting the bytes written into it
+    def __init__(self, file):
+        self.file = file
+        self.written = 0
+
+    def write(self, data) -> int:
+        self.file.write(data)
+        self.written += len(data)
+        return len(data)
+
+    def __getattr__(self, name: str):
+        # Pillow writes straight into files with a descriptor, around the counter
+        if name == "fileno":
+            raise AttributeError(name)
+
+        return getattr(self.file, name)
+
+
+def encode(
+    image: Image.Image,
+    format: str = "PNG",
+    preset: str = None,
+    file=None,
+    drop_alpha: bool = True,
+    hook=None,
+    **params,
+):
+    """Encodes image as format, returning the bytes, or writing them into file.
+
+    file is a binary file object, such as a buffer or socket, in which case the
+    number of bytes written is returned instead. Options of preset (see PRESETS)
+    are passed to Image.save, overridden by params. Alpha is dropped for formats
+    without it, and with drop_alpha, for images that are fully opaque, which
+    encode faster and smaller.
+
+    hook, if given, is called with a Metrics.Event for the "encode" stage, whose
+    detail holds the format, the mode encoded and the size of the output.
+    """
+    if hook is not None:
+        started = perf_counter()
+
+    format = format.upper()
+
+    if preset is not None and preset not in PRESETS:
+        raise ValueError(
+            f"preset has to be one of {', '.join(PRESETS)}, not {preset!r}"
+        )
+
+    options = dict(PRESETS[preset].get(format, {})) if preset is not None else {}
+    options.update(params)
+
+    if image.mode in _without_alpha and (
+        format in _opaque_formats or (drop_alpha and opaque(image))
+    ):
+        image = image.convert(_without_alpha[image.mode])
+
+    if file is None:
+        buffer = BytesIO()
+        image.save(buffer, format=format, **options)
+        result = buffer.getvalue()
+        size = len(result)
+    else:
+        counter = _Counter(file)
+        image.save(counter, format=format, **options)
+        result = size = counter.written
+
+    if hook is not None:
+        pixels, nbytes = Metrics.footprint(image)
+        hook(
+            Metrics.Event(
+                area=None,
+                type=None,
+                stage="encode",
+                start=started,
+                duration=perf_counter() - started,
+                pixels=pixels,
+                nbytes=nbytes,
+                detail={"format": format, "mode": image.mode, "size": size},
+            )
+        )
+
+    return result
@@ -1,2 +1,43 @@
+from collections import namedtuple
+
+# A problem found in placements. area and key are None where the problem is not
+# with a single area or key.
+Problem = namedtuple("Problem", ["area", "key", "message"])
+
+
 class RolloverError(Exception):
     pass
+
+
+class PlacementsError(KeyError, TypeError, AssertionError):
+    """Raised when placements are invalid, with every problem found in them.
+
+    Before placements were validated all at once, the first problem found raised
+    a KeyError, TypeError or AssertionError, so this subclasses all three for
+    handlers written for them.
+    """
+
+    def __init__(self, problems: list):
+        super().__init__(problems)
+        self.problems = problems
+
+    def __str__(self) -> str:
+        return "\n".join(
+            problem.message if problem.area is None
+            else f"Area {problem.area}: {problem.message}"
+            for problem in self.problems
+        )
+
+
+class BusyError(Exception):
+    # Raised when too many renders are already waiting, so callers can shed load
+    pass
+
+
+class ServerError(Exception):
+    # Raised by server.RenderClient when the render server answers with an error,
+    # with the HTTP status it answered with
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
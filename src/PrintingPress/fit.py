@@ -0,0 +1,209 @@
+from . import fonts as Fonts, layout as Layout
+from collections import OrderedDict, namedtuple
+from math import sqrt
+from threading import RLock
+
+# size: the font size the text fits the textbox at, see solve
+# lines: the text's lines at that size
+# iterations: number of sizes laid out to find it, 0 if it was memoized
+Fit = namedtuple("Fit", ["size", "lines", "iterations"])
+
+# Font size text is measured at to estimate its fitted size
+REFERENCE_SIZE = 32
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+class FitCache:
+    """A bounded LRU memo of fitted sizes, keyed by (font, size, text, wh)."""
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+        self._fits = OrderedDict()
+        self._lock = RLock()
+
+    def get(self, key: tuple) -> Fit:
+        with self._lock:
+            fit = self._fits.get(key)
+
+            if fit is None:
+                self.misses += 1
+                return None
+
+            self._fits.move_to_end(key)
+            self.hits += 1
+            return fit
+
+    def put(self, key: tuple, fit: Fit) -> None:
+        with self._lock:
+            self._fits[key] = fit
+
+            while len(self._fits) > max(self.maxsize, 0):
+                self._fits.popitem(last=False)
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(
+                hits=self.hits,
+                misses=self.misses,
+                maxsize=self.maxsize,
+                currsize=len(self._fits),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._fits.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Process-wide memo shared by every text area
+cache = FitCache()
+
+
+def estimate(text: str, path, size: int, variant: str, wh: list) -> int:
+    # Estimates the largest size text fits the textbox at from its metrics at a
+    # reference size, as advances and line heights scale (close to) linearly with
+    # font size. Only FreeType's metrics are used, so no glyphs are rendered.
+    words = text.split()
+
+    if not words:
+        return size
+
+    reference = min(size, REFERENCE_SIZE)
+    font = Fonts.get_font(path=path, size=reference, variant=variant)
+
+    ascent, descent = font.getmetrics()
+    line_h = ascent + descent
+    advance = font.getlength(" ".join(words))
+    widest = max(font.getbbox(word)[2] - font.getbbox(word)[0] for word in words)
+
+    max_width, max_height = wh
+    scale = min(
+        # The text's total advance, spread over lines stacked to the textbox height
+        sqrt(max(max_width * max_height, 0) / max(advance * line_h, 1)),
+        max_width / max(widest, 1),  # The widest word on a line of its own
+        max_height / max(line_h, 1),  # A single line
+    )
+
+    return max(1, min(size, int(reference * scale)))
+
+
+def halving(size: int, fits) -> int:
+    # The size operate's previous search settled on, or 0 if it finds none. From
+    # size, it steps down after sizes that do not fit and up after those that do,
+    # in strides halved (and rounded to a tenth) each step, until a size that fits
+    # is reached twice in a row. fits is called with each size stepped to.
+    last, stride, growing = 0, size / 2, False
+
+    while True:
+        size = int(size + stride) if growing else int(size - stride)
+
+        if size < 1:
+            return 0
+
+        if fits(size):
+            if size == last:
+                return size
+
+            growing = True
+
+        elif stride == 0:  # Stuck on a size that does not fit
+            return 0
+
+        else:
+            growing = False
+
+        last = size
+        stride = round(stride / 2, 1)
+
+
+def solve(
+    text: str, path, size: int, variant: str, wh: list, area_name: str = ""
+) -> Fit:
+    """Finds a font size, up to size, that text fits the textbox at.
+
+    The search starts from a size estimated from font metrics, steps away from it
+    in doubling strides until the answer is bracketed, and then bisects between a
+    size known to fit and one known not to. Whether text fits is not monotonic in
+    font size, as hinting and line breaks change with it, so a larger size may
+    fit past one that does not, and the bisection can miss it. The size operate's
+    previous search finds (see halving) is checked as well, and the larger of the
+    two returned, so text is never fitted smaller than before, though a larger
+    size may still fit. Results are memoized, so fitting the same text again
+    costs a single lookup. If the text does not fit at any size, size 1 is
+    returned along with its lines laid out with rollover.
+    """
+    key = (str(path), variant, size, text, tuple(wh))
+    fit = cache.get(key)
+
+    if fit is not None:
+        return fit._replace(iterations=0)
+
+    fitted = {}  # size: lines, for sizes that fit
+    tried = set()
+
+    def fits(candidate: int) -> bool:
+        if candidate not in tried:
+            tried.add(candidate)
+
+            font = Fonts.get_font(path=path, size=candidate, variant=variant)
+            lines = Layout.get_layout(font).fits(text=text, wh=wh)
+
+            if lines is not None:
+                fitted[candidate] = lines
+
+        return candidate in fitted
+
+    # lo always fits (or is 0) and hi never does (or is beyond size)
+    lo, hi = 0, size + 1
+    guess = estimate(text=text, path=path, size=size, variant=variant, wh=wh)
+
+    if fits(guess):
+        lo, stride = guess, 1
+
+        while lo + stride < hi and fits(lo + stride):
+            lo, stride = lo + stride, stride * 2
+
+        hi = min(hi, lo + stride)
+
+    else:
+        hi, stride = guess, 1
+
+        while hi - stride > lo and not fits(hi - stride):
+            hi, stride = hi - stride, stride * 2
+
+        lo = max(lo, hi - stride)
+
+    while hi - lo > 1:
+        middle = (lo + hi) // 2
+
+        if fits(middle):
+            lo = middle
+        else:
+            hi = middle
+
+    lo = max(lo, halving(size, fits))
+    iterations = len(tried)
+
+    if lo == 0:  # Too big at every size
+        font = Fonts.get_font(path=path, size=1, variant=variant)
+        lines = Layout.get_layout(font).rollover(text=text, wh=wh, area_name=area_name)
+        fit = Fit(size=1, lines=lines, iterations=iterations)
+
+    else:
+        fit = Fit(size=lo, lines=fitted[lo], iterations=iterations)
+
+    cache.put(key, fit)
+    return fit
+
+
+def cache_info() -> CacheInfo:
+    return cache.info()
+
+
+def clear_cache() -> None:
+    cache.clear()
@@ -0,0 +1,167 @@
+from collections import OrderedDict, namedtuple
+from PIL import ImageFont
+from pathlib import Path
+from threading import RLock, get_ident
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize", "files"])
+
+
+class _FontFile:
+    # Pillow reads font data from file-like objects with a single read() call.
+    # Handing out the same bytes object lets every size share one copy in memory.
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def read(self) -> bytes:
+        return self.data
+
+
+class FontCache:
+    """A bounded LRU cache of FreeTypeFont objects.
+
+    Fonts are keyed by (resolved path, size, variant). The bytes of each font file
+    are read once and shared between every size and variant made from it. As
+    FreeType faces are not safe to use from several threads at once, each thread
+    is given its own font objects.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+        self._fonts = OrderedDict()
+        self._files = {}  # resolved path: [bytes, number of cached fonts using it]
+        self._paths = {}  # path as given: resolved path
+        self._lock = RLock()
+
+    def get(self, path, size: int, variant: str = None) -> ImageFont.FreeTypeFont:
+        with self._lock:
+            key = (self.resolve(path), size, variant, get_ident())
+            font = self._fonts.get(key)
+
+            if font is not None:
+                self._fonts.move_to_end(key)
+                self.hits += 1
+                return font
+
+            self.misses += 1
+
+            try:
+                font = ImageFont.FreeTypeFont(font=self._file(key[0]), size=size)
+
+                if variant is not None:
+                    font.set_variation_by_name(bytes(variant, "utf-8"))
+
+            except Exception:
+                # Nothing is cached for invalid sizes or variants
+                if key[0] in self._files and self._files[key[0]][1] == 0:
+                    del self._files[key[0]]
+                raise
+
+            self._fonts[key] = font
+            self._files[key[0]][1] += 1
+
+            while len(self._fonts) > max(self.maxsize, 0):
+                self._evict()
+
+            return font
+
+    def resolve(self, path) -> str:
+        # Returns the resolved path of a font file, memoized by the path as given
+        with self._lock:
+            resolved = self._paths.get(path)
+
+            if resolved is None:
+                if len(self._paths) >= 4096:
+                    self._paths.clear()
+
+                resolved = self._paths[path] = str(Path(path).resolve())
+
+            return resolved
+
+    def _file(self, path: str) -> _FontFile:
+        if path not in self._files:
+            with open(path, "rb") as ff:
+                self._files[path] = [ff.read(), 0]
+
+        return _FontFile(self._files[path][0])
+
+    def _evict(self) -> None:
+        (path, _, _, _), _ = self._fonts.popitem(last=False)
+
+        self._files[path][1] -= 1
+        if self._files[path][1] <= 0:
+            del self._files[path]
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(
+                hits=self.hits,
+                misses=self.misses,
+                maxsize=self.maxsize,
+                currsize=len(self._fonts),
+                files=len(self._files),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._fonts.clear()
+            self._files.clear()
+            self._paths.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Process-wide cache shared by Placements.parse and operate
+cache = FontCache()
+
+
+def get_font(path, size: int, variant: str = None) -> ImageFont.FreeTypeFont:
+    return cache.get(path=path, size=size, variant=variant)
+
+
+def load_font(path, size: int, variant: str = None, area_name: str = "") -> tuple:
+    # Returns the (font, variant) of an area, continuing without the variant (as
+    # None) if it is invalid
+    if variant is not None:
+        try:
+            return get_font(path=path, size=size, variant=variant), variant
+        except Exception as e:
+            print(f"Area: {area_name}: font_variant is invalid, continuing. ({e})")
+
+    return get_font(path=path, size=size), None
+
+
+class LazyFont:
+    """The font of a text area, constructed when first rendered rather than when
+    parsed. Until then, the validity of its variant is unknown, so variant is
+    only final once load has been called.
+    """
+
+    def __init__(self, path, size: int, variant: str = None, area_name: str = ""):
+        self.path = path
+        self.size = size
+        self.variant = variant
+        self.area_name = area_name
+
+    def load(self) -> ImageFont.FreeTypeFont:
+        # Returns this thread's font, dropping the variant if it is invalid
+        font, self.variant = load_font(
+            path=self.path,
+            size=self.size,
+            variant=self.variant,
+            area_name=self.area_name,
+        )
+        return font
+
+    def __repr__(self) -> str:
+        return f"LazyFont({str(self.path)!r}, {self.size}, {self.variant!r})"
+
+
+def cache_info() -> CacheInfo:
+    return cache.info()
+
+
+def clear_cache() -> None:
+    cache.clear()
@@ -0,0 +1,233 @@
+from . import internals as Internals, compositing as Compositing, metrics as Metrics
+from .placements import Placements
+from .printingpress import render_area
+from .template import Template
+from PIL import Image
+from time import perf_counter
+from types import MappingProxyType
+
+
+def _intersects(box: tuple, other: tuple) -> bool:
+    return (
+        box[0] < other[2]
+        and other[0] < box[2]
+        and box[1] < other[3]
+        and other[1] < box[3]
+    )
+
+
+def _without_xy(area_data: dict) -> dict:
+    return {key: value for key, value in area_data.items() if key != "xy"}
+
+
+def merge_boxes(boxes: list) -> list:
+    # Returns boxes with each overlapping group replaced by the box bounding it,
+    # so no region is composited twice. Boxes apart are kept apart, as the box
+    # bounding an area moved across the image would cover most of it.
+    merged = []
+
+    for box in boxes:
+        if box is None:
+            continue
+
+        overlapping = [other for other in merged if _intersects(box, other)]
+
+        while overlapping:
+            for other in overlapping:
+                merged.remove(other)
+
+            box = (
+                min([box[0]] + [other[0] for other in overlapping]),
+                min([box[1]] + [other[1] for other in overlapping]),
+                max([box[2]] + [other[2] for other in overlapping]),
+                max([box[3]] + [other[3] for other in overlapping]),
+            )
+            overlapping = [other for other in merged if _intersects(box, other)]
+
+        merged.append(box)
+
+    return merged
+
+
+class IncrementalRenderer:
+    """Placements rendered onto an image, re-rendering only what changes.
+
+    The rendered image is kept with the layer of each area and the box it covers
+    (rotation expansion included). Updating areas renders only their layers again,
+    and composites only the boxes they covered before and after the update, from
+    the base image and the areas over those boxes in order. Moving an area above or
+    beneath the image composites all of it again. The rendered image is identical
+    to operate on the updated placements.
+
+    Areas whose xy alone changes are not rendered again, but pressed elsewhere.
+    Updates are kept, unlike Template overrides, and the rendered image is changed
+    in place by them. See Template for lazy.
+    """
+
+    def __init__(
+        self,
+        image: Image.Image,
+        places: dict,
+        lazy: bool = False,
+        suppress: bool = False,
+        hook=None,
+    ):
+        assert isinstance(
+            image, Image.Image
+        ), "Passed image parameter is not a PIL Image"
+        assert isinstance(places, dict), "Non-dictionary passed in"
+
+        if hook is not None:
+            started = perf_counter()
+
+        self._base = image.convert("RGBA") if "A" not in image.mode else image.copy()
+        self._places = Internals.copy_places(places)
+        self._parsed = Placements.parse(self._places, lazy=lazy)
+        self._lazy = lazy
+
+        self._layers = {}
+        self._boxes = {}
+
+        for area_name in self._parsed:
+            if area_name != ".meta":
+                self._render_layer(area_name, suppress=suppress, hook=hook)
+
+        self._image = self._base.copy()
+        self._composite((0, 0) + self._image.size)
+
+        if hook is not None:
+            hook(Metrics.render_event(started, self._image))
+
+    @property
+    def image(self) -> Image.Image:
+        # The rendered image, which is changed in place by updates
+        return self._image
+
+    @property
+    def places(self) -> dict:
+        # A copy of the placements rendered, with updates applied
+        return Internals.copy_places(self._places)
+
+    @property
+    def areas(self) -> MappingProxyType:
+        return MappingProxyType(self._parsed)
+
+    @property
+    def boxes(self) -> MappingProxyType:
+        # The (left, top, right, bottom) box of the image each area covers, or None
+        # for areas entirely outside of it
+        return MappingProxyType(self._boxes)
+
+    @property
+    def lazy(self) -> bool:
+        return self._lazy
+
+    def update(self, updates: dict, suppress: bool = False, hook=None) -> list:
+        """Updates keys of areas, re-rendering them, and returns the boxes changed.
+
+        updates maps area names to the keys to change, as with Template overrides.
+        Each box returned is (left, top, right, bottom), and only pixels within them
+        differ from the image rendered before.
+        """
+        if hook is not None:
+            started = perf_counter()
+
+        changed = {}
+
+        # Areas are parsed before anything is changed, so invalid updates leave the
+        # rendered image and placements as they were
+        for area_name, update in updates.items():
+            if area_name == ".meta" or area_name not in self._places:
+                raise KeyError(f"area {area_name} is not in the renderer")
+
+            if not isinstance(update, dict):
+                raise TypeError(
+                    f"updates for area {area_name} is type {type(update)}, "
+                    f"but expected {dict}"
+                )
+
+            area_data = dict(self._places[area_name])
+            area_data.update(Internals.copy_places(update))
+
+            parsed = self._parsed[area_name]
+            reload = Template._loaded_from[parsed.type].intersection(update)
+
+            changed[area_name] = (
+                area_data,
+                Placements.parse_area(
+                    area_name=area_name,
+                    area_data=area_data,
+                    reuse=None if reload else parsed,
+                    lazy=self._lazy,
+                ),
+            )
+
+        dirty = []
+
+        for area_name, (area_data, parsed) in changed.items():
+            # Pressing an area beneath the image clears the colour of transparent
+            # pixels across it (see Compositing.Presser), so moving an area above or
+            # beneath the image may change pixels anywhere
+            if parsed.beneath != self._parsed[area_name].beneath:
+                dirty.append((0, 0) + self._image.size)
+
+            moved = _without_xy(area_data) == _without_xy(self._places[area_name])
+
+            self._places[area_name] = area_data
+            self._parsed[area_name] = parsed
+
+            dirty.append(self._boxes[area_name])
+
+            if moved:  # Only xy changed, so the layer is pressed elsewhere as it is
+                self._boxes[area_name] = Compositing.clip_box(
+                    self._base.size,
+                    self._layers[area_name].size,
+                    tuple(parsed.xy),
+                )
+            else:
+                self._render_layer(area_name, suppress=suppress, hook=hook)
+
+            dirty.append(self._boxes[area_name])
+
+        dirty = merge_boxes(dirty)
+
+        for box in dirty:
+            self._composite(box)
+
+        if hook is not None:
+            hook(Metrics.render_event(started, self._image))
+
+        return dirty
+
+    def _render_layer(self, area_name: str, suppress: bool, hook) -> None:
+        area_data = self._parsed[area_name]
+        timer = Metrics.timer(
+            hook, suppress=suppress, area_name=area_name, area_type=area_data.type
+        )
+
+        layer = render_area(area_name=area_name, area_data=area_data, timer=timer)
+
+        self._layers[area_name] = layer
+        self._boxes[area_name] = Compositing.clip_box(
+            self._base.size, layer.size, tuple(area_data.xy)
+        )
+
+        if timer is not None:
+            timer.finish(layer)
+
+    def _composite(self, box: tuple) -> None:
+        # Composites box of the image again from the base image. Pressing is done
+        # pixel by pixel, so pressing every area onto only the box (offset by its
+        # corner) gives the same pixels there as pressing them onto the whole image.
+        presser = Compositing.Presser(self._base.crop(box))
+
+        for area_name, layer in self._layers.items():
+            area_data = self._parsed[area_name]
+
+            presser.press(
+                layer=layer,
+                xy=(area_data.xy[0] - box[0], area_data.xy[1] - box[1]),
+                beneath=area_data.beneath,
+            )
+
+        self._image.paste(presser.image, box[:2])
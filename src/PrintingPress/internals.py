@@ -1,43 +1,20 @@
-def print_if(message: str = "", end: str = "\n", condition: bool = True) -> None:
-    print(message, end=end) if condition else None
-
-
-def format_message(message: str, format_map: dict) -> str:
-    for key, value in format_map.items():
-        message = message.replace(key, str(value))
-    return message
-
-
-def retrieve_key(
-    target: dict,
-    key: str,
-    expected: type,
-    required: bool = True,
-    fallback=None,
-    extra: str = "",
-    expected_message: str = "key f:key is type f:type, but expected f:extype",
-    required_message: str = "key f:key is required",
-):
-    # Formats all formattable words into their representated.
-    message_formatting_map = {
-        "f:key": key,
-        "f:extype": expected,
-        "f:type": None,  # this is manipulated later
-        "f:extra": extra,
-    }
-
-    try:
-        retrieved = target[key]
-
-    except KeyError:
-        if required:
-            raise KeyError(format_message(required_message, message_formatting_map))
-        else:
-            return fallback
-
-    else:
-        if isinstance(retrieved, expected) is False:
-            message_formatting_map["f:type"] = str(type(retrieved))
-            raise TypeError(format_message(expected_message, message_formatting_map))
-
-        return retrieved
+def copy_places(target):
+    # Copies the dictionaries and lists of placements, leaving any other objects
+    # (such as PIL Images passed as paths) shared with the original.
+    if isinstance(target, dict):
+        return {key: copy_places(value) for key, value in target.items()}
+
+    if isinstance(target, list):
+        return [copy_places(value) for value in target]
+
+    return target
+
+
+def unparsed(placements: dict) -> bool:
+    # Whether placements are yet to be parsed. .meta stays a dictionary once
+    # parsed, so only areas are checked.
+    return any(
+        isinstance(area_data, dict)
+        for area_name, area_data in placements.items()
+        if area_name != ".meta"
+    )
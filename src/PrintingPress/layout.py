@@ -0,0 +1,420 @@
+from . import exceptions
+from collections import OrderedDict, namedtuple
+from PIL import Image, ImageDraw, ImageFont
+from threading import RLock
+from weakref import WeakKeyDictionary
+
+# Widths this close to the textbox width are confirmed by rasterising the line
+TOLERANCE = 2
+
+# Distinct words kept per font before its word metrics are dropped
+MAX_WORDS = 4096
+
+# advance: pen advance of the word
+# offset: (left, top) of the word's mask in pen coordinates
+# ink: (left, top, right, bottom) of the word's ink in pen coordinates
+WordMetrics = namedtuple("WordMetrics", ["advance", "offset", "ink"])
+
+# text: the line as drawn
+# offset: (left, top) of the line's mask in pen coordinates
+# mask: the line's ink box within its mask, as font.getmask(text).getbbox()
+Line = namedtuple("Line", ["text", "offset", "mask"])
+
+# text: the line as drawn
+# xy: where operate draws the line inside the textbox
+# bbox: (left, top, right, bottom) of the line's ink inside the textbox
+LineBox = namedtuple("LineBox", ["text", "xy", "bbox"])
+
+# mask: the line's glyphs rasterised into an "L" image, as ImageDraw.text draws them
+# offset: (left, top) of the mask in pen coordinates
+LineMask = namedtuple("LineMask", ["mask", "offset"])
+
+MaskCacheInfo = namedtuple(
+    "MaskCacheInfo", ["hits", "misses", "maxbytes", "currbytes", "currsize"]
+)
+
+# Running measurements of a line after each of its words. ink is None if a word
+# without ink was reached, as such lines are measured by rasterising them.
+_State = namedtuple("_State", ["pen", "last", "offset", "ink"])
+
+
+class Layout:
+    """Measures and breaks text into lines for a single font.
+
+    Word advances and ink boxes are measured once per word, and spaces (with the
+    kerning around them) once per character pair. Lines are then measured by
+    accumulating word metrics, rather than by rasterising the line after every
+    word, which keeps laying out a paragraph linear in its length.
+    """
+
+    def __init__(self, font: ImageFont.FreeTypeFont):
+        self.font = font
+        self.descent = font.font.descent
+
+        self._words = {}
+        self._pairs = {}
+        self._space = font.getlength(" ")
+
+    def word(self, word: str) -> WordMetrics:
+        metrics = self._words.get(word)
+
+        if metrics is None:
+            left, top, _, _ = self.font.getbbox(word)
+            mask = self.font.getmask(word).getbbox()
+
+            if mask is None:
+                ink = None
+            else:
+                ink = (left + mask[0], top + mask[1], left + mask[2], top + mask[3])
+
+            if len(self._words) >= MAX_WORDS:
+                self._words.clear()
+
+            metrics = self._words[word] = WordMetrics(
+                advance=self.font.getlength(word), offset=(left, top), ink=ink
+            )
+
+        return metrics
+
+    def _kerning(self, first: str, second: str) -> float:
+        pair = first + second
+        kerning = self._pairs.get(pair)
+
+        if kerning is None:
+            kerning = self._pairs[pair] = (
+                self.font.getlength(pair)
+                - self.font.getlength(first)
+                - self.font.getlength(second)
+            )
+
+        return kerning
+
+    def _advance(self, state: _State, word: str) -> _State:
+        metrics = self.word(word)
+
+        if state is None:  # First word of a line
+            if metrics.ink is None:
+                return _State(metrics.advance, word[-1], None, None)
+
+            return _State(metrics.advance, word[-1], metrics.offset, metrics.ink)
+
+        pen = (
+            state.pen
+            + self._kerning(state.last, " ")
+            + self._space
+            + self._kerning(" ", word[0])
+        )
+
+        if state.ink is None or metrics.ink is None:
+            return _State(pen + metrics.advance, word[-1], None, None)
+
+        ink = (
+            min(state.ink[0], pen + metrics.ink[0]),
+            min(state.ink[1], metrics.ink[1]),
+            max(state.ink[2], pen + metrics.ink[2]),
+            max(state.ink[3], metrics.ink[3]),
+        )
+        offset = (state.offset[0], min(state.offset[1], metrics.offset[1]))
+
+        return _State(pen + metrics.advance, word[-1], offset, ink)
+
+    def _mask(self, state: _State) -> tuple:
+        # The line's mask box from its running measurements, or None if it needs
+        # to be rasterised. Glyphs are drawn at whole pixels, so the pen is rounded.
+        if state is None or state.ink is None:
+            return None
+
+        left, top = state.offset
+        ink = state.ink
+
+        return (
+            round(ink[0] - left),
+            ink[1] - top,
+            round(ink[2] - left),
+            ink[3] - top,
+        )
+
+    def _raster(self, text: str) -> Line:
+        return Line(
+            text=text,
+            offset=self.font.getbbox(text)[:2],
+            mask=self.font.getmask(text).getbbox(),
+        )
+
+    def line(self, words: list) -> Line:
+        state = None
+        for word in words:
+            state = self._advance(state, word)
+
+        text = " ".join(words)
+        mask = self._mask(state)
+
+        if mask is None:
+            return self._raster(text)
+
+        return Line(text=text, offset=state.offset, mask=mask)
+
+    def measure(self, words: list) -> tuple:
+        # Equivalent to font.getmask(" ".join(words)).getbbox()
+        return self.line(words).mask
+
+    def rollover(
+        self, text: str, wh: list, area_name: str = "", raise_err: bool = False
+    ) -> list:
+        lines = self._rollover(text=text, wh=wh, area_name=area_name, strict=raise_err)
+
+        if lines is None:
+            raise exceptions.RolloverError()
+
+        return lines
+
+    def fits(self, text: str, wh: list) -> list:
+        # Returns the lines of text if it fits inside the textbox, or None if not
+        return self._rollover(text=text, wh=wh, strict=True)
+
+    def _rollover(
+        self, text: str, wh: list, area_name: str = "", strict: bool = False
+    ) -> list:
+        # Rollover. If strict, None is returned as soon as the text does not fit.
+        max_width, max_height = wh
+        descent = self.descent
+
+        text = text.split()
+        words = len(text)
+
+        line_h_local = 0
+
+        lines = [[]]
+        line_h = [0]
+        total_h = 0
+
+        # Measurements of each line after each of its words, mirroring lines
+        states = [[]]
+
+        # For more references:
+        # https://levelup.gitconnected.com/
+        # how-to-properly-calculate-text-size-in-pil-images-17a2cc6f51fd
+
+        for word in text:
+            lines[-1].append(word)
+            states[-1].append(
+                self._advance(states[-1][-1] if states[-1] else None, word)
+            )
+
+            mask = self._mask(states[-1][-1])
+
+            if mask is None or abs(mask[2] - max_width) <= TOLERANCE:
+                mask = self._raster(" ".join(lines[-1])).mask
+
+            _, _, txtw, txth = mask
+
+            if txtw > max_width and words > 1:  # Too wide, rollover
+                lines.append([lines[-1].pop(-1)])
+                states[-1].pop(-1)
+                states.append([self._advance(None, word)])
+
+                if line_h_local == 0:
+                    line_h_local = max([txth + descent, txth])
+
+                line_h.append(line_h_local)
+                total_h += line_h_local
+                line_h_local = 0
+
+            elif txtw < max_width and words > 1:
+                total_h -= line_h[-1]
+                line_h[-1] = max([txth + descent, txth])
+                total_h += line_h[-1]
+
+            elif words == 1:  # Special Treatment
+                if txtw > max_width:  # Can't rollover, is one word
+                    if strict:
+                        return None
+                    else:
+                        print(
+                            f"Warning: Area {area_name}'s text exceeds the box "
+                            "and will not be displayed properly. [Text: "
+                            f"({txtw}, {txth}), Box: {wh}]"
+                        )
+
+            height_conditions = [
+                total_h > max_height,
+                line_h_local > max_height,
+            ]
+
+            if any(height_conditions):
+                if strict:
+                    # Too tall even after rollover, need to change font size
+                    return None
+
+                if words == 1:
+                    print(
+                        f"Warning: Area {area_name}'s text exceeds the box "
+                        f"and will not be displayed properly. [Text: ({txtw}, "
+                        f"{txth}), Box: {wh}]"
+                    )
+
+                lines.pop(-1)
+                states.pop(-1)
+                try:
+                    lines[-1][-1] = "…"
+                except IndexError:
+                    pass
+                else:
+                    states[-1].pop(-1)
+                    states[-1].append(
+                        self._advance(states[-1][-1] if states[-1] else None, "…")
+                    )
+
+        if lines[0] == []:
+            lines.pop(0)
+
+        return lines
+
+    def boxes(self, lines: list) -> list:
+        # Positions lines the same way operate draws them into the textbox
+        boxes = []
+        x, y = 0, 0
+
+        for line_no, words in enumerate(lines):
+            line = self.line(words)
+            hoff, _, _, txth = line.mask
+
+            if line_no == 0:
+                x = 0 - hoff
+                y = 0 - self.descent
+
+            left, top = x + line.offset[0], y + line.offset[1]
+            boxes.append(
+                LineBox(
+                    text=line.text,
+                    xy=(x, y),
+                    bbox=(
+                        left + line.mask[0],
+                        top + line.mask[1],
+                        left + line.mask[2],
+                        top + line.mask[3],
+                    ),
+                )
+            )
+
+            y += txth + self.descent
+
+        return boxes
+
+
+_layouts = WeakKeyDictionary()
+_layouts_lock = RLock()
+
+
+def get_layout(font: ImageFont.FreeTypeFont) -> Layout:
+    # Layouts live as long as their font, which is usually held by the font cache
+    with _layouts_lock:
+        layout = _layouts.get(font)
+
+        if layout is None:
+            layout = _layouts[font] = Layout(font)
+
+        return layout
+
+
+def rasterise(font: ImageFont.FreeTypeFont, text: str) -> LineMask:
+    # Drawing in white onto black gives the mask exactly, as drawing at whole pixels
+    # positions the glyphs the same wherever the line is drawn
+    left, top, right, bottom = font.getbbox(text)
+    mask = Image.new("L", (right - left, bottom - top))
+
+    if mask.width and mask.height:
+        ImageDraw.Draw(mask).text((-left, -top), text, fill=255, font=font)
+
+    return LineMask(mask=mask, offset=(left, top))
+
+
+class MaskCache:
+    """A memory-budgeted LRU cache of lines of text rasterised into masks.
+
+    Lines are keyed by the (resolved path, size, variant) of their font and their
+    text, and are coloured when drawn, so one mask serves every colour and opacity
+    the line is drawn in. Masks are shared by every thread, and must not be
+    modified.
+    """
+
+    def __init__(self, maxbytes: int = 32 * 2 ** 20):
+        self.maxbytes = maxbytes
+        self.currbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+        self._masks = OrderedDict()
+        self._lock = RLock()
+
+    def get(self, font: ImageFont.FreeTypeFont, font_key: tuple, text: str) -> LineMask:
+        # Returns the mask of a line, rasterising it with font if not cached
+        key = (font_key, text)
+
+        with self._lock:
+            line = self._masks.get(key)
+
+            if line is not None:
+                self._masks.move_to_end(key)
+                self.hits += 1
+                return line
+
+            self.misses += 1
+
+        line = rasterise(font, text)
+        size = line.mask.width * line.mask.height
+
+        with self._lock:
+            if key in self._masks:  # Rasterised by another thread meanwhile
+                return self._masks[key]
+
+            if size <= self.maxbytes:
+                self._masks[key] = line
+                self.currbytes += size
+
+                while self.currbytes > self.maxbytes:
+                    _, evicted = self._masks.popitem(last=False)
+                    self.currbytes -= evicted.mask.width * evicted.mask.height
+
+        return line
+
+    def info(self) -> MaskCacheInfo:
+        with self._lock:
+            return MaskCacheInfo(
+                hits=self.hits,
+                misses=self.misses,
+                maxbytes=self.maxbytes,
+                currbytes=self.currbytes,
+                currsize=len(self._masks),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._masks.clear()
+            self.currbytes = 0
+            self.hits = 0
+            self.misses = 0
+
+
+# Process-wide cache shared by every render
+masks = MaskCache()
+
+
+def rollover(
+    text: str,
+    area_name: str,
+    font: ImageFont.FreeTypeFont,
+    wh: list,
+    raise_err: bool = False,
+) -> list:
+    return get_layout(font).rollover(
+        text=text, wh=wh, area_name=area_name, raise_err=raise_err
+    )
+
+
+def measure(
+    text: str, font: ImageFont.FreeTypeFont, wh: list, area_name: str = ""
+) -> list:
+    # Lays out text without drawing it, returning a LineBox for each line
+    layout = get_layout(font)
+    return layout.boxes(layout.rollover(text=text, wh=wh, area_name=area_name))
@@ -0,0 +1,273 @@
+from bisect import bisect_left
+from collections import namedtuple
+from threading import Lock
+from time import perf_counter
+
+# area: name of the area, or None for the render as a whole
+# type: type of the area, or None for the render as a whole
+# stage: what was done, see Timer
+# start: perf_counter() when the stage started
+# duration: seconds the stage took
+# pixels: pixels in the image the stage produced, 0 if it produced none
+# nbytes: bytes allocated for that image, 0 if it produced none
+# detail: dictionary of anything else known about the stage, or None
+Event = namedtuple(
+    "Event",
+    ["area", "type", "stage", "start", "duration", "pixels", "nbytes", "detail"],
+)
+
+# Durations in seconds
+Summary = namedtuple("Summary", ["count", "mean", "p50", "p90", "p99", "max"])
+
+
+def footprint(image) -> tuple:
+    # Returns the (pixels, bytes) of an image, or (0, 0) if there is none
+    if image is None:
+        return 0, 0
+
+    pixels = image.width * image.height
+    return pixels, pixels * len(image.getbands())
+
+
+class Timer:
+    """Times the stages of rendering a single area, sending an Event per stage.
+
+    Each stage lasts from the end of the previous one (or the timer's creation)
+    until lap is called. Areas start with a "start" event and end with an "area"
+    event covering them entirely. Stages in between are "subimage", "fit",
+    "layout", "draw", "cache", "resize", "filter", "opacity", "rotate", "mask"
+    and "composite", depending on the area's type, options and what is cached.
+    """
+
+    def __init__(self, hook, area_name: str, area_type: str):
+        self.hook = hook
+        self.area_name = area_name
+        self.area_type = area_type
+
+        self.started = self._last = perf_counter()
+        self.lap("start")
+
+    def lap(self, stage: str, image=None, **detail) -> None:
+        now = perf_counter()
+        pixels, nbytes = footprint(image)
+
+        self.hook(
+            Event(
+                area=self.area_name,
+                type=self.area_type,
+                stage=stage,
+                start=self._last,
+                duration=now - self._last,
+                pixels=pixels,
+                nbytes=nbytes,
+                detail=detail or None,
+            )
+        )
+
+        self._last = now
+
+    def finish(self, image=None) -> None:
+        self._last = self.started
+        self.lap("area", image)
+
+
+def timer(hook, suppress: bool, area_name: str, area_type: str) -> Timer:
+    # Returns a timer for an area, or None if nothing would receive its events.
+    # Renders check for None before timing anything, so they cost nothing extra
+    # without a hook.
+    if not suppress:
+        hook = console if hook is None else chain(console, hook)
+
+    if hook is None:
+        return None
+
+    return Timer(hook, area_name=area_name, area_type=area_type)
+
+
+def render_event(started: float, image) -> Event:
+    # Returns the event covering an entire render, which started at started
+    pixels, nbytes = footprint(image)
+
+    return Event(
+        area=None,
+        type=None,
+        stage="render",
+        start=started,
+        duration=perf_counter() - started,
+        pixels=pixels,
+        nbytes=nbytes,
+        detail=None,
+    )
+
+
+def chain(*hooks):
+    # Returns a hook sending events to each of hooks in order
+    def chained(event: Event) -> None:
+        for hook in hooks:
+            hook(event)
+
+    return chained
+
+
+# Messages printed by console for stages of each area type
+_messages = {
+    "start": "\nOperating on area {area}. ({type})",
+    "subimage": "  Creating subimage... DONE",
+    "fit": (
+        "  Calculating minimum font size... DONE "
+        "({iterations}, {font_size} -> {size})   "
+    ),
+    "layout": "  Calculating rollover... DONE",
+    "draw": "  Drawing text... DONE",
+    "resize": "  Resizing image... DONE",
+    "filter": "  Applying filter to image... DONE",
+    "area": "  All operations complete.",
+}
+
+_type_messages = {
+    ("text", "rotate"): "  Rotating subimage... DONE",
+    ("image", "rotate"): "  Adjusting image... DONE",
+    ("text", "composite"): "  Pressing subimage into image... DONE",
+    ("image", "composite"): "  Pasting image onto target... DONE",
+    ("layer", "composite"): "  Pasting image onto target... DONE",
+}
+
+
+def console(event: Event) -> None:
+    # Prints the progress of each area, which is what operate shows unless
+    # suppressed
+    message = _type_messages.get((event.type, event.stage))
+
+    if message is None:
+        message = _messages.get(event.stage)
+
+    if message is not None:
+        print(message.format(area=event.area, type=event.type, **event.detail or {}))
+
+
+def _percentile(durations: list, q: float) -> float:
+    rank = -(-q * len(durations) // 100)  # Rounded up
+    return durations[min(max(int(rank), 1), len(durations)) - 1]
+
+
+class Aggregator:
+    """A hook collecting the durations of events to summarise them.
+
+    Durations are grouped by (area, stage), with the render as a whole under
+    (None, "render"). Use one aggregator per template to get its percentiles.
+    """
+
+    def __init__(self):
+        self._durations = {}
+        self._lock = Lock()
+
+    def __call__(self, event: Event) -> None:
+        key = (event.area, event.stage)
+
+        with self._lock:
+            durations = self._durations.get(key)
+
+            if durations is None:
+                durations = self._durations[key] = []
+
+            durations.append(event.duration)
+
+    def percentile(self, area_name: str, stage: str, q: float) -> float:
+        # Nearest-rank percentile of the durations of a stage, q being 0 to 100
+        with self._lock:
+            durations = sorted(self._durations[(area_name, stage)])
+
+        return _percentile(durations, q)
+
+    def summary(self) -> dict:
+        # Returns a Summary for each (area, stage)
+        with self._lock:
+            grouped = {key: sorted(value) for key, value in self._durations.items()}
+
+        return {
+            key: Summary(
+                count=len(durations),
+                mean=sum(durations) / len(durations),
+                p50=_percentile(durations, 50),
+                p90=_percentile(durations, 90),
+                p99=_percentile(durations, 99),
+                max=durations[-1],
+            )
+            for key, durations in grouped.items()
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._durations.clear()
+
+
+class Histogram:
+    """Counts of durations by bucket, summarising any number of them in fixed memory.
+
+    bounds are the upper bounds of the buckets in seconds, with a last bucket for
+    anything longer. By default buckets grow by a fourth of a doubling from 0.1ms to
+    about 100 seconds, so percentiles, estimated as the upper bound of the bucket
+    they fall in (or the longest duration, if shorter), are within 19%.
+    """
+
+    _bounds = tuple(0.0001 * 2 ** (n / 4) for n in range(81))
+
+    def __init__(self, bounds: list = None):
+        self.bounds = self._bounds if bounds is None else tuple(sorted(bounds))
+        self._counts = [0] * (len(self.bounds) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._max = 0.0
+        self._lock = Lock()
+
+    def observe(self, duration: float) -> None:
+        with self._lock:
+            self._counts[bisect_left(self.bounds, duration)] += 1
+            self._count += 1
+            self._sum += duration
+            self._max = max(self._max, duration)
+
+    def __call__(self, event: Event) -> None:
+        # Observes the durations of events, when used as a hook
+        self.observe(event.duration)
+
+    def _percentile(self, q: float) -> float:
+        rank = max(-(-q * self._count // 100), 1)  # Rounded up
+        seen = 0
+
+        for bound, count in zip(self.bounds, self._counts):
+            seen += count
+
+            if seen >= rank:
+                return min(bound, self._max)
+
+        return self._max
+
+    def percentile(self, q: float) -> float:
+        # Estimated percentile of the durations, q being 0 to 100
+        with self._lock:
+            return self._percentile(q)
+
+    def summary(self) -> Summary:
+        with self._lock:
+            if not self._count:
+                return Summary(count=0, mean=0.0, p50=0.0, p90=0.0, p99=0.0, max=0.0)
+
+            return Summary(
+                count=self._count,
+                mean=self._sum / self._count,
+                p50=self._percentile(50),
+                p90=self._percentile(90),
+                p99=self._percentile(99),
+                max=self._max,
+            )
+
+    def buckets(self) -> list:
+        # Returns the (upper bound, count) of each non-empty bucket, the bound of
+        # the last being None
+        with self._lock:
+            return [
+                (bound, count)
+                for bound, count in zip(self.bounds + (None,), self._counts)
+                if count
+            ]
@@ -0,0 +1,153 @@
+from . import assets as Assets, compositing as Compositing, metrics as Metrics
+from . import internals as Internals
+from .placements import Placements
+from .printingpress import render_area
+from PIL import Image
+from time import perf_counter
+
+# Images are scaled as Image.thumbnail does, reduced by whole factors while more
+# than _reducing_gap times larger than their size, then resampled
+_resample = Image.BICUBIC
+_reducing_gap = 2.0
+
+
+def _size(size, scale: float) -> list:
+    return [max(1, round(side * scale)) for side in size]
+
+
+def _resize(image: Image.Image, scale: float) -> Image.Image:
+    return image.resize(
+        tuple(_size(image.size, scale)), _resample, reducing_gap=_reducing_gap
+    )
+
+
+def _reduced(source, image: Image.Image, wh: list) -> tuple:
+    # Returns the (source, image) to resize an image area's image from, reduced by
+    # a whole factor while it stays at least _reducing_gap times larger than the
+    # area. Reductions of images in the asset cache are cached with them.
+    factor = int(min(image.width / wh[0], image.height / wh[1]) // _reducing_gap)
+
+    if factor < 2:
+        return source, image
+
+    if source is None:
+        return None, image.reduce(factor)
+
+    key = (source, "reduce", factor)
+    reduced = Assets.cache.variant(key)
+
+    if reduced is None:
+        reduced = image.reduce(factor)
+        Assets.cache.put_variant(key, reduced)
+
+    return key, reduced
+
+
+def scale_area(area_data: tuple, scale: float) -> tuple:
+    # Returns a parsed area scaled by scale, as if its placement had been scaled
+    xy = [round(area_data.xy[0] * scale), round(area_data.xy[1] * scale)]
+
+    if area_data.type == "layer":
+        return area_data._replace(image=_resize(area_data.image, scale), xy=xy)
+
+    if area_data.type == "text":
+        return area_data._replace(
+            xy=xy,
+            wh=_size(area_data.wh, scale),
+            font_size=max(1, round(area_data.font_size * scale)),
+        )
+
+    source, image = area_data.source, area_data.image
+
+    if isinstance(image, Assets.LazyImage):  # Parsed lazily
+        source, image = image.load()
+
+    wh = _size(area_data.wh or image.size, scale)
+    source, image = _reduced(source, image, wh)
+    filter_data = area_data.filter_data
+
+    if area_data.filter is not None:  # Blur radii are in pixels
+        filter_data = [radius * scale for radius in filter_data]
+
+    return area_data._replace(
+        xy=xy, wh=wh, image=image, source=source, filter_data=filter_data
+    )
+
+
+def render_scales(
+    image: Image.Image,
+    placements: dict,
+    scales: list,
+    lazy: bool = False,
+    suppress: bool = False,
+    hook=None,
+    compositor: str = "pillow",
+) -> list:
+    """Renders placements onto image at each of scales, returning an image for each.
+
+    scales are factors of image's size, so a thumbnail 320 pixels wide is
+    320 / image.width. placements may be parsed (such as by Template.resolve) or
+    not, in which case they are parsed once for every scale. Images at scale 1 are
+    identical to operate's.
+
+    Areas are scaled as their placements would be, so text is laid out (and
+    fitted) at each scale with its font size and textbox scaled, and drawn as
+    operate draws placements scaled by hand. Text stays crisp at small scales,
+    but may break lines (or fit at a size) other than the full size's. The base
+    image, flattened layers and the images of image areas are reduced by whole
+    factors before resampling, as Image.thumbnail does, and reductions of decoded
+    images are cached.
+    """
+    assert isinstance(image, Image.Image), "Passed image parameter is not a PIL Image"
+
+    if Internals.unparsed(placements):
+        placements = Placements.parse(placements, lazy=lazy)
+
+    areas = [
+        (area_name, area_data)
+        for area_name, area_data in placements.items()
+        if area_name != ".meta"
+    ]
+    # Scales are rendered largest first, each base being resized from the smallest
+    # base made so far that is larger, rather than from image every time
+    renders = {}
+    bases = [(1, image)]
+
+    for scale in sorted(set(scales), reverse=True):
+        if hook is not None:
+            started = perf_counter()
+
+        if scale == 1:
+            base = image
+        else:
+            larger = [base for size, base in bases if size > scale] or [image]
+            base = min(larger, key=lambda base: base.width).resize(
+                tuple(_size(image.size, scale)), _resample, reducing_gap=_reducing_gap
+            )
+            bases.append((scale, base))
+
+        presser = Compositing.presser(base, compositor=compositor)
+
+        for area_name, area_data in areas:
+            if scale != 1:
+                area_data = scale_area(area_data, scale)
+
+            timer = Metrics.timer(
+                hook, suppress=suppress, area_name=area_name, area_type=area_data.type
+            )
+
+            layer = render_area(area_name=area_name, area_data=area_data, timer=timer)
+            presser.press(
+                layer=layer, xy=tuple(area_data.xy), beneath=area_data.beneath
+            )
+
+            if timer is not None:
+                timer.lap("composite", layer)
+                timer.finish(layer)
+
+        renders[scale] = presser.finish()
+
+        if hook is not None:
+            hook(Metrics.render_event(started, renders[scale]))
+
+    return [renders[scale] for scale in scales]
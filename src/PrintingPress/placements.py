@@ -1,35 +1,187 @@
-from . import internals as Internals
+from . import assets as Assets, exceptions, fonts as Fonts
 from collections import namedtuple
-from PIL import ImageFont, Image
+from os import getcwd
+from PIL import Image
 from pathlib import Path
 
+# Filters of image areas, with the types of the values their filter_data holds
+FILTERS = {"gaussian_blur": [int], "box_blur": [int]}
 
-def rgb_list_check(area_name: str, elem_name: str, target: list) -> None:
-    assert (
-        len(target) == 3
-    ), f"Area {area_name}: key {elem_name} has {len(target)} values (expected 3)"
 
-    for elem in target:
-        assert (
-            elem < 256
-        ), f"Area {area_name}: key {elem_name} has values that exceed 255"
+def rgb_list_check(area_name: str, elem_name: str, target: list, problems: list):
+    if len(target) != 3:
+        problems.append(
+            exceptions.Problem(
+                area_name,
+                elem_name,
+                f"key {elem_name} has {len(target)} values (expected 3)",
+            )
+        )
+        return target
+
+    try:
+        exceeds = not all(elem < 256 for elem in target)
+    except TypeError:
+        exceeds = True
+
+    if exceeds:
+        problems.append(
+            exceptions.Problem(
+                area_name, elem_name, f"key {elem_name} has values that exceed 255"
+            )
+        )
+
+    return target
+
 
+def pair_check(area_name: str, elem_name: str, target: list, problems: list):
+    if len(target) != 2:
+        problems.append(
+            exceptions.Problem(
+                area_name,
+                elem_name,
+                f"key {elem_name} has {len(target)} values (expected 2)",
+            )
+        )
+
+    return target
 
-def filter_list_check(area_name: str, filter_name: str, target: list) -> None:
-    filter_map = {"gaussian_blur": [int], "box_blur": [int]}
 
-    filter_target_mapping = filter_map[filter_name]
+def filter_list_check(
+    area_name: str, filter_name: str, target: list, problems: list
+) -> None:
+    filter_target_mapping = FILTERS[filter_name]
 
     # Check list lengths
-    assert len(filter_target_mapping) == len(target), (
-        f"Area {area_name}: key filter_data has {len(target)} values "
-        f"(expected {len(filter_target_mapping)})"
-    )
+    if len(filter_target_mapping) != len(target):
+        problems.append(
+            exceptions.Problem(
+                area_name,
+                "filter_data",
+                f"key filter_data has {len(target)} values "
+                f"(expected {len(filter_target_mapping)})",
+            )
+        )
+
+    elif not all(
+        isinstance(actual, expected)
+        for expected, actual in zip(filter_target_mapping, target)
+    ):
+        problems.append(
+            exceptions.Problem(
+                area_name,
+                "filter_data",
+                "key filter_data has values with unexpected types",
+            )
+        )
+
+
+def _clamp(maximum: int):
+    def clamp(area_name: str, elem_name: str, target: int, problems: list) -> int:
+        return maximum if target > maximum else target
+
+    return clamp
+
+
+# (working directory, path as given): absolute path
+_absolute_paths = {}
+
+
+def _absolute(area_name: str, elem_name: str, target, problems: list):
+    # PIL Images may be passed as the path of image areas
+    if not isinstance(target, str):
+        return target
+
+    key = (getcwd(), target)
+    absolute = _absolute_paths.get(key)
+
+    if absolute is None:
+        if len(_absolute_paths) >= 4096:
+            _absolute_paths.clear()
+
+        absolute = _absolute_paths[key] = Path(target).absolute()
+
+    return absolute
+
+
+def compile_schema(area_type: str, schema: dict):
+    """Compiles a schema of Placements._parse_map into a validator.
+
+    Checks and error messages are worked out once per key, rather than for each
+    key of each area. The validator takes an area's name and dictionary and a
+    list of problems, and returns the area's validated keys (with fallbacks for
+    those missing or invalid), appending every problem it finds to problems.
+    """
+    fields = []
+
+    for elem, payload in schema.items():
+        if payload is None:
+            continue
+
+        expected, required, fallback = payload
+        checks = []
+
+        if "colour" in elem:
+            checks.append(rgb_list_check)
+
+        if elem == "rotation":
+            checks.append(_clamp(360))
+
+        if "opacity" in elem:
+            checks.append(_clamp(255))
+
+        if elem == "path":
+            checks.append(_absolute)
+
+        if elem == "xy" or elem == "wh":
+            checks.append(pair_check)
+
+        fields.append(
+            (
+                elem,
+                expected,
+                required,
+                fallback,
+                tuple(checks),
+                f"key {elem} is required",
+                f"key {elem} is type {{}}, but expected {expected}",
+            )
+        )
+
+    fields = tuple(fields)
 
-    for expected, actual in zip(filter_target_mapping, target):
-        assert isinstance(
-            actual, expected
-        ), f"Area {area_name}: key filter_data has values with unexpected types"
+    def validate(area_name: str, area_data: dict, problems: list) -> dict:
+        parsed_area = {"type": area_type}
+
+        for elem, expected, required, fallback, checks, missing, mistyped in fields:
+            try:
+                retrieved = area_data[elem]
+
+            except KeyError:
+                if required:
+                    problems.append(exceptions.Problem(area_name, elem, missing))
+
+                parsed_area[elem] = fallback
+                continue
+
+            if not isinstance(retrieved, expected):
+                problems.append(
+                    exceptions.Problem(
+                        area_name, elem, mistyped.format(type(retrieved))
+                    )
+                )
+
+                parsed_area[elem] = fallback
+                continue
+
+            for check in checks:
+                retrieved = check(area_name, elem, retrieved, problems)
+
+            parsed_area[elem] = retrieved
+
+        return parsed_area
+
+    return validate
 
 
 class Placements:
@@ -46,6 +198,7 @@ class Placements:
             "rotation": [int, False, 0],
             "beneath": [bool, False, False],
             "image": None,
+            "source": None,
         },
         "text": {
             "type": None,
@@ -66,155 +219,206 @@ class Placements:
         },
     }
 
+    # Namedtuples declare empty __slots__, so parsed areas are plain tuples without
+    # a dictionary per instance
     _image_area = namedtuple("ImageArea", _parse_map["image"])
     _text_area = namedtuple("TextArea", _parse_map["text"])
 
-    def parse(places: dict) -> dict:
-        assert isinstance(places, dict), "Non-dictionary passed in"
+    # Validators compiled from _parse_map, for each area type
+    _validators = {
+        area_type: compile_schema(area_type, schema)
+        for area_type, schema in _parse_map.items()
+    }
+
+    def parse(places: dict, lazy: bool = False, draft: bool = False) -> dict:
+        # With lazy, areas are validated (including that their files exist), but
+        # fonts and images are only loaded when first rendered. With draft, JPEG
+        # images are decoded at the smallest scale still at least their wh.
+        # Every area is validated before any are loaded, and if any are invalid,
+        # a PlacementsError listing every problem found is raised.
+        if not isinstance(places, dict):
+            raise exceptions.PlacementsError(
+                [exceptions.Problem(None, None, "Non-dictionary passed in")]
+            )
 
-        # Skips .meta
-        parsed_places = {".meta": places.pop(".meta")} if ".meta" in places else {}
+        problems = []
+        validated = {
+            area_name: Placements.validate_area(area_name, area_data, problems)
+            for area_name, area_data in places.items()
+            if area_name != ".meta"
+        }
 
-        for area_name, area_data in places.items():
-            parsed_area = {}
+        if problems:
+            raise exceptions.PlacementsError(problems)
 
-            parsed_area["type"] = Internals.retrieve_key(
-                target=area_data,
-                key="type",
-                expected=str,
-                required=True,
-                extra=f" (area {area_name})",
-            )
+        # Skips .meta, without removing it from the passed in dictionary
+        parsed_places = {".meta": places[".meta"]} if ".meta" in places else {}
 
-            # Asserts if parsed_area['type'] is not image or text
-            assert any(
-                [parsed_area["type"] == "image", parsed_area["type"] == "text"]
-            ), (
-                f'Area {area_name}: key type has to be "image" or "text", '
-                f'not "{parsed_area["type"]}"'
+        for area_name, parsed_area in validated.items():
+            parsed_places[area_name] = Placements.load_area(
+                area_name=area_name, parsed_area=parsed_area, lazy=lazy, draft=draft
             )
 
-            # Loops through the area-specific mapping and does type/availability checks
-            for elem, payload in Placements._parse_map[parsed_area["type"]].items():
-                if payload is not None:
-                    retrieved = Internals.retrieve_key(
-                        target=area_data,
-                        key=elem,
-                        expected=payload[0],
-                        required=payload[1],
-                        fallback=payload[2],
-                        extra=f" (area {area_name})",
-                    )
+        return parsed_places
 
-                    if "colour" in elem and retrieved is not None:
-                        rgb_list_check(
-                            area_name=area_name, elem_name=elem, target=retrieved
-                        )
+    def parse_area(
+        area_name: str,
+        area_data: dict,
+        reuse: tuple = None,
+        lazy: bool = False,
+        draft: bool = False,
+    ) -> tuple:
+        # Parses a single area. If reuse is given, the font or image already loaded
+        # for that parsed area is used rather than loading it again, so it should
+        # only be passed if the keys the font or image was loaded from are unchanged.
+        problems = []
+        parsed_area = Placements.validate_area(area_name, area_data, problems)
+
+        if problems:
+            raise exceptions.PlacementsError(problems)
+
+        return Placements.load_area(
+            area_name=area_name,
+            parsed_area=parsed_area,
+            reuse=reuse,
+            lazy=lazy,
+            draft=draft,
+        )
+
+    def validate_area(area_name: str, area_data: dict, problems: list) -> dict:
+        # Returns the validated keys of an area without loading anything, appending
+        # any problems found to problems
+        if not isinstance(area_data, dict):
+            problems.append(
+                exceptions.Problem(
+                    area_name, None, f"is type {type(area_data)}, but expected {dict}"
+                )
+            )
+            return None
 
-                    if elem == "rotation" and retrieved > 360:
-                        retrieved = 360
+        area_type = area_data.get("type")
 
-                    if "opacity" in elem and retrieved is not None:
-                        retrieved = 255 if retrieved > 255 else retrieved
+        if "type" not in area_data:
+            message = "key type is required"
+        elif not isinstance(area_type, str):
+            message = f"key type is type {type(area_type)}, but expected {str}"
+        elif area_type not in Placements._validators:
+            message = f'key type has to be "image" or "text", not "{area_type}"'
+        else:
+            message = None
 
-                    if elem == "path" and isinstance(retrieved, str):
-                        retrieved = Path(retrieved).absolute()
+        if message is not None:
+            problems.append(exceptions.Problem(area_name, "type", message))
+            return None
 
-                    if elem == "xy" or elem == "wh":
-                        assert len(retrieved) == 2, (
-                            f"Area {area_name}: key {elem} has {len(retrieved)} values "
-                            "(expected 2)"
-                        )
+        parsed_area = Placements._validators[area_type](area_name, area_data, problems)
 
-                    parsed_area[elem] = retrieved
+        path = parsed_area["path"]
 
-            if parsed_area["type"] == "text":  # Text-specific post-parse operations
-                assert parsed_area[
-                    "path"
-                ].is_file(), f'Area {area_name}: {parsed_area["path"]} is non-existant'
+        if isinstance(path, Path) and not path.is_file():
+            problems.append(
+                exceptions.Problem(area_name, "path", f"{path} is non-existant")
+            )
 
-                # Create PIL Font Object
-                font = ImageFont.FreeTypeFont(
-                    font=str(parsed_area["path"]), size=parsed_area["font_size"]
-                )
+        if area_type == "image":
+            if parsed_area["filter"] not in FILTERS:
+                parsed_area["filter"] = None
 
-                # Retrieve font_variant key value
-                font_variant = Internals.retrieve_key(
-                    target=parsed_area, key="font_variant", expected=(str, type(None))
+            else:
+                filter_list_check(
+                    area_name=area_name,
+                    filter_name=parsed_area["filter"],
+                    target=parsed_area["filter_data"],
+                    problems=problems,
                 )
 
-                # Attempt to set font_variant
-                if font_variant is not None:
-                    try:
-                        font.set_variation_by_name(bytes(font_variant, "utf-8"))
-                    except Exception as e:
-                        print(
-                            f"Area: {area_name}: font_variant is invalid, continuing. "
-                            f"({e})"
-                        )
-
-                # Add font into parsed_area
-                parsed_area["font"] = font
-
-                # Retrieve bg_colour key value
-                bg_colour = Internals.retrieve_key(
-                    target=parsed_area,
-                    key="bg_colour",
-                    expected=(list, type(None)),
-                    fallback=[0, 0, 0],
+        return parsed_area
+
+    def load_area(
+        area_name: str,
+        parsed_area: dict,
+        reuse: tuple = None,
+        lazy: bool = False,
+        draft: bool = False,
+    ) -> tuple:
+        # Loads the font or image of an area's validated keys, returning it parsed
+        if parsed_area["type"] == "text":  # Text-specific post-parse operations
+            font_variant = parsed_area["font_variant"]
+
+            if reuse is not None:  # Take the font from an area parsed before
+                font = reuse.font
+                parsed_area["font_variant"] = reuse.font_variant
+
+            elif lazy:  # Construct the font when first rendered
+                font = Fonts.LazyFont(
+                    path=parsed_area["path"],
+                    size=parsed_area["font_size"],
+                    variant=font_variant,
+                    area_name=area_name,
                 )
 
-                # Retrieve bg_opacity key value
-                bg_opacity = Internals.retrieve_key(
-                    target=parsed_area,
-                    key="bg_opacity",
-                    expected=(int, type(None)),
-                    fallback=255,
+            else:
+                # Retrieve PIL Font Object, attempting to set font_variant
+                font, parsed_area["font_variant"] = Fonts.load_font(
+                    path=parsed_area["path"],
+                    size=parsed_area["font_size"],
+                    variant=font_variant,
+                    area_name=area_name,
                 )
 
-                # Set background opacity to 0 if bg colour is 0, 0, 0
-                if bg_colour is None:
-                    parsed_area["bg_colour"] = [0, 0, 0]
+            # Add font into parsed_area
+            parsed_area["font"] = font
 
-                    if bg_opacity is None:
-                        parsed_area["bg_opacity"] = 0
+            bg_colour = parsed_area["bg_colour"]
+            bg_opacity = parsed_area["bg_opacity"]
 
-                elif bg_colour is not None and bg_opacity is None:
-                    parsed_area["bg_opacity"] = 255
+            # Set background opacity to 0 if bg colour is 0, 0, 0
+            if bg_colour is None:
+                parsed_area["bg_colour"] = [0, 0, 0]
 
-                # Create namedtuple
-                parsed_places[area_name] = Placements._text_area(**parsed_area)
+                if bg_opacity is None:
+                    parsed_area["bg_opacity"] = 0
 
-            else:  # Image-specific post-parse operations
-                if isinstance(parsed_area["path"], Image.Image):
-                    # Users can pass PIL Images into the path key if constructing
-                    # a placement dictionary in Python rather than from a JSON file.
-                    # le. So, if this happens just use the image from the path key.
-                    parsed_area["image"] = parsed_area["path"]
+            elif bg_colour is not None and bg_opacity is None:
+                parsed_area["bg_opacity"] = 255
 
-                else:
-                    assert parsed_area[
-                        "path"
-                    ].is_file(), (
-                        f'Area {area_name}: {parsed_area["path"]} is non-existant'
-                    )
+            # Create namedtuple
+            return Placements._text_area(**parsed_area)
 
-                    # Else, create a PIL Image Object from the path given
-                    parsed_area["image"] = Image.open(parsed_area["path"]).convert(
-                        "RGBA"
-                    )
+        else:  # Image-specific post-parse operations
+            # Key of the image in the asset cache, None if it was not loaded there
+            parsed_area["source"] = None
 
-                if str(parsed_area["filter"]) not in ["gaussian_blur", "box_blur"]:
-                    parsed_area["filter"] = None
+            if reuse is not None:  # Take the image from an area parsed before
+                parsed_area["image"] = reuse.image
+                parsed_area["source"] = reuse.source
 
-                else:
-                    filter_list_check(
-                        area_name=area_name,
-                        filter_name=parsed_area["filter"],
-                        target=parsed_area["filter_data"],
+            elif isinstance(parsed_area["path"], Image.Image):
+                # Users can pass PIL Images into the path key if constructing
+                # a placement dictionary in Python rather than from a JSON file.
+                # le. So, if this happens just use the image from the path key.
+                parsed_area["image"] = parsed_area["path"]
+
+                # Loading is not thread-safe, so it is done before any rendering
+                parsed_area["image"].load()
+
+            else:
+                # JPEG images are decoded at a reduced scale if drafted
+                draft_wh = None
+
+                if draft and parsed_area["wh"] is not None:
+                    draft_wh = tuple(parsed_area["wh"])
+
+                if lazy:  # Decode the image when first rendered
+                    parsed_area["image"] = Assets.LazyImage(
+                        parsed_area["path"], draft=draft_wh
                     )
 
-                # Create namedtuple
-                parsed_places[area_name] = Placements._image_area(**parsed_area)
+                else:
+                    # Else, take the PIL Image Object decoded from the path given
+                    parsed_area["source"], parsed_area["image"] = Assets.open_image(
+                        parsed_area["path"], draft=draft_wh
+                    )
 
-        return parsed_places
+            # Create namedtuple
+            return Placements._image_area(**parsed_area)
@@ -1,307 +1,345 @@
 # PrintingPress, by hysrx
 
-from PIL import Image, ImageFont, ImageDraw, ImageFilter
-from . import internals as Internals, exceptions
+from PIL import Image, ImageDraw, ImageFilter
+from time import perf_counter
+from . import assets as Assets, compositing as Compositing, metrics as Metrics
+from . import encoding as Encoding, fit as Fit, fonts as Fonts, layout as Layout
 
 
-def operate(
-    image: Image.Image, placements: dict, suppress: bool = False
+# (fill, background): bands of the colour drawn over the background at each coverage
+_ink_tables = {}
+
+
+def _ink_table(fill: tuple, background: tuple) -> list:
+    # Draws every coverage of fill over background as operate always has, onto a
+    # transparent holder composited onto the background, so masks coloured through
+    # the table give the same pixels
+    table = _ink_tables.get((fill, background))
+
+    if table is None:
+        coverage = Image.new("L", (256, 1))
+        coverage.putdata(range(256))
+
+        holder = Image.new("RGBA", (256, 1))
+        ImageDraw.Draw(holder).bitmap((0, 0), coverage, fill=fill)
+        drawn = Image.alpha_composite(Image.new("RGBA", (256, 1), background), holder)
+
+        if len(_ink_tables) >= 1024:
+            _ink_tables.clear()
+
+        table = _ink_tables[(fill, background)] = [
+            list(band.tobytes()) for band in drawn.split()
+        ]
+
+    return table
+
+
+def _overlapping(lines: list) -> bool:
+    boxes = [
+        (x, y, x + mask.width, y + mask.height)
+        for mask, (x, y) in lines
+        if mask.width and mask.height
+    ]
+
+    return any(
+        box[0] < other[2] and other[0] < box[2] and box[1] < other[3]
+        and other[1] < box[3]
+        for number, box in enumerate(boxes)
+        for other in boxes[number + 1:]
+    )
+
+
+def _draw_lines(
+    subimage: Image.Image, lines: list, fill: tuple, background: tuple
 ) -> Image.Image:
-    assert isinstance(image, Image.Image), "Passed image parameter is not a PIL Image"
+    # Draws the (mask, xy) of each line in fill onto subimage, which is filled with
+    # background. Lines apart are
+    # coloured through the ink table and pasted in place, which only touches the
+    # pixels under them. Lines overlapping are drawn onto a holder, as drawing one
+    # line over another blends them.
+    if _overlapping(lines):
+        holder = Image.new("RGBA", subimage.size)
+        drawer = ImageDraw.Draw(holder)
+
+        for mask, xy in lines:
+            if mask.width and mask.height:
+                drawer.bitmap(xy, mask, fill=fill)
+
+        return Image.alpha_composite(subimage, holder)
+
+    table = _ink_table(fill, background)
+
+    for mask, xy in lines:
+        if mask.width and mask.height:
+            subimage.paste(
+                Image.merge("RGBA", [mask.point(band) for band in table]), xy
+            )
 
-    if "A" not in image.mode:
-        image = image.convert("RGBA")
+    return subimage
 
-    suppress = not suppress  # negate for condition in Internals.print_if
 
-    if ".meta" in placements:
-        placements.pop(".meta")
+def render_text(
+    area_name: str, area_data: tuple, timer: Metrics.Timer = None
+) -> Image.Image:
+    # Subimage creation
+    background = tuple(area_data.bg_colour) + tuple([area_data.bg_opacity])
+    subimage = Image.new(mode="RGBA", size=tuple(area_data.wh), color=background)
+
+    if timer is not None:
+        timer.lap("subimage", subimage)
+
+    variant = area_data.font_variant
+
+    if isinstance(area_data.font, Fonts.LazyFont):  # Parsed lazily
+        area_data.font.load()
+        variant = area_data.font.variant
+
+    # Rollover/Fit Calculation
+    if area_data.fit:
+        fit = Fit.solve(
+            text=area_data.text,
+            path=area_data.path,
+            size=area_data.font_size,
+            variant=variant,
+            wh=area_data.wh,
+            area_name=area_name,
+        )
+        font = Fonts.get_font(path=area_data.path, size=fit.size, variant=variant)
+        text = fit.lines
+
+        if timer is not None:
+            timer.lap(
+                "fit",
+                iterations=fit.iterations,
+                font_size=area_data.font_size,
+                size=fit.size,
+            )
 
-    for area_name, area_data in placements.items():
-        Internals.print_if(
-            f"\nOperating on area {area_name}. ({area_data.type})", condition=suppress
+    else:
+        # The parsed font may belong to another thread, so this thread's is used
+        font = Fonts.get_font(
+            path=area_data.path,
+            size=area_data.font_size,
+            variant=variant,
+        )
+        text = Layout.rollover(
+            text=area_data.text, area_name=area_name, font=font, wh=area_data.wh
+        )
+
+        if timer is not None:
+            timer.lap("layout", lines=len(text))
+
+    # Draw Text. Lines are rasterised into masks once per font and text, and
+    # coloured as they are drawn.
+    font_key = (Fonts.cache.resolve(area_data.path), font.size, variant)
+    lines = []
+
+    x, y = 0, 0
+
+    layout = Layout.get_layout(font)
+
+    for line_no, line in enumerate(text):
+        # TODO: Support ltr or centered text by changing x coords
+        hoff, voff, _, txth = layout.measure(line)
+
+        if line_no == 0:
+            x = 0 - hoff
+            y = 0 - font.font.descent
+
+        mask, offset = Layout.masks.get(font, font_key, " ".join(line))
+        lines.append((mask, (x + offset[0], y + offset[1])))
+
+        y += txth + font.font.descent
+
+    fill = tuple(area_data.font_colour) + tuple([area_data.font_opacity])
+    subimage = _draw_lines(subimage, lines, fill, background)
+
+    if timer is not None:
+        timer.lap("draw", subimage)
+
+    # Rotate subimage
+    subimage = subimage.rotate(area_data.rotation, expand=True)
+
+    if timer is not None:
+        timer.lap("rotate", subimage)
+
+    return subimage
+
+
+def render_image(
+    area_name: str, area_data: tuple, timer: Metrics.Timer = None
+) -> Image.Image:
+    # Images decoded into the asset cache have their variants cached as well, keyed
+    # by the transforms made to them. Filtering is keyed separately from adjusting,
+    # so changing only the opacity or rotation does not filter again.
+    filtered_key = adjusted_key = None
+    image, source = area_data.image, area_data.source
+
+    if isinstance(image, Assets.LazyImage):  # Parsed lazily
+        source, image = image.load()
+
+    if source is not None:
+        filtered_key = (
+            source,
+            None if area_data.wh is None else tuple(area_data.wh),
+            area_data.filter,
+            None if area_data.filter is None else tuple(area_data.filter_data),
         )
+        adjusted_key = filtered_key + (area_data.opacity, area_data.rotation)
+
+        area_image = Assets.cache.variant(adjusted_key)
+
+        if area_image is not None:
+            if timer is not None:
+                timer.lap("cache", area_image)
+
+            return area_image
+
+        area_image = Assets.cache.variant(filtered_key)
+
+        if area_image is not None:
+            if timer is not None:
+                timer.lap("cache", area_image)
+
+            return _adjust_image(area_data, area_image.copy(), adjusted_key, timer)
+
+    if area_data.wh is not None:
+        # Resize Image
+        area_image = image.resize(area_data.wh)
 
-        if area_data.type == "text":  # Text-based operation
-
-            def rollover(
-                text: str,
-                area_name: str,
-                font: ImageFont.ImageFont,
-                wh: list,
-                raise_err: bool = False,
-            ) -> list:
-                # Rollover
-                max_width, max_height = wh
-
-                text = text.split()
-                words = len(text)
-
-                line_h_local = 0
-
-                lines = [[]]
-                line_h = [0]
-
-                # For more references:
-                # https://levelup.gitconnected.com/
-                # how-to-properly-calculate-text-size-in-pil-images-17a2cc6f51fd
-
-                for word in text:
-                    lines[-1].append(word)
-                    _, _, txtw, txth = font.getmask(" ".join(lines[-1])).getbbox()
-
-                    if txtw > max_width and words > 1:  # Too wide, rollover
-                        lines.append([lines[-1].pop(-1)])
-
-                        if line_h_local == 0:
-                            line_h_local = max([txth + font.font.descent, txth])
-
-                        line_h.append(line_h_local)
-                        line_h_local = 0
-
-                    elif txtw < max_width and words > 1:
-                        line_h[-1] = max([txth + font.font.descent, txth])
-
-                    elif words == 1:  # Special Treatment
-                        if txtw > max_width:  # Can't rollover, is one word
-                            if raise_err:
-                                raise exceptions.RolloverError()
-                            else:
-                                print(
-                                    f"Warning: Area {area_name}'s text exceeds the box "
-                                    "and will not be displayed properly. [Text: "
-                                    f"({txtw}, {txth}), Box: {wh}]"
-                                )
-
-                    height_conditions = [
-                        sum(line_h) > max_height,
-                        line_h_local > max_height,
-                    ]
-
-                    if any(height_conditions):
-                        if raise_err:
-                            # Too tall even after rollover, need to change font size
-                            # DEBUG: print('---- TOO TALL ----\n')
-                            raise exceptions.RolloverError()
-
-                        if words == 1:
-                            print(
-                                f"Warning: Area {area_name}'s text exceeds the box "
-                                f"and will not be displayed properly. [Text: ({txtw}, "
-                                f"{txth}), Box: {wh}]"
-                            )
-
-                        lines.pop(-1)
-                        try:
-                            lines[-1][-1] = "…"
-                        except IndexError:
-                            pass
-
-                if lines[0] == []:
-                    lines.pop(0)
-
-                return lines
-
-            # Subimage creation
-            Internals.print_if("  Creating subimage...", end="\r", condition=suppress)
-            subimage = Image.new(
-                mode="RGBA",
-                size=tuple(area_data.wh),
-                color=tuple(area_data.bg_colour) + tuple([area_data.bg_opacity]),
+        if timer is not None:
+            timer.lap("resize", area_image)
+
+    else:
+        area_image = image.copy()
+
+    if area_data.filter is not None:  # Filter Application
+        # Gaussian Blur
+        if area_data.filter == "gaussian_blur":
+            # filter_data = [radius]
+            area_image = area_image.filter(
+                ImageFilter.GaussianBlur(area_data.filter_data[0])
             )
-            Internals.print_if("  Creating subimage... DONE", condition=suppress)
-
-            # Rollover/Fit Calculation
-            if area_data.fit:
-                Internals.print_if(
-                    "  Calculating minimum font size...", end="\r", condition=suppress
-                )
-
-                def recreate(size: int = area_data.font_size) -> ImageFont.ImageFont:
-                    font = ImageFont.FreeTypeFont(font=str(area_data.path), size=size)
-                    try:
-                        area_data.font_variant
-                    except Exception:
-                        pass
-                    else:
-                        try:
-                            font.set_variation_by_name(area_data.font_variant)
-                        except Exception:
-                            pass
-                    return font
-
-                size = area_data.font_size
-                font = area_data.font
-                last_size = 0
-                tries = 1
-                iterator = size / 2
-                direction = 1
-
-                while True:
-                    try:
-                        if direction == 0:  # Iterate up
-                            size = int(size + iterator)
-                        else:  # Iterate down
-                            size = int(size - iterator)
-
-                        Internals.print_if(
-                            "  Calculating minimum font size... "
-                            f"({tries}, {area_data.font_size} -> {size})   ",
-                            end="\r",
-                            condition=suppress,
-                        )
-
-                        font = recreate(size)
-
-                        text = rollover(
-                            text=area_data.text,
-                            area_name=area_name,
-                            font=font,
-                            wh=area_data.wh,
-                            raise_err=True,
-                        )
-
-                    except exceptions.RolloverError:
-                        direction = 1
-
-                    else:
-                        if size == last_size:
-                            break
-
-                        direction = 0
-
-                    last_size = size
-                    iterator = round(iterator / 2, 1)
-                    tries += 1
-
-                Internals.print_if(
-                    "  Calculating minimum font size... DONE "
-                    f"({tries}, {area_data.font_size} -> {size})   ",
-                    condition=suppress,
-                )
-
-            else:
-                font = area_data.font
-                Internals.print_if(
-                    "  Calculating rollover...", end="\r", condition=suppress
-                )
-                text = rollover(
-                    text=area_data.text, area_name=area_name, font=font, wh=area_data.wh
-                )
-                Internals.print_if("  Calculating rollover... DONE", condition=suppress)
-
-            # Draw Text
-            Internals.print_if("  Drawing text...", end="\r", condition=suppress)
-
-            text_holder = Image.new(
-                mode="RGBA",
-                size=tuple(area_data.wh),
+        elif area_data.filter == "box_blur":
+            # filter_data = [radius]
+            area_image = area_image.filter(
+                ImageFilter.BoxBlur(area_data.filter_data[0])
             )
 
-            drawer = ImageDraw.Draw(text_holder)
-            fill = area_data.font_colour.copy()
-            fill.append(area_data.font_opacity)
+        if timer is not None:
+            timer.lap("filter", area_image, filter=area_data.filter)
 
-            x, y = 0, 0
+    if filtered_key is not None and (area_data.wh or area_data.filter):
+        Assets.cache.put_variant(filtered_key, area_image)
+        area_image = area_image.copy()  # as adjusting is done in place
 
-            for line_no, line in enumerate(text):
-                # TODO: Support ltr or centered text by changing x coords
-                text = " ".join(line)
-                hoff, voff, _, txth = font.getmask(text).getbbox()
+    return _adjust_image(area_data, area_image, adjusted_key, timer)
 
-                if line_no == 0:
-                    x = 0 - hoff
-                    y = 0 - font.font.descent
 
-                drawer.text(xy=(x, y), text=text, fill=tuple(fill), font=font)
+def _adjust_image(
+    area_data: tuple, area_image: Image.Image, key: tuple, timer: Metrics.Timer
+) -> Image.Image:
+    # Change Image Opacity
+    area_image.putalpha(area_data.opacity)
 
-                y += txth + font.font.descent
+    if timer is not None:
+        timer.lap("opacity", area_image)
 
-            subimage = Image.alpha_composite(subimage, text_holder)
+    # Rotate Image
+    area_image = area_image.rotate(area_data.rotation, expand=True)
 
-            Internals.print_if("  Drawing text... DONE", condition=suppress)
+    if timer is not None:
+        timer.lap("rotate", area_image)
 
-            # Rotate subimage
-            Internals.print_if("  Rotating subimage...", end="\r", condition=suppress)
-            subimage = subimage.rotate(area_data.rotation, expand=True)
-            Internals.print_if(
-                "  Rotating subimage... DONE", end="\r", condition=suppress
-            )
+    if key is not None:
+        Assets.cache.put_variant(key, area_image)
 
-            # Press subimage onto image
-            Internals.print_if(
-                "  Pressing subimage into image...", end="\r", condition=suppress
-            )
+    return area_image
 
-            # A holder image is neccesary as just pasting, if the subimage is
-            # transparent, image becomes transparent as well.
-            holder = Image.new("RGBA", image.size)
-            holder.paste(im=subimage, box=tuple(area_data.xy), mask=subimage)
-            if area_data.beneath:
-                image = Image.alpha_composite(holder, image)
-            else:
-                image = Image.alpha_composite(image, holder)
-
-            Internals.print_if(
-                "  Pressing subimage into image... DONE", condition=suppress
-            )
 
-        else:  # Image-based operation
-            if area_data.wh is not None:
-                # Resize Image
-                Internals.print_if("  Resizing image...", end="\r", condition=suppress)
-                area_image = area_data.image.resize(area_data.wh)
-                Internals.print_if("  Resizing image... DONE", condition=suppress)
-            else:
-                area_image = area_data.image.copy()
-
-            if area_data.filter is not None:  # Filter Application
-                Internals.print_if(
-                    "  Applying filter to image...", end="\r", condition=suppress
-                )
-
-                # Gaussian Blur
-                if area_data.filter == "gaussian_blur":
-                    # filter_data = [radius]
-                    area_image = area_image.filter(
-                        ImageFilter.GaussianBlur(area_data.filter_data[0])
-                    )
-                elif area_data.filter == "box_blur":
-                    # filter_data = [radius]
-                    area_image = area_image.filter(
-                        ImageFilter.BoxBlur(area_data.filter_data[0])
-                    )
-
-                Internals.print_if(
-                    "  Applying filter to image... DONE", condition=suppress
-                )
-
-            Internals.print_if("  Adjusting image...", end="\r", condition=suppress)
-
-            # Change Image Opacity
-            area_image.putalpha(area_data.opacity)
-
-            # Rotate Image
-            area_image = area_image.rotate(area_data.rotation, expand=True)
-            Internals.print_if("  Adjusting image... DONE", condition=suppress)
-
-            # Paste Image
-            Internals.print_if(
-                "  Pasting image onto target...", end="\r", condition=suppress
-            )
+def render_area(
+    area_name: str, area_data: tuple, timer: Metrics.Timer = None
+) -> Image.Image:
+    # Renders an area into the layer that is pressed onto the operating image at the
+    # area's xy coordinates.
+    if area_data.type == "layer":  # Already rendered
+        return area_data.image
+
+    if area_data.type == "text":
+        # The subimage is pressed through a layer, as just pasting a transparent
+        # subimage would make the image transparent as well.
+        layer = Compositing.masked_layer(
+            render_text(area_name=area_name, area_data=area_data, timer=timer)
+        )
 
-            holder = Image.new(mode="RGBA", size=image.size)
-            holder.paste(im=area_image, box=tuple(area_data.xy))
+        if timer is not None:
+            timer.lap("mask", layer)
 
-            if area_data.beneath:
-                image = Image.alpha_composite(holder, image)
-            else:
-                image = Image.alpha_composite(image, holder)
+        return layer
 
-            Internals.print_if(
-                "  Pasting image onto target... DONE", condition=suppress
-            )
+    return render_image(area_name=area_name, area_data=area_data, timer=timer)
+
+
+def operate(
+    image: Image.Image,
+    placements: dict,
+    suppress: bool = False,
+    hook=None,
+    compositor: str = "pillow",
+    format: str = None,
+    file=None,
+    **params,
+):
+    """Renders placements onto a copy of image.
+
+    hook, if given, is called with a Metrics.Event for each stage of rendering each
+    area, and once for the render as a whole. Unless suppressed, the progress of
+    each area is printed as well.
+
+    With compositor "numpy", areas are composited together in a single pass over
+    the image once all are rendered (see Compositing.ArrayPresser), or as usual if
+    NumPy is not installed.
+
+    The rendered image is returned, unless format is given, in which case it is
+    encoded as format by Encoding.encode, with file and params (such as preset)
+    passed to it, and the bytes (or number of bytes written into file) returned.
+    params and file without format raise TypeError.
+    """
+    assert isinstance(image, Image.Image), "Passed image parameter is not a PIL Image"
+
+    # Checked before rendering, as they would otherwise be ignored
+    if format is None and (params or file is not None):
+        given = sorted(params) + (["file"] if file is not None else [])
+        raise TypeError(f"{', '.join(given)} given without format to encode as")
+
+    if hook is not None:
+        started = perf_counter()
+
+    presser = Compositing.presser(image, compositor=compositor)
+
+    for area_name, area_data in placements.items():
+        if area_name == ".meta":  # Skips .meta, leaving the placements untouched
+            continue
+
+        timer = Metrics.timer(
+            hook, suppress=suppress, area_name=area_name, area_type=area_data.type
+        )
+
+        layer = render_area(area_name=area_name, area_data=area_data, timer=timer)
+
+        # Press layer onto image
+        presser.press(layer=layer, xy=tuple(area_data.xy), beneath=area_data.beneath)
+
+        if timer is not None:
+            timer.lap("composite", layer)
+            timer.finish(layer)
+
+    image = presser.finish()
+
+    if hook is not None:
+        hook(Metrics.render_event(started, image))
 
-        Internals.print_if("  All operations complete.", condition=suppress)
+    if format is not None:
+        return Encoding.encode(image, format=format, file=file, hook=hook, **params)
 
     return image
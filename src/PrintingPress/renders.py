@@ -0,0 +1,330 @@
+from . import __version__, internals as Internals
+from .encoding import encode
+from .placements import Placements
+from .printingpress import operate
+from collections import OrderedDict, namedtuple
+from hashlib import sha256
+from json import dumps
+from os import fdopen, listdir, makedirs, path as os_path, remove, replace, stat, utime
+from PIL import Image
+from tempfile import mkstemp
+from threading import RLock
+
+CacheInfo = namedtuple(
+    "CacheInfo",
+    [
+        "memory_hits",
+        "disk_hits",
+        "misses",
+        "maxbytes",
+        "currbytes",
+        "currsize",
+        "maxdiskbytes",
+        "diskbytes",
+        "disksize",
+    ],
+)
+
+# Keys of parsed areas holding what was loaded, rather than what was given
+_loaded = {"font", "image", "source"}
+
+# (path, modification time, file size): digest of the file's contents
+_file_digests = {}
+
+
+def file_digest(path) -> str:
+    # Returns the SHA-256 digest of a file's contents, memoized until it changes
+    status = stat(path)
+    key = (str(path), status.st_mtime_ns, status.st_size)
+    digest = _file_digests.get(key)
+
+    if digest is None:
+        hashed = sha256()
+
+        with open(path, "rb") as rf:
+            for block in iter(lambda: rf.read(2 ** 20), b""):
+                hashed.update(block)
+
+        if len(_file_digests) >= 4096:
+            _file_digests.clear()
+
+        digest = _file_digests[key] = hashed.hexdigest()
+
+    return digest
+
+
+def image_digest(image: Image.Image) -> str:
+    hashed = sha256(f"{image.mode} {image.size}".encode())
+    hashed.update(image.tobytes())
+    return hashed.hexdigest()
+
+
+def _normalize(value):
+    # Replaces files and images with digests of their contents
+    if isinstance(value, Image.Image):
+        return {"image": image_digest(value)}
+
+    if isinstance(value, (list, tuple)):
+        return [_normalize(elem) for elem in value]
+
+    if isinstance(value, dict):
+        return {key: _normalize(elem) for key, elem in value.items()}
+
+    if isinstance(value, bytes):
+        return {"bytes": sha256(value).hexdigest()}
+
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+
+    return {"file": file_digest(value)}  # Paths, as resolved by Placements.parse
+
+
+def _normalize_area(area_data: tuple) -> dict:
+    # Areas already rendered into layers (see Template) are hashed by their layer
+    return {
+        key: _normalize(value)
+        for key, value in area_data._asdict().items()
+        if key not in _loaded or area_data.type == "layer"
+    }
+
+
+def render_key(image, placements: dict, **options) -> str:
+    """Returns a stable hash of everything rendering placements onto image uses.
+
+    image is a PIL Image or the path of one, and placements are parsed. Files and
+    images are hashed by content, and areas by their parsed keys (so defaults are
+    filled in), in order. options (such as the format and compositor) and the
+    library's version are hashed as well.
+    """
+    if isinstance(image, Image.Image):
+        base = {"image": image_digest(image)}
+    else:
+        base = {"file": file_digest(image)}
+
+    areas = [
+        [area_name, _normalize_area(area_data)]
+        for area_name, area_data in placements.items()
+        if area_name != ".meta"
+    ]
+
+    document = dumps(
+        {
+            "version": __version__,
+            "image": base,
+            "areas": areas,
+            "options": _normalize(sorted(options.items())),
+        },
+        sort_keys=True,
+    )
+
+    return sha256(document.encode()).hexdigest()
+
+
+class RenderCache:
+    """A cache of encoded renders, keyed by a hash of everything they came from.
+
+    Renders are kept in memory, and in directory if given, each tier evicting its
+    least recently used renders to stay within maxbytes and maxdiskbytes of
+    encoded bytes. Files are written atomically, so renders are never read half
+    written, and directory can be shared by processes (but not with other files).
+    Renders found skip loading, layout and compositing, as placements are only
+    parsed lazily to be hashed.
+    """
+
+    def __init__(
+        self,
+        maxbytes: int = 64 * 2 ** 20,
+        directory=None,
+        maxdiskbytes: int = 2 ** 30,
+    ):
+        self.maxbytes = maxbytes
+        self.currbytes = 0
+
+        self.directory = directory
+        self.maxdiskbytes = maxdiskbytes
+        self.diskbytes = 0
+
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+
+        self._renders = OrderedDict()
+        self._files = OrderedDict()
+        self._lock = RLock()
+
+        if directory is not None:
+            makedirs(directory, exist_ok=True)
+            self._scan()
+
+    def _scan(self) -> None:
+        # Indexes renders already in the directory, least recently used first
+        found = []
+
+        for name in listdir(self.directory):
+            if name.endswith(".tmp"):  # Being written, or left by a crash
+                continue
+
+            try:
+                status = stat(os_path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+
+            found.append((status.st_mtime_ns, name, status.st_size))
+
+        for _, name, size in sorted(found):
+            self._files[name] = size
+            self.diskbytes += size
+
+    def get(self, key: str) -> bytes:
+        # Returns the render with the given key, or None if it is not cached
+        with self._lock:
+            data = self._renders.get(key)
+
+            if data is not None:
+                self._renders.move_to_end(key)
+                self.hits["memory"] += 1
+                return data
+
+            if key in self._files:
+                file_path = os_path.join(self.directory, key)
+
+                try:
+                    with open(file_path, "rb") as rf:
+                        data = rf.read()
+
+                    utime(file_path)  # Kept by the next process to scan it
+                except FileNotFoundError:  # Evicted by another process
+                    self.diskbytes -= self._files.pop(key)
+                else:
+                    self._files.move_to_end(key)
+                    self.hits["disk"] += 1
+                    self._put_memory(key, data)
+                    return data
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, data: bytes) -> None:
+        with self._lock:
+            self._put_memory(key, data)
+
+            if self.directory is not None:
+                self._put_disk(key, data)
+
+    def _put_memory(self, key: str, data: bytes) -> None:
+        if key in self._renders:
+            self.currbytes -= len(self._renders.pop(key))
+
+        if len(data) > self.maxbytes:
+            return
+
+        self._renders[key] = data
+        self.currbytes += len(data)
+
+        while self.currbytes > self.maxbytes:
+            _, evicted = self._renders.popitem(last=False)
+            self.currbytes -= len(evicted)
+
+    def _put_disk(self, key: str, data: bytes) -> None:
+        if len(data) > self.maxdiskbytes:
+            return
+
+        # Written beside the render, then renamed over it in one step
+        descriptor, temporary = mkstemp(dir=self.directory, suffix=".tmp")
+
+        try:
+            with fdopen(descriptor, "wb") as tf:
+                tf.write(data)
+
+            replace(temporary, os_path.join(self.directory, key))
+        except BaseException:
+            remove(temporary)
+            raise
+
+        if key in self._files:
+            self.diskbytes -= self._files.pop(key)
+
+        self._files[key] = len(data)
+        self.diskbytes += len(data)
+
+        while self.diskbytes > self.maxdiskbytes:
+            name, size = self._files.popitem(last=False)
+            self.diskbytes -= size
+
+            try:
+                remove(os_path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    def render(
+        self,
+        image,
+        placements: dict,
+        format: str = "PNG",
+        compositor: str = "pillow",
+        suppress: bool = False,
+        hook=None,
+        **params,
+    ) -> bytes:
+        """Renders placements onto image encoded as format, unless already cached.
+
+        image is a PIL Image or the path of one, which is only opened if the render
+        is not cached. placements may be parsed (such as by Template.resolve) or
+        not, in which case they are parsed lazily. params are passed to the encoder.
+        """
+        if Internals.unparsed(placements):
+            placements = Placements.parse(placements, lazy=True)
+
+        key = render_key(
+            image, placements, format=format, compositor=compositor, **params
+        )
+        data = self.get(key)
+
+        if data is None:
+            if not isinstance(image, Image.Image):
+                image = Image.open(image)
+
+            data = encode(
+                operate(
+                    image=image,
+                    placements=placements,
+                    suppress=suppress,
+                    hook=hook,
+                    compositor=compositor,
+                ),
+                format=format,
+                **params,
+            )
+            self.put(key, data)
+
+        return data
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(
+                memory_hits=self.hits["memory"],
+                disk_hits=self.hits["disk"],
+                misses=self.misses,
+                maxbytes=self.maxbytes,
+                currbytes=self.currbytes,
+                currsize=len(self._renders),
+                maxdiskbytes=self.maxdiskbytes,
+                diskbytes=self.diskbytes,
+                disksize=len(self._files),
+            )
+
+    def clear(self) -> None:
+        # Empties both tiers, removing the renders in the directory
+        with self._lock:
+            self._renders.clear()
+            self.currbytes = 0
+
+            for name in self._files:
+                try:
+                    remove(os_path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+
+            self._files.clear()
+            self.diskbytes = 0
+            self.hits = {"memory": 0, "disk": 0}
+            self.misses = 0
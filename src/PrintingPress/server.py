@@ -0,0 +1,531 @@
+from . import assets as Assets, fit as Fit, fonts as Fonts, layout as Layout
+from . import metrics as Metrics
+from .batch import _load
+from .exceptions import ServerError
+from .template import Template
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection, HTTPException
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from json import dumps, load, loads
+from os import remove, stat
+from socket import AF_UNIX, SOCK_STREAM, socket
+from socketserver import ThreadingMixIn, UnixStreamServer
+from stat import S_ISSOCK
+from threading import Lock, local
+from time import perf_counter
+from urllib.parse import quote, unquote
+import sys
+
+# Content types of the formats renders are commonly encoded as
+_content_types = {
+    "PNG": "image/png",
+    "JPEG": "image/jpeg",
+    "WEBP": "image/webp",
+    "GIF": "image/gif",
+    "TIFF": "image/tiff",
+    "BMP": "image/bmp",
+}
+
+
+# Keywords of Template.render that are not encoder options, and so are not taken
+# from requests
+_render_keywords = {"image", "overrides", "suppress", "hook", "compositor", "file"}
+
+
+class _Unregistered(KeyError):
+    # Raised for templates that are not registered, which the server answers with
+    # a 404 rather than a 400
+    pass
+
+
+class RenderService:
+    """Templates kept in a process, rendering with identical renders coalesced.
+
+    Templates are registered once with the image they are rendered onto, which is
+    decoded once, and fonts and images loaded by their placements stay in the
+    caches of this process. Renders of a template with the same overrides, format
+    and params while one is already in flight wait for it, rather than rendering
+    again. Renders run on workers threads, those waiting for a worker being the
+    queue.
+    """
+
+    def __init__(self, workers: int = None):
+        self._templates = {}
+        self._executor = ThreadPoolExecutor(workers)
+        self._lock = Lock()
+
+        # Renders in flight by what they render, each with its future
+        self._in_flight = {}
+        self._registrations = 0
+
+        self.counts = {
+            "requests": 0,
+            "renders": 0,
+            "coalesced": 0,
+            "errors": 0,
+            "queued": 0,
+            "running": 0,
+        }
+        self.latency = {"request": Metrics.Histogram(), "render": Metrics.Histogram()}
+
+    def register(
+        self,
+        name: str,
+        places: dict,
+        image,
+        flatten: bool = False,
+        variable: list = (),
+        lazy: bool = False,
+    ) -> None:
+        # Registers (or replaces) the template name, image being a PIL Image or
+        # the path of one
+        template = Template(places, flatten=flatten, variable=variable, lazy=lazy)
+        image = _load(image)
+
+        with self._lock:
+            self._registrations += 1
+            self._templates[name] = (self._registrations, template, image)
+
+    def unregister(self, name: str) -> None:
+        with self._lock:
+            if self._templates.pop(name, None) is None:
+                raise _Unregistered(f"template {name} is not registered")
+
+    @property
+    def templates(self) -> list:
+        with self._lock:
+            return sorted(self._templates)
+
+    def render(
+        self, name: str, overrides: dict = None, format: str = "PNG", **params
+    ) -> bytes:
+        """Renders the template name with overrides, encoded as format with params.
+
+        params are encoder options (see Encoding.encode), and TypeError is raised
+        for other keywords of Template.render. Raises KeyError if name is not
+        registered, and whatever rendering raises, which every coalesced render
+        raises as well.
+        """
+        rejected = _render_keywords.intersection(params)
+
+        if rejected:
+            raise TypeError(
+                f"{', '.join(sorted(rejected))} are not encoder options, which are "
+                "the only params taken"
+            )
+
+        started = perf_counter()
+
+        with self._lock:
+            self.counts["requests"] += 1
+            registered = self._templates.get(name)
+
+            if registered is None:
+                self.counts["errors"] += 1
+                raise _Unregistered(f"template {name} is not registered")
+
+            # Templates registered again are told apart by their registration
+            key = (
+                registered[0],
+                dumps(overrides or {}, sort_keys=True),
+                format,
+                dumps(params, sort_keys=True),
+            )
+            future = self._in_flight.get(key)
+
+            if future is None:
+                self.counts["queued"] += 1
+                future = self._in_flight[key] = self._executor.submit(
+                    self._render, key, registered, overrides, format, params
+                )
+            else:
+                self.counts["coalesced"] += 1
+
+        try:
+            return future.result()
+        except BaseException:
+            with self._lock:
+                self.counts["errors"] += 1
+
+            raise
+        finally:
+            self.latency["request"].observe(perf_counter() - started)
+
+    def _render(
+        self, key: tuple, registered: tuple, overrides: dict, format: str, params
+    ) -> bytes:
+        _, template, image = registered
+
+        with self._lock:
+            self.counts["queued"] -= 1
+            self.counts["running"] += 1
+
+        started = perf_counter()
+
+        try:
+            return template.render(
+                image=image, overrides=overrides, suppress=True, format=format, **params
+            )
+        finally:
+            self.latency["render"].observe(perf_counter() - started)
+
+            # Renders asked for from now on render again
+            with self._lock:
+                del self._in_flight[key]
+                self.counts["running"] -= 1
+                self.counts["renders"] += 1
+
+    def metrics(self) -> dict:
+        # Returns the counts, queue, latencies and cache statistics of the service,
+        # as JSON-serialisable values
+        with self._lock:
+            counts = dict(self.counts)
+            templates = len(self._templates)
+
+        return {
+            "templates": templates,
+            "queue_depth": counts.pop("queued"),
+            "running": counts.pop("running"),
+            "counts": counts,
+            "latency": {
+                name: dict(
+                    histogram.summary()._asdict(), buckets=histogram.buckets()
+                )
+                for name, histogram in self.latency.items()
+            },
+            "caches": {
+                "fonts": Fonts.cache.info()._asdict(),
+                "assets": Assets.cache.info()._asdict(),
+                "fits": Fit.cache.info()._asdict(),
+                "masks": Layout.masks.info()._asdict(),
+            },
+        }
+
+    def close(self) -> None:
+        self._executor.shutdown()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Serves a RenderService over HTTP:
+    #   GET /metrics, GET /templates
+    #   PUT /templates/<name> with {"placements", "image", "flatten", "variable",
+    #     "lazy"}, and DELETE /templates/<name>
+    #   POST /render/<name> with {"overrides", "format", "params"}, answering with
+    #     the encoded render
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, value) -> None:
+        self._send(status, dumps(value).encode(), "application/json")
+
+    def _body(self) -> dict:
+        body = loads(self._data or b"{}")
+
+        if not isinstance(body, dict):
+            raise TypeError(f"body is type {type(body)}, but expected dict")
+
+        return body
+
+    def _route(self, prefix: str) -> str:
+        # Returns the name following prefix in the path, or None if not under it
+        if not self.path.startswith(prefix) or len(self.path) == len(prefix):
+            return None
+
+        return unquote(self.path[len(prefix):])
+
+    def _handle(self, method: str) -> None:
+        service = self.server.service
+
+        # Bodies are always read, so the connection can be kept open
+        length = int(self.headers.get("Content-Length") or 0)
+        self._data = self.rfile.read(length)
+
+        try:
+            if method == "GET" and self.path == "/metrics":
+                return self._send_json(200, service.metrics())
+
+            if method == "GET" and self.path == "/templates":
+                return self._send_json(200, service.templates)
+
+            name = self._route("/templates/")
+
+            if method == "PUT" and name is not None:
+                body = self._body()
+                service.register(
+                    name,
+                    body["placements"],
+                    body["image"],
+                    flatten=body.get("flatten", False),
+                    variable=body.get("variable", ()),
+                    lazy=body.get("lazy", False),
+                )
+                return self._send_json(200, {"template": name})
+
+            if method == "DELETE" and name is not None:
+                service.unregister(name)
+                return self._send_json(200, {"template": name})
+
+            name = self._route("/render/")
+
+            if method == "POST" and name is not None:
+                body = self._body()
+                format = body.get("format", "PNG")
+                data = service.render(
+                    name, body.get("overrides"), format, **body.get("params", {})
+                )
+                content_type = _content_types.get(
+                    format.upper(), "application/octet-stream"
+                )
+                return self._send(200, data, content_type)
+
+            self._send_json(404, {"error": f"no route for {method} {self.path}"})
+
+        except _Unregistered as e:
+            self._send_json(404, {"error": f"KeyError: {e}"})
+
+        except (KeyError, ValueError, TypeError, AssertionError, OSError) as e:
+            self._send_json(400, {"error": f"{type(e).__name__}: {e}"})
+
+        except Exception as e:
+            self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def do_GET(self) -> None:
+        self._handle("GET")
+
+    def do_PUT(self) -> None:
+        self._handle("PUT")
+
+    def do_DELETE(self) -> None:
+        self._handle("DELETE")
+
+    def do_POST(self) -> None:
+        self._handle("POST")
+
+
+class _TCPHandler(_Handler):
+    # Responses are written as headers then body, which Nagle's algorithm would
+    # hold back until the headers are acknowledged
+    disable_nagle_algorithm = True
+
+
+class _TCPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _UnixServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+    def server_close(self) -> None:
+        super().server_close()
+        remove(self.server_address)
+
+
+def make_server(service: RenderService, address):
+    """Returns a server for service, listening on address until shut down.
+
+    address is a (host, port) tuple for HTTP over TCP, or the path of a Unix
+    socket, which is replaced if it is a socket left by another server and removed
+    when the server is closed. Call serve_forever to serve (each connection on its
+    own thread), and shutdown and server_close to stop.
+    """
+    if isinstance(address, tuple):
+        server = _TCPServer(address, _TCPHandler)
+    else:
+        try:
+            if S_ISSOCK(stat(address).st_mode):
+                remove(address)
+        except FileNotFoundError:
+            pass
+
+        server = _UnixServer(address, _Handler)
+
+    server.service = service
+    return server
+
+
+class _UnixConnection(HTTPConnection):
+    def __init__(self, path: str, timeout: float = None):
+        super().__init__("localhost", timeout=timeout)
+        self._path = path
+
+    def connect(self) -> None:
+        self.sock = socket(AF_UNIX, SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self._path)
+
+
+class RenderClient:
+    """A client of a render server, keeping a connection open per thread.
+
+    address is a (host, port) tuple or the path of a Unix socket, as given to
+    make_server. Paths in placements and of images are opened by the server, so
+    relative paths are relative to its working directory. Errors answered by the
+    server raise ServerError.
+    """
+
+    def __init__(self, address, timeout: float = None):
+        self.address = address
+        self.timeout = timeout
+        self._local = local()
+
+    def _connection(self) -> HTTPConnection:
+        connection = getattr(self._local, "connection", None)
+
+        if connection is None:
+            if isinstance(self.address, tuple):
+                connection = HTTPConnection(*self.address, timeout=self.timeout)
+            else:
+                connection = _UnixConnection(self.address, timeout=self.timeout)
+
+            self._local.connection = connection
+
+        return connection
+
+    def _request(self, method: str, path: str, body=None) -> tuple:
+        # Returns the (content type, body) answered, reconnecting once if the
+        # connection kept open was closed by the server
+        data = None if body is None else dumps(body).encode()
+        headers = {} if data is None else {"Content-Type": "application/json"}
+
+        for attempt in range(2):
+            connection = self._connection()
+
+            try:
+                connection.request(method, path, body=data, headers=headers)
+                response = connection.getresponse()
+                answer = response.read()
+                break
+            except (ConnectionError, HTTPException):
+                connection.close()
+                self._local.connection = None
+
+                if attempt:
+                    raise
+
+        content_type = response.getheader("Content-Type", "")
+
+        if response.status != 200:
+            message = answer.decode(errors="replace")
+
+            if content_type == "application/json":
+                message = loads(message).get("error", message)
+
+            raise ServerError(response.status, message)
+
+        return content_type, answer
+
+    def register(
+        self,
+        name: str,
+        places: dict,
+        image: str,
+        flatten: bool = False,
+        variable: list = (),
+        lazy: bool = False,
+    ) -> None:
+        self._request(
+            "PUT",
+            "/templates/" + quote(name, safe=""),
+            {
+                "placements": places,
+                "image": image,
+                "flatten": flatten,
+                "variable": list(variable),
+                "lazy": lazy,
+            },
+        )
+
+    def unregister(self, name: str) -> None:
+        self._request("DELETE", "/templates/" + quote(name, safe=""))
+
+    def templates(self) -> list:
+        return loads(self._request("GET", "/templates")[1])
+
+    def render(
+        self, name: str, overrides: dict = None, format: str = "PNG", **params
+    ) -> bytes:
+        # Returns the render of the template name, encoded as format with params
+        return self._request(
+            "POST",
+            "/render/" + quote(name, safe=""),
+            {"overrides": overrides or {}, "format": format, "params": params},
+        )[1]
+
+    def metrics(self) -> dict:
+        return loads(self._request("GET", "/metrics")[1])
+
+    def close(self) -> None:
+        # Closes this thread's connection
+        connection = getattr(self._local, "connection", None)
+
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+def _parser() -> ArgumentParser:
+    parser = ArgumentParser(
+        prog="printingpress-server",
+        description=(
+            "Serves renders of registered templates over HTTP, on localhost or a "
+            "Unix socket, keeping templates, fonts and images loaded between "
+            "renders."
+        ),
+    )
+
+    address = parser.add_mutually_exclusive_group(required=True)
+    address.add_argument("--socket", help="path of a Unix socket to listen on")
+    address.add_argument("--port", type=int, help="TCP port to listen on")
+
+    parser.add_argument("--host", default="127.0.0.1", help="host to listen on")
+    parser.add_argument("--workers", type=int, help="threads to render with")
+    parser.add_argument(
+        "--template",
+        nargs=3,
+        action="append",
+        default=[],
+        metavar=("NAME", "PLACEMENTS", "IMAGE"),
+        help="template to register at start, from a JSON file (repeatable)",
+    )
+    return parser
+
+
+def main(argv: list = None) -> int:
+    arguments = _parser().parse_args(argv)
+    service = RenderService(workers=arguments.workers)
+
+    for name, placements_path, image in arguments.template:
+        with open(placements_path, "r", encoding="utf-8") as pf:
+            service.register(name, load(pf), image)
+
+    if arguments.socket is not None:
+        address = arguments.socket
+    else:
+        address = (arguments.host, arguments.port)
+
+    server = make_server(service, address)
+    print(f"Serving on {address}", file=sys.stderr)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+from . import internals as Internals, compositing as Compositing
+from .placements import Placements
+from .printingpress import operate, render_area
+from PIL import Image
+from types import MappingProxyType
+
+
+class Template:
+    """Placements parsed once, to be rendered many times.
+
+    The placements given are copied and never modified. Renders may override keys
+    of any area, in which case only the overridden areas are parsed again, and
+    fonts and images are only loaded again if the keys they came from changed.
+
+    With flatten, static areas are rendered once and cached as flattened layers,
+    so renders only operate on variable areas between them. Areas are variable if
+    named in variable or overridden by a render, and static otherwise. Flattened
+    layers may differ by rounding from operate where static areas overlap.
+
+    With lazy, areas are validated when the template is made, but fonts and images
+    are only loaded when first rendered (see Placements.parse).
+    """
+
+    # Keys of each area type that fonts and images are loaded from
+    _loaded_from = {
+        "text": {"type", "path", "font_size", "font_variant"},
+        "image": {"type", "path"},
+    }
+
+    # Sets of variable areas to keep flattened layers for
+    _max_plans = 32
+
+    def __init__(
+        self,
+        places: dict,
+        flatten: bool = False,
+        variable: list = (),
+        lazy: bool = False,
+    ):
+        assert isinstance(places, dict), "Non-dictionary passed in"
+
+        self._places = Internals.copy_places(places)
+        self._parsed = Placements.parse(self._places, lazy=lazy)
+        self._lazy = lazy
+
+        self._flatten = flatten
+        self._variable = frozenset(variable)
+        self._plans = {}
+
+        for area_name in self._variable:
+            if area_name == ".meta" or area_name not in self._places:
+                raise KeyError(f"area {area_name} is not in the template")
+
+    @property
+    def places(self) -> dict:
+        # A copy of the placements the template was made from
+        return Internals.copy_places(self._places)
+
+    @property
+    def areas(self) -> MappingProxyType:
+        return MappingProxyType(self._parsed)
+
+    @property
+    def flatten(self) -> bool:
+        return self._flatten
+
+    @property
+    def variable(self) -> frozenset:
+        return self._variable
+
+    @property
+    def lazy(self) -> bool:
+        return self._lazy
+
+    def resolve(self, overrides: dict = None) -> dict:
+        # Returns parsed placements with the given overrides applied
+        resolved = dict(self._parsed)
+
+        for area_name, override in (overrides or {}).items():
+            if area_name == ".meta" or area_name not in self._places:
+                raise KeyError(f"area {area_name} is not in the template")
+
+            if not isinstance(override, dict):
+                raise TypeError(
+                    f"overrides for area {area_name} is type {type(override)}, "
+                    f"but expected {dict}"
+                )
+
+            area_data = dict(self._places[area_name])
+            area_data.update(override)
+
+            parsed = self._parsed[area_name]
+            reload = self._loaded_from[parsed.type].intersection(override)
+
+            resolved[area_name] = Placements.parse_area(
+                area_name=area_name,
+                area_data=area_data,
+                reuse=None if reload else parsed,
+                lazy=self._lazy,
+            )
+
+        return resolved
+
+    def plan(self, variable: frozenset) -> dict:
+        # Returns placements where runs of static areas are flattened into layer
+        # areas, and variable areas are left as None to be filled in when rendering.
+        # Areas beneath the image and above it are stacked separately, so only runs
+        # of the same kind are flattened together.
+        plan = self._plans.get(variable)
+
+        if plan is not None:
+            return plan
+
+        plan = {}
+        runs = {True: [], False: []}
+
+        def close(beneath: bool) -> None:
+            run = runs[beneath]
+            layers = [
+                (
+                    render_area(area_name, self._parsed[area_name]),
+                    tuple(self._parsed[area_name].xy),
+                )
+                for area_name in run
+            ]
+
+            if len(run) == 1:
+                plan[run[0]] = Compositing.LayerArea(
+                    type="layer", image=layers[0][0], xy=layers[0][1], beneath=beneath
+                )
+
+            elif len(run) > 1:
+                plan["+".join(run)] = Compositing.flatten(layers, beneath=beneath)
+
+            runs[beneath] = []
+
+        for area_name, area_data in self._parsed.items():
+            if area_name == ".meta":
+                continue
+
+            if area_name in variable:
+                close(area_data.beneath)
+                plan[area_name] = None
+
+            else:
+                runs[area_data.beneath].append(area_name)
+
+        close(True)
+        close(False)
+
+        if len(self._plans) >= self._max_plans:
+            self._plans.clear()
+
+        self._plans[variable] = plan
+        return plan
+
+    def render(
+        self,
+        image: Image.Image,
+        overrides: dict = None,
+        suppress: bool = False,
+        hook=None,
+        compositor: str = "pillow",
+        format: str = None,
+        file=None,
+        **params,
+    ):
+        resolved = self.resolve(overrides)
+
+        if self._flatten:
+            plan = self.plan(self._variable.union(overrides or {}))
+            resolved = {
+                area_name: resolved[area_name] if area_data is None else area_data
+                for area_name, area_data in plan.items()
+            }
+
+        return operate(
+            image=image,
+            placements=resolved,
+            suppress=suppress,
+            hook=hook,
+            compositor=compositor,
+            format=format,
+            file=file,
+            **params,
+        )
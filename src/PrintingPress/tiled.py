@@ -0,0 +1,200 @@
+from . import compositing as Compositing, metrics as Metrics
+from .printingpress import render_area
+from mmap import mmap
+from PIL import Image
+from struct import pack
+from time import perf_counter
+from zlib import compressobj, crc32
+
+# Pressed for areas beneath the image outside a tile, which still clear the colour
+# of its transparent pixels (see Compositing.Presser)
+_nothing = Image.new("RGBA", (0, 0))
+
+
+def render_tiles(
+    image: Image.Image,
+    placements: dict,
+    tile_size: int = 1024,
+    suppress: bool = False,
+    hook=None,
+):
+    """Renders placements onto image a tile at a time, yielding (box, tile) pairs.
+
+    Tiles are tile_size pixels square (or smaller at the image's right and bottom
+    edges), and yielded a row at a time from the top left, with box being the
+    (left, top, right, bottom) of the image each covers. Each tile is composited
+    from a crop of image and only the areas over it, so only a tile of the image
+    is held at once besides image itself, which is never copied. Areas are
+    rendered when the first row of tiles they cover is reached, and released
+    after the last. Tiles put together are identical to operate's result.
+    """
+    assert isinstance(image, Image.Image), "Passed image parameter is not a PIL Image"
+
+    if hook is not None:
+        started = perf_counter()
+
+    width, height = image.size
+    areas = [
+        (area_name, area_data)
+        for area_name, area_data in placements.items()
+        if area_name != ".meta"
+    ]
+
+    # Layers of the areas rendered and over rows of tiles not yet yielded
+    layers = {}
+    rendered = set()
+
+    for top in range(0, height, tile_size):
+        bottom = min(top + tile_size, height)
+
+        # The top of an area's layer is its y coordinate, whatever its size
+        for area_name, area_data in areas:
+            if area_name in rendered or max(area_data.xy[1], 0) >= bottom:
+                continue
+
+            timer = Metrics.timer(
+                hook, suppress=suppress, area_name=area_name, area_type=area_data.type
+            )
+
+            layer = render_area(area_name=area_name, area_data=area_data, timer=timer)
+            rendered.add(area_name)
+
+            if Compositing.clip_box(image.size, layer.size, tuple(area_data.xy)):
+                layers[area_name] = layer
+
+            if timer is not None:
+                timer.finish(layer)
+
+        for left in range(0, width, tile_size):
+            box = (left, top, min(left + tile_size, width), bottom)
+
+            tile = image.crop(box)
+            presser = Compositing.Presser(
+                tile if "A" in tile.mode else tile.convert("RGBA")
+            )
+
+            for area_name, area_data in areas:
+                layer = layers.get(area_name)
+
+                if layer is None:
+                    if not area_data.beneath:
+                        continue
+
+                    layer = _nothing
+
+                presser.press(
+                    layer=layer,
+                    xy=(area_data.xy[0] - left, area_data.xy[1] - top),
+                    beneath=area_data.beneath,
+                )
+
+            yield box, presser.finish()
+
+        for area_name, area_data in areas:
+            layer = layers.get(area_name)
+
+            if layer is not None and area_data.xy[1] + layer.height <= bottom:
+                del layers[area_name]
+
+    if hook is not None:
+        hook(Metrics.render_event(started, None))
+
+
+def write_raw(
+    image: Image.Image,
+    placements: dict,
+    path,
+    tile_size: int = 1024,
+    suppress: bool = False,
+    hook=None,
+) -> tuple:
+    # Renders placements onto image into a file of raw RGBA pixels, row by row
+    # without a header, writing each tile into the file mapped into memory.
+    # Returns the (width, height) of the pixels written.
+    width, height = image.size
+    stride = width * 4
+
+    with open(path, "w+b") as of:
+        of.truncate(stride * height)
+
+        if not stride * height:
+            return width, height
+
+        with mmap(of.fileno(), stride * height) as mapped:
+            for (left, top, right, bottom), tile in render_tiles(
+                image, placements, tile_size=tile_size, suppress=suppress, hook=hook
+            ):
+                pixels = tile.tobytes()
+                row = (right - left) * 4
+
+                for line in range(bottom - top):
+                    offset = (top + line) * stride + left * 4
+                    mapped[offset:offset + row] = pixels[line * row:(line + 1) * row]
+
+    return width, height
+
+
+def _chunk(kind: bytes, data: bytes) -> bytes:
+    return pack(">I", len(data)) + kind + data + pack(">I", crc32(kind + data))
+
+
+def write_png(
+    image: Image.Image,
+    placements: dict,
+    file,
+    tile_size: int = 1024,
+    compress_level: int = 6,
+    suppress: bool = False,
+    hook=None,
+) -> None:
+    """Renders placements onto image into a PNG file, encoding as tiles are made.
+
+    file is a path or a binary file object. Each row of tiles is compressed into
+    the file once made, so only a row of tiles is held at once. Rows of pixels are
+    not filtered, so files are larger than Pillow's for photographic images.
+    """
+    if isinstance(file, (str, bytes)) or hasattr(file, "__fspath__"):
+        with open(file, "wb") as of:
+            return write_png(
+                image, placements, of, tile_size, compress_level, suppress, hook
+            )
+
+    width, height = image.size
+    compressor = compressobj(compress_level)
+
+    file.write(b"\x89PNG\r\n\x1a\n")
+    file.write(_chunk(b"IHDR", pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)))
+
+    band, band_top = None, 0
+
+    def flush() -> None:
+        pixels = memoryview(band.tobytes())
+        row = width * 4
+        data = []
+
+        # Each row of pixels is preceded by its filter type, 0 being none
+        for start in range(0, len(pixels), row):
+            data.append(compressor.compress(b"\x00"))
+            data.append(compressor.compress(pixels[start:start + row]))
+
+        data = b"".join(data)
+
+        if data:
+            file.write(_chunk(b"IDAT", data))
+
+    for (left, top, right, bottom), tile in render_tiles(
+        image, placements, tile_size=tile_size, suppress=suppress, hook=hook
+    ):
+        if band is None or top != band_top:
+            if band is not None:
+                flush()
+
+            band, band_top = Image.new("RGBA", (width, bottom - top)), top
+
+        band.paste(tile, (left, 0))
+
+    if band is not None:
+        flush()
+
+    file.write(_chunk(b"IDAT", compressor.flush()))
+    file.write(_chunk(b"IEND", b""))
@@ -1,2 +1,23 @@
 from . import ii
 from . import rollover
+from . import layout
+from . import template
+from . import batch
+from . import threads
+from . import fit
+from . import metrics
+from . import benchmarks
+from . import assets
+from . import lazy
+from . import validation
+from . import incremental
+from . import compositing
+from . import tiled
+from . import renders
+from . import cli
+from . import asynchronous
+from . import encoding
+from . import masks
+from . import animation
+from . import multiscale
+from . import server
@@ -0,0 +1,129 @@
+from src.PrintingPress import animation, operate, Placements
+from io import BytesIO
+from PIL import Image
+from time import time
+
+base = Image.open("tests/ii/template-text.png").resize((600, 800))
+
+places = {
+    "title": {
+        "type": "text",
+        "path": "tests/Manrope.ttf",
+        "text": "Catalogue Entry",
+        "xy": [20, 20],
+        "wh": [300, 80],
+        "font_size": 30,
+    },
+    "badge": {
+        "type": "text",
+        "path": "tests/Manrope.ttf",
+        "text": "NEW",
+        "xy": [400, 100],
+        "wh": [120, 60],
+        "font_size": 30,
+        "bg_colour": [200, 30, 60],
+        "bg_opacity": 255,
+    },
+    "thumbnail": {
+        "type": "image",
+        "path": "tests/ii/verycool23ar.png",
+        "xy": [50, 150],
+        "wh": [150, 150],
+    },
+}
+
+keyframes = {
+    "title": [{"frame": 0, "xy": [20, 20]}, {"frame": 23, "xy": [200, 500]}],
+    "badge": [
+        {"frame": 12, "rotation": 90, "font_opacity": 0},
+        {"frame": 0, "rotation": 0, "font_opacity": 255, "text": "NEW"},
+        {"frame": 6, "text": "SALE"},
+        {"frame": 24, "rotation": 0, "font_opacity": 255},
+    ],
+    "thumbnail": [{"frame": 4, "opacity": 255}, {"frame": 10, "opacity": 40}],
+}
+
+frames = 25
+sorted_keyframes = animation.check_keyframes(places, keyframes)
+
+expected = []
+
+for frame in range(frames):
+    animated = {area_name: dict(area_data) for area_name, area_data in places.items()}
+
+    for area_name, area_keyframes in sorted_keyframes.items():
+        animated[area_name].update(animation.values_at(area_keyframes, frame))
+
+    expected.append(operate(base, Placements.parse(animated), suppress=True))
+
+# Keys are interpolated between keyframes, and held outside and between them
+assert animation.values_at(sorted_keyframes["title"], 5) == {"xy": [59, 124]}
+assert animation.values_at(sorted_keyframes["thumbnail"], 0) == {"opacity": 255}
+assert animation.values_at(sorted_keyframes["badge"], 6) == {
+    "rotation": 45,
+    "font_opacity": 128,
+    "text": "SALE",
+}
+
+stime = time()
+renders = []
+previous = None
+
+for number, (frame, boxes) in enumerate(
+    animation.render_frames(
+        base,
+        places,
+        keyframes,
+        frames,
+        suppress=True,
+        hook=lambda event: event.stage == "area" and renders.append(event.area),
+    )
+):
+    assert frame.tobytes() == expected[number].tobytes(), number
+
+    # Only pixels within the boxes changed since the previous frame
+    if previous is not None:
+        outside = previous.copy()
+
+        for box in boxes:
+            outside.paste(frame.crop(box), box[:2])
+
+        assert outside.tobytes() == frame.tobytes(), number
+
+    previous = frame.copy()
+
+print(time() - stime)
+
+# Moving areas are rendered once, and layers are kept by the values they had.
+# Frames 13 to 18 of the badge repeat frames 11 to 6, and 19 to 24 differ in text
+assert renders.count("title") == 1
+assert renders.count("badge") == 19, renders.count("badge")
+
+# Animated PNGs decode to the same frames
+output = BytesIO()
+animation.write_apng(base, places, keyframes, frames, output, suppress=True)
+
+with Image.open(BytesIO(output.getvalue())) as decoded:
+    assert decoded.n_frames == frames
+
+    for number in range(frames):
+        decoded.seek(number)
+        assert decoded.convert("RGBA").tobytes() == expected[number].tobytes(), number
+
+# Animations have at least a frame, and nothing is written without one
+for frames in [0, -1]:
+    output = BytesIO()
+
+    try:
+        list(animation.render_frames(base, places, keyframes, frames))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError(f"render_frames accepted {frames} frames")
+
+    try:
+        animation.write_apng(base, places, keyframes, frames, output)
+    except ValueError:
+        assert output.getvalue() == b""
+    else:
+        raise AssertionError(f"write_apng accepted {frames} frames")
@@ -0,0 +1,67 @@
+from src.PrintingPress import assets, operate, Placements
+from os import path, utime
+from PIL import Image
+from tempfile import TemporaryDirectory
+from time import time
+
+thumbnail = Image.open("tests/ii/template-text.png")
+
+
+def render(places: dict) -> bytes:
+    return operate(
+        image=thumbnail, placements=Placements.parse(places), suppress=True
+    ).tobytes()
+
+
+with TemporaryDirectory() as directory:
+    panel = path.join(directory, "panel.png")
+    thumbnail.crop((0, 0, 600, 400)).save(panel)
+
+    places = {
+        "panel": {
+            "type": "image",
+            "path": panel,
+            "xy": [100, 100],
+            "wh": [1200, 800],
+            "filter": "gaussian_blur",
+            "filter_data": [12],
+            "opacity": 200,
+        }
+    }
+
+    assets.clear_cache()
+    expected = render(places)
+
+    stime = time()
+
+    # Parsing again takes the decoded image, and rendering again the variant
+    for _ in range(3):
+        assert render(places) == expected
+
+    print(time() - stime)
+
+    info = assets.cache_info()
+    assert (info.source_hits, info.source_misses) == (3, 1), info
+    assert info.variant_hits == 3, info
+
+    # Changing only the opacity takes the filtered variant, without filtering again
+    places["panel"]["opacity"] = 100
+    adjusted = render(places)
+    assert assets.cache_info().variant_hits == 4
+
+    assets.clear_cache()
+    assert adjusted == render(places)
+
+    # Images are decoded again when their files change
+    utime(panel, (time() + 10, time() + 10))
+    Placements.parse(places)
+    assert assets.cache_info().source_misses == 2
+
+# Caches never hold more than their budget, evicting the least recently used
+cache = assets.AssetCache(maxbytes=3 * 100 * 100 * 4)
+
+for number in range(5):
+    cache.put_variant((number,), Image.new("RGBA", (100, 100)))
+
+assert cache.info().currsize == 3 and cache.info().currbytes <= cache.maxbytes
+assert cache.variant((0,)) is None and cache.variant((4,)) is not None
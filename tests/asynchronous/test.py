@@ -0,0 +1,134 @@
+from src.PrintingPress import AsyncRenderer, Template, render_async
+from src.PrintingPress.asynchronous import load_template
+from src.PrintingPress.encoding import encode
+from src.PrintingPress.exceptions import BusyError
+from asyncio import CancelledError, gather, new_event_loop, sleep
+from json import load
+from PIL import Image
+from threading import Event
+from time import time
+
+thumbnail = Image.open("tests/ii/template-text.png")
+
+with open("tests/ii/placements.json", "r", encoding="utf-8") as pf:
+    places = load(pf)
+
+template = Template(places)
+jobs = [{"title": {"text": f"Catalogue Entry {number}"}} for number in range(6)]
+expected = [
+    encode(template.render(thumbnail, overrides, suppress=True)) for overrides in jobs
+]
+
+
+async def renders() -> None:
+    # Renders match rendering serially, whichever way they are made
+    loaded = await load_template(places, lazy=True)
+    output = await render_async(loaded, "tests/ii/template-text.png", jobs[0])
+    assert output == expected[0]
+
+    renderer = AsyncRenderer(template, "tests/ii/template-text.png", limit=2)
+    most = []
+
+    async def watch() -> None:
+        while True:
+            most.append(renderer.running)
+            await sleep(0.001)
+
+    watcher = new_loop.create_task(watch())
+    outputs = await gather(*(renderer.render(overrides) for overrides in jobs))
+    watcher.cancel()
+
+    assert list(outputs) == expected
+    assert max(most) <= 2 and renderer.running == 0
+    renderer.close()
+
+
+async def processes() -> None:
+    # Renders in worker processes match too, and cancelled renders finish there
+    renderer = AsyncRenderer(template, thumbnail, limit=2, backend="process")
+    task = new_loop.create_task(renderer.render(jobs[0]))
+    await sleep(0.05)
+    task.cancel()
+
+    outputs = await gather(*(renderer.render(overrides) for overrides in jobs[1:4]))
+    assert list(outputs) == expected[1:4]
+    assert renderer.running == 0
+    renderer.close()
+
+
+async def backpressure() -> None:
+    # Renders beyond those running and waiting are turned away
+    renderer = AsyncRenderer(template, thumbnail, limit=1, max_waiting=1)
+    started, release = Event(), Event()
+
+    def hold(event) -> None:
+        started.set()
+        release.wait()
+
+    first = new_loop.create_task(renderer.render(jobs[0], hook=hold))
+    second = new_loop.create_task(renderer.render(jobs[1]))
+    await sleep(0.05)
+
+    try:
+        await renderer.render(jobs[2])
+    except BusyError:
+        pass
+    else:
+        raise AssertionError("render did not raise BusyError")
+
+    release.set()
+    assert list(await gather(first, second)) == expected[:2]
+    renderer.close()
+
+
+async def cancellation() -> None:
+    # Cancelled renders stop at their next stage, then give their place up
+    renderer = AsyncRenderer(template, thumbnail, limit=1)
+    started, release = Event(), Event()
+    stages = []
+
+    def hold(event) -> None:
+        stages.append(event.stage)
+        started.set()
+        release.wait()
+
+    task = new_loop.create_task(renderer.render(jobs[0], hook=hold))
+
+    while not started.is_set():
+        await sleep(0.001)
+
+    task.cancel()
+
+    try:
+        await task
+    except CancelledError:
+        pass
+    else:
+        raise AssertionError("render was not cancelled")
+
+    assert renderer.running == 1  # Its thread has not stopped yet
+    release.set()
+
+    assert await renderer.render(jobs[1]) == expected[1]
+    assert stages == ["start"] and renderer.running == 0
+    renderer.close()
+
+
+new_loop = new_event_loop()
+stime = time()
+
+try:
+    for test in [renders, processes, backpressure, cancellation]:
+        new_loop.run_until_complete(test())
+finally:
+    new_loop.close()
+
+print(time() - stime)
+
+# Invalid backends raise ValueError, even under python -O
+try:
+    AsyncRenderer(template, thumbnail, backend="fibre")
+except ValueError:
+    pass
+else:
+    raise AssertionError("invalid backend did not raise ValueError")
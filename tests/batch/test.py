@@ -0,0 +1,42 @@
+from src.PrintingPress import batch, encoding, template
+from json import load
+from PIL import Image
+from time import time
+
+thumbnail = Image.open("tests/ii/template-text.png")
+
+with open("tests/ii/placements.json", "r", encoding="utf-8") as pf:
+    compiled = template.Template(load(pf))
+
+jobs = [{"title": {"text": f"Catalogue Entry {number}"}} for number in range(6)]
+
+stime = time()
+
+outputs = list(
+    batch.render_batch(
+        template=compiled,
+        jobs=jobs,
+        image="tests/ii/template-text.png",
+        workers=2,
+        chunksize=2,
+        max_in_flight=4,
+    )
+)
+
+print(time() - stime)
+
+# Outputs are in the order of jobs, and match rendering serially
+assert len(outputs) == len(jobs)
+
+for overrides, output in zip(jobs, outputs):
+    expected = compiled.render(image=thumbnail, overrides=overrides, suppress=True)
+    assert output == encoding.encode(expected), overrides
+
+# Invalid options raise ValueError, even under python -O
+for options in [{"chunksize": 0}, {"backend": "fibre"}]:
+    try:
+        list(batch.render_batch(compiled, jobs, image=thumbnail, **options))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError(f"{options} did not raise ValueError")
@@ -0,0 +1,31 @@
+from benchmarks import cases, run
+from copy import deepcopy
+from tempfile import TemporaryDirectory
+
+case = cases.case(canvas=(480, 270), areas=4, words=6, fit=True, beneath=0.5)
+
+results = run.run([case], repeats=2, isolate=False)
+measured = results["cases"][case.name]
+
+print(measured["parse"]["median"], measured["render"]["median"])
+
+assert measured["pixels"] == 480 * 270
+assert 0 < measured["render"]["min"] <= measured["render"]["median"]
+
+# Cases build the same placements every time
+with TemporaryDirectory() as directory:
+    _, first = cases.build(case, directory)
+    _, second = cases.build(case, directory)
+
+assert first == second
+
+# Results regress against a faster baseline, and not against themselves
+assert run.compare(results, results) == []
+
+baseline = deepcopy(results)
+baseline["cases"][case.name]["render"]["median"] /= 2
+
+regressions = run.compare(results, baseline, threshold=0.5)
+assert [(name, metric) for name, metric, _, _ in regressions] == [
+    (case.name, "render")
+], regressions
@@ -0,0 +1,93 @@
+from src.PrintingPress import cli, Template
+from src.PrintingPress.encoding import encode
+from contextlib import redirect_stdout
+from io import BytesIO, StringIO
+from json import dumps, load, loads
+from os import listdir, path
+from PIL import Image
+from subprocess import PIPE, run
+from tarfile import open as open_tar
+from tempfile import TemporaryDirectory
+from time import time
+import sys
+
+thumbnail = Image.open("tests/ii/template-text.png")
+
+with open("tests/ii/placements.json", "r", encoding="utf-8") as pf:
+    template = Template(load(pf))
+
+jobs = [
+    {"title": {"text": "Catalogue Entry"}},
+    {"title": {"text": "Named Entry"}, ".name": "named.png"},
+    {"missing": {"text": "Not An Area"}},
+    {"title": {"text": "Escaping"}, ".name": "../escaped.png"},
+]
+
+with TemporaryDirectory() as directory:
+    jobs_path = path.join(directory, "jobs.jsonl")
+
+    with open(jobs_path, "w", encoding="utf-8") as jf:
+        jf.write("\n".join(dumps(job) for job in jobs) + "\nnot json\n")
+
+    arguments = ["tests/ii/placements.json", "tests/ii/template-text.png"]
+    arguments += ["--jobs", jobs_path, "--workers", "2", "--backend", "thread"]
+
+    report = StringIO()
+    stime = time()
+
+    with redirect_stdout(report):
+        status = cli.main(arguments + ["--output", path.join(directory, "output")])
+
+    print(time() - stime)
+
+    entries = [loads(line) for line in report.getvalue().splitlines()]
+    summary = entries.pop()
+
+    # Invalid jobs are reported without stopping the others
+    assert status == 1
+    assert summary["jobs"] == 5 and summary["errors"] == 3
+    assert sorted(entry["job"] for entry in entries) == [0, 1, 2, 3, 4]
+    assert sorted(entry["job"] for entry in entries if "error" in entry) == [2, 3, 4]
+
+    outputs = sorted(listdir(path.join(directory, "output")))
+    assert outputs == ["00000000.png", "named.png"], outputs
+
+    for job, name in [(jobs[0], "00000000.png"), (jobs[1], "named.png")]:
+        overrides = {key: value for key, value in job.items() if key != ".name"}
+        expected = encode(template.render(thumbnail, overrides, suppress=True))
+
+        with open(path.join(directory, "output", name), "rb") as of:
+            assert of.read() == expected, name
+
+    # Images can be written into a tar stream instead, in any format
+    tar_path = path.join(directory, "output.tar")
+
+    with redirect_stdout(StringIO()):
+        cli.main(arguments + ["--tar", tar_path, "--format", "JPEG", "--quality", "70"])
+
+    with open_tar(tar_path) as tf:
+        assert tf.getnames() == ["00000000.jpeg", "named.png"]
+
+        with Image.open(tf.extractfile("named.png")) as output:
+            assert output.format == "JPEG"
+
+    # Streaming to stdout, warnings printed by workers while parsing and rendering
+    # go to stderr rather than into the archive
+    warned = [
+        {"title": {"text": "Catalogue Entry", "font_variant": "Nonexistent"}},
+        {"title": {"text": "Supercalifragilisticexpialidocious", "fit": False}},
+    ]
+    streamed = run(
+        [sys.executable, "-m", "src.PrintingPress"]
+        + arguments[:2]
+        + ["--tar", "-", "--workers", "1", "--backend", "process"],
+        input="\n".join(dumps(job) for job in warned).encode(),
+        stdout=PIPE,
+        stderr=PIPE,
+    )
+    assert streamed.returncode == 0, streamed.stderr
+    assert b"font_variant is invalid" in streamed.stderr
+    assert b"exceeds the box" in streamed.stderr
+
+    with open_tar(fileobj=BytesIO(streamed.stdout)) as tf:
+        assert tf.getnames() == ["00000000.png", "00000001.png"]
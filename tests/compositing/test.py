@@ -0,0 +1,98 @@
+from src.PrintingPress import compositing, operate, Placements
+from json import load
+from PIL import Image
+from time import time
+
+thumbnail = Image.open("tests/ii/template-text.png")
+
+with open("tests/ii/placements.json", "r", encoding="utf-8") as pf:
+    places = load(pf)
+
+places["badge"] = {
+    "type": "image",
+    "path": "tests/ii/verycool23ar.png",
+    "xy": [2500, -100],
+    "wh": [600, 600],
+    "rotation": 30,
+    "opacity": 160,
+}
+places["caption"] = {
+    "type": "text",
+    "text": "Catalogue Entry",
+    "path": "tests/Manrope.ttf",
+    "xy": [150, 150],
+    "wh": [1400, 300],
+    "bg_colour": [20, 40, 60],
+    "bg_opacity": 120,
+    "font_size": 120,
+    "font_opacity": 200,
+    "beneath": True,
+}
+
+parsed = Placements.parse(places)
+bases = [thumbnail.convert("RGB"), thumbnail.convert("RGBA")]
+
+# A base with translucent and transparent pixels, so beneath areas show through
+translucent = thumbnail.convert("RGBA")
+translucent.putalpha(Image.linear_gradient("L").resize(translucent.size))
+bases.append(translucent)
+
+for base in bases:
+    expected = operate(image=base, placements=parsed, suppress=True)
+
+    stime = time()
+    output = operate(
+        image=base, placements=parsed, suppress=True, compositor="numpy"
+    )
+    print(time() - stime)
+
+    assert output.mode == "RGBA" and output.size == base.size
+
+    if compositing.numpy is None:
+        # Renders as usual without NumPy
+        assert output.tobytes() == expected.tobytes()
+        continue
+
+    numpy = compositing.numpy
+    expected, output = (
+        numpy.asarray(image.convert("RGBa"), dtype=numpy.int16)
+        for image in (expected, output)
+    )
+
+    # Premultiplied pixels match exactly, as transparent pixels have no colour
+    difference = numpy.abs(expected - output).max()
+    assert difference == 0, difference
+
+if compositing.numpy is not None:
+    # Randomly translucent areas, pressed over and beneath at random positions,
+    # partly off the canvas
+    random = compositing.numpy.random.default_rng(23)
+
+    def noise(size: tuple) -> Image.Image:
+        pixels = random.integers(0, 256, (size[1], size[0], 4), dtype="uint8")
+        pixels[random.random(size[::-1]) < 0.2, 3] = 0
+        pixels[random.random(size[::-1]) < 0.2, 3] = 255
+        return Image.fromarray(pixels, "RGBA")
+
+    base = noise((320, 240))
+    pressers = [compositing.Presser(base.copy()), compositing.ArrayPresser(base)]
+
+    for _ in range(40):
+        layer = noise(tuple(int(side) for side in random.integers(1, 200, 2)))
+        xy = tuple(int(coordinate) for coordinate in random.integers(-100, 300, 2))
+        beneath = bool(random.integers(0, 2))
+
+        for presser in pressers:
+            presser.press(layer=layer, xy=xy, beneath=beneath)
+
+    expected, output = (
+        presser.finish().convert("RGBa").tobytes() for presser in pressers
+    )
+    assert expected == output
+
+try:
+    operate(image=thumbnail, placements=parsed, suppress=True, compositor="cairo")
+except ValueError:
+    pass
+else:
+    raise AssertionError("Unknown compositor accepted")
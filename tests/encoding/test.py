@@ -0,0 +1,92 @@
+from src.PrintingPress import encoding, printingpress, placements
+from io import BytesIO
+from json import load
+from PIL import Image
+from time import time
+
+# Made opaque, as the thumbnail itself is partly transparent
+thumbnail = Image.open("tests/ii/template-text.png").convert("RGB")
+
+with open("tests/ii/placements.json", "r", encoding="utf-8") as pf:
+    placements = placements.Placements.parse(load(pf))
+
+stime = time()
+
+rendered = printingpress.operate(image=thumbnail, placements=placements, suppress=True)
+events = []
+
+output = printingpress.operate(
+    image=thumbnail,
+    placements=placements,
+    suppress=True,
+    hook=events.append,
+    format="PNG",
+    preset="fast",
+)
+
+print(time() - stime)
+
+# Renders are encoded as encode would, reporting the encode stage separately
+assert output == encoding.encode(rendered, format="PNG", preset="fast")
+assert [event.stage for event in events[-2:]] == ["render", "encode"]
+assert events[-1].detail == {"format": "PNG", "mode": "RGB", "size": len(output)}
+
+# Alpha is dropped from opaque images only, unless kept
+with Image.open(BytesIO(output)) as decoded:
+    assert decoded.mode == "RGB"
+    assert decoded.tobytes() == rendered.convert("RGB").tobytes()
+
+kept = encoding.encode(rendered, drop_alpha=False)
+
+with Image.open(BytesIO(kept)) as decoded:
+    assert decoded.mode == "RGBA"
+
+transparent = Image.open("tests/ii/template-text.png")
+
+with Image.open(BytesIO(encoding.encode(transparent))) as decoded:
+    assert decoded.mode == "RGBA"
+
+with Image.open(BytesIO(encoding.encode(transparent, format="JPEG"))) as decoded:
+    assert decoded.mode == "RGB"
+
+# Encoding into a buffer writes the same bytes, returning how many
+buffer = BytesIO()
+assert encoding.encode(rendered, file=buffer) == len(buffer.getvalue())
+assert buffer.getvalue() == encoding.encode(rendered)
+
+# Presets trade speed for size, and options given override them
+sizes = [
+    len(encoding.encode(rendered, preset=preset)) for preset in ["fast", "small"]
+]
+assert sizes[0] > sizes[1], sizes
+
+assert encoding.encode(
+    rendered, preset="small", compress_level=1, optimize=False
+) == encoding.encode(rendered, preset="fast")
+
+jpegs = [
+    len(encoding.encode(rendered, format="JPEG", preset=preset))
+    for preset in ["fast", "balanced", "small"]
+]
+assert jpegs[0] > jpegs[1] > jpegs[2], jpegs
+
+assert encoding.encode(
+    rendered, format="JPEG", preset="fast", quality=90
+) == encoding.encode(rendered, format="JPEG", quality=90, subsampling="4:2:0")
+
+try:
+    encoding.encode(rendered, preset="tiny")
+except ValueError:
+    pass
+else:
+    raise AssertionError("unknown preset did not raise ValueError")
+
+# Encoder options without a format are mistakes, rather than ignored
+try:
+    printingpress.operate(
+        image=thumbnail, placements=placements, suppress=True, preset="fast"
+    )
+except TypeError:
+    pass
+else:
+    raise AssertionError("encoder options without format did not raise TypeError")
@@ -0,0 +1,52 @@
+from src.PrintingPress import fit, fonts, layout
+from time import time
+
+titles = [
+    "Rap snitches, telling all their business.",
+    "Sit in the court and be their own star witness. " * 6,
+    "Supercalifragilisticexpialidocious",
+]
+
+
+def fits(text: str, size: int, wh: list, variant: str = "Bold") -> bool:
+    font = fonts.get_font(path="tests/Manrope.ttf", size=size, variant=variant)
+    return layout.get_layout(font).fits(text=text, wh=wh) is not None
+
+
+fit.clear_cache()
+
+for text in titles:
+    for wh in ([1200, 300], [400, 400], [150, 60]):
+        stime = time()
+        solved = fit.solve(
+            text=text, path="tests/Manrope.ttf", size=200, variant="Bold", wh=wh
+        )
+        print(solved.size, solved.iterations, time() - stime)
+
+        # The size found must fit, and be no smaller than the previous search's
+        previous = fit.halving(200, lambda size: fits(text, size, wh))
+        assert fits(text, solved.size, wh), (text, wh, solved.size)
+        assert solved.size >= previous, (text, wh, solved.size, previous)
+
+        # Fitting the same text again is a single lookup
+        again = fit.solve(
+            text=text, path="tests/Manrope.ttf", size=200, variant="Bold", wh=wh
+        )
+        assert again.size == solved.size and again.iterations == 0
+
+assert fit.cache_info().hits == fit.cache_info().currsize == 9
+
+# Fitting is not monotonic in size, so bisecting alone finds 87 and 16 here, where
+# the previous search found 93 and 19, past sizes that do not fit
+for text, variant, wh, previous in [
+    ("brown Yacht \u00e9migr\u00e9 lazy", None, [258, 415], 93),
+    ("AVA the quick", "Bold", [38, 58], 19),
+]:
+    solved = fit.solve(
+        text=text, path="tests/Manrope.ttf", size=200, variant=variant, wh=wh
+    )
+    print(solved.size, solved.iterations)
+
+    assert not all(fits(text, size, wh, variant=variant) for size in range(1, previous))
+    assert fits(text, solved.size, wh, variant=variant)
+    assert solved.size >= previous, (text, solved.size)
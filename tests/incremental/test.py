@@ -0,0 +1,69 @@
+from src.PrintingPress import IncrementalRenderer, operate, Placements
+from json import load
+from PIL import Image
+from time import time
+
+thumbnail = Image.open("tests/ii/template-text.png")
+
+with open("tests/ii/placements.json", "r", encoding="utf-8") as pf:
+    places = load(pf)
+
+places["badge"] = {
+    "type": "image",
+    "path": "tests/ii/verycool23ar.png",
+    "xy": [2500, 200],
+    "wh": [300, 300],
+    "rotation": 30,
+    "opacity": 200,
+}
+
+renderer = IncrementalRenderer(thumbnail, places, suppress=True)
+
+
+def expected() -> bytes:
+    return operate(thumbnail, Placements.parse(places), suppress=True).tobytes()
+
+
+assert renderer.image.tobytes() == expected()
+
+# Boxes of rotated areas cover their expanded layers
+left, top, right, bottom = renderer.boxes["badge"]
+assert (left, top) == (2500, 200) and right - left > 300 and bottom - top > 300
+
+updates = [
+    {"title": {"text": "Short Title"}},
+    {"badge": {"xy": [200, 2600], "rotation": 0}},
+    {"badge": {"opacity": 80}, "title": {"font_colour": [255, 0, 0]}},
+    {"badge": {"beneath": True}},
+]
+
+for update in updates:
+    previous = renderer.image.copy()
+
+    stime = time()
+    boxes = renderer.update(update, suppress=True)
+    print(time() - stime)
+
+    for area_name, keys in update.items():
+        places[area_name].update(keys)
+
+    assert renderer.image.tobytes() == expected(), update
+
+    # Pixels outside of the boxes returned are left as they were
+    outside = Image.new("L", thumbnail.size, 255)
+
+    for box in boxes:
+        outside.paste(0, box)
+
+    cleared = Image.new("RGBA", thumbnail.size)
+    assert (
+        Image.composite(previous, cleared, outside).tobytes()
+        == Image.composite(renderer.image, cleared, outside).tobytes()
+    ), update
+
+# Changing the text only composites the title's box
+assert renderer.update({"title": {"text": "Another"}}, suppress=True) == [
+    renderer.boxes["title"]
+]
+
+assert renderer.places["title"]["text"] == "Another"
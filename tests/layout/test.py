@@ -0,0 +1,23 @@
+from src.PrintingPress import fonts, layout
+from time import time
+
+text = (
+    "Rap snitches, telling all their business. Sit in the court and be their own "
+    "star witness. "
+) * 20
+
+font = fonts.get_font(path="tests/Manrope.ttf", size=48, variant="Bold")
+
+stime = time()
+
+lines = layout.rollover(text=text, area_name="layout", font=font, wh=[1200, 10000])
+
+print(time() - stime)
+
+# Lines measured from word metrics must match rasterising each line
+for line in lines:
+    measured = layout.get_layout(font).measure(line)
+    assert measured == font.getmask(" ".join(line)).getbbox(), line
+
+for box in layout.measure(text=text, font=font, wh=[1200, 10000]):
+    assert box.bbox[2] <= 1200, box
@@ -0,0 +1,89 @@
+from src.PrintingPress import assets, fonts, operate, Placements, Template
+from contextlib import redirect_stdout
+from io import StringIO
+from json import load
+from os import path
+from PIL import Image
+from tempfile import TemporaryDirectory
+from time import time
+
+thumbnail = Image.open("tests/ii/template-text.png")
+
+with open("tests/ii/placements.json", "r", encoding="utf-8") as pf:
+    places = load(pf)
+
+places["title"]["font_variant"] = "Invalid"
+
+assets.clear_cache()
+
+stime = time()
+
+# Lazily parsed areas are validated, but nothing is decoded until rendered
+lazy = Placements.parse(places, lazy=True)
+
+print(time() - stime)
+
+assert assets.cache_info().source_misses == 0
+assert isinstance(lazy["viewfinder"].image, assets.LazyImage)
+assert isinstance(lazy["title"].font, fonts.LazyFont)
+
+output = StringIO()
+
+with redirect_stdout(output):
+    rendered = operate(image=thumbnail, placements=lazy, suppress=True)
+
+# Invalid variants are only found, and warned about, when first rendered
+assert "font_variant is invalid" in output.getvalue(), output.getvalue()
+assert lazy["title"].font.variant is None
+assert assets.cache_info().source_misses == 1
+
+with redirect_stdout(StringIO()):
+    eager = Placements.parse(places)
+
+assert rendered.tobytes() == operate(thumbnail, eager, suppress=True).tobytes()
+
+# Templates parse lazily as well, including overridden areas
+template = Template(places, lazy=True)
+
+with redirect_stdout(StringIO()):
+    overridden = template.render(
+        thumbnail, overrides={"title": {"font_size": 200}}, suppress=True
+    )
+
+resolved = template.resolve({"title": {"font_size": 200}})
+assert isinstance(resolved["title"].font, fonts.LazyFont)
+assert overridden.size == thumbnail.size
+
+# Files are still required to exist when parsing lazily
+try:
+    Placements.parse(
+        {
+            "missing": {
+                "type": "image",
+                "path": "tests/missing.png",
+                "xy": [0, 0],
+                "wh": [10, 10],
+            }
+        },
+        lazy=True,
+    )
+except AssertionError:
+    pass
+else:
+    raise AssertionError("missing image parsed")
+
+# Drafted JPEG images are decoded at a reduced scale, no smaller than their wh
+with TemporaryDirectory() as directory:
+    photo = path.join(directory, "photo.jpg")
+    thumbnail.convert("RGB").save(photo)
+
+    draft = {"photo": {"type": "image", "path": photo, "xy": [0, 0], "wh": [600, 600]}}
+    drafted = Placements.parse(draft, lazy=True, draft=True)["photo"].image
+
+    _, decoded = drafted.load()
+    assert 600 <= decoded.width < thumbnail.width, decoded.size
+    assert 600 <= decoded.height < thumbnail.height, decoded.size
+
+    # Without draft, images are decoded at full scale
+    _, full = Placements.parse(draft, lazy=True)["photo"].image.load()
+    assert full.size == thumbnail.size
@@ -0,0 +1,87 @@
+from src.PrintingPress import fonts, layout, placements, printingpress
+from PIL import Image, ImageDraw
+from time import time
+
+font = fonts.get_font(path="tests/Manrope.ttf", size=36, variant="Bold")
+text = "Price Episode Author Price Episode Author gjpqy ÅÉÎ Price"
+
+
+def drawn(area_data) -> Image.Image:
+    # Draws an area's text the way operate did before masks were cached
+    subimage = Image.new(
+        "RGBA",
+        tuple(area_data.wh),
+        tuple(area_data.bg_colour) + tuple([area_data.bg_opacity]),
+    )
+    holder = Image.new("RGBA", tuple(area_data.wh))
+    drawer = ImageDraw.Draw(holder)
+    fill = tuple(area_data.font_colour) + tuple([area_data.font_opacity])
+
+    for box in layout.measure(text=area_data.text, font=font, wh=area_data.wh):
+        drawer.text(box.xy, box.text, fill=fill, font=font)
+
+    return Image.alpha_composite(subimage, holder)
+
+
+# Masks are the lines as drawn
+mask, offset = layout.rasterise(font, "Episode 12")
+expected = Image.new("L", (400, 100))
+ImageDraw.Draw(expected).text((20, 30), "Episode 12", fill=255, font=font)
+
+left, top = 20 + offset[0], 30 + offset[1]
+
+assert offset == font.getbbox("Episode 12")[:2]
+assert expected.crop(
+    (left, top, left + mask.width, top + mask.height)
+).tobytes() == mask.tobytes()
+
+layout.masks.clear()
+stime = time()
+
+# One mask serves every colour and opacity, over any background
+for number, (colour, opacity, bg_colour, bg_opacity) in enumerate(
+    [
+        ([255, 255, 255], 255, [0, 0, 0], 0),
+        ([200, 30, 60], 100, [0, 0, 0], 0),
+        ([200, 30, 60], 255, [10, 200, 90], 77),
+        ([0, 0, 0], 1, [255, 255, 255], 255),
+    ]
+):
+    area_data = placements.Placements.parse_area(
+        area_name="label",
+        area_data={
+            "type": "text",
+            "path": "tests/Manrope.ttf",
+            "text": text,
+            "xy": [0, 0],
+            "wh": [360, 400],
+            "font_size": 36,
+            "font_variant": "Bold",
+            "font_colour": colour,
+            "font_opacity": opacity,
+            "bg_colour": bg_colour,
+            "bg_opacity": bg_opacity,
+        },
+    )
+
+    rendered = printingpress.render_text(area_name="label", area_data=area_data)
+    assert rendered.tobytes() == drawn(area_data).tobytes(), number
+
+    info = layout.masks.info()
+    assert info.misses == info.currsize and info.hits == number * info.currsize
+
+print(time() - stime)
+
+# Overlapping lines are blended as drawing one over another does
+lines = [(mask, (0, 0)), (mask, (mask.width // 2, 4))]
+fill, background = (200, 30, 60, 180), (10, 200, 90, 77)
+
+holder = Image.new("RGBA", (300, 100))
+ImageDraw.Draw(holder).bitmap((0, 0), mask, fill=fill)
+ImageDraw.Draw(holder).bitmap((mask.width // 2, 4), mask, fill=fill)
+expected = Image.alpha_composite(Image.new("RGBA", (300, 100), background), holder)
+
+rendered = printingpress._draw_lines(
+    Image.new("RGBA", (300, 100), background), lines, fill, background
+)
+assert rendered.tobytes() == expected.tobytes()
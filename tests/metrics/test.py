@@ -0,0 +1,52 @@
+from src.PrintingPress import assets, metrics, Template
+from contextlib import redirect_stdout
+from io import StringIO
+from json import load
+from PIL import Image
+
+thumbnail = Image.open("tests/ii/template-text.png")
+
+with open("tests/ii/placements.json", "r", encoding="utf-8") as pf:
+    template = Template(load(pf))
+
+stages = {
+    "text": ["start", "subimage", "draw", "rotate", "mask", "composite", "area"],
+    "image": ["start", "resize", "opacity", "rotate", "composite", "area"],
+}
+
+# Image areas are only resized, filtered and adjusted if their variants are not cached
+assets.clear_cache()
+
+events = []
+output = StringIO()
+
+with redirect_stdout(output):
+    template.render(image=thumbnail, suppress=True, hook=events.append)
+
+# Suppressed renders print nothing, even with a hook
+assert output.getvalue() == "", output.getvalue()
+
+# Every stage of every area is received in order, followed by the render
+for area_name, area_data in template.areas.items():
+    received = [event.stage for event in events if event.area == area_name]
+    expected = list(stages[area_data.type])
+
+    if area_data.type == "text":
+        expected.insert(2, "fit" if area_data.fit else "layout")
+
+    assert received == expected, (area_name, received)
+
+assert events[-1].stage == "render"
+assert events[-1].pixels == thumbnail.width * thumbnail.height
+assert all(event.duration >= 0 for event in events)
+
+aggregator = metrics.Aggregator()
+
+for _ in range(10):
+    template.render(image=thumbnail, suppress=True, hook=aggregator)
+
+for (area_name, stage), summary in aggregator.summary().items():
+    assert summary.count == 10, (area_name, stage)
+    assert summary.p50 <= summary.p90 <= summary.p99 <= summary.max
+
+print(aggregator.summary()[(None, "render")])
@@ -0,0 +1,77 @@
+from src.PrintingPress import multiscale, placements, printingpress
+from src.PrintingPress import Template
+from json import load
+from PIL import Image
+from time import time
+
+thumbnail = Image.open("tests/ii/template-text.png")
+
+with open("tests/ii/placements.json", "r", encoding="utf-8") as pf:
+    places = load(pf)
+
+parsed = placements.Placements.parse(places)
+full = printingpress.operate(image=thumbnail, placements=parsed, suppress=True)
+
+stime = time()
+renders = multiscale.render_scales(
+    image=thumbnail, placements=parsed, scales=[0.25, 1, 0.1], suppress=True
+)
+print(time() - stime)
+
+# Scale 1 is operate's render, and the rest are scaled in the order given
+assert renders[1].tobytes() == full.tobytes()
+assert [render.size for render in renders] == [(750, 1000), (3000, 4001), (300, 400)]
+
+# Text is laid out (and fitted) at each scale as if its placement had been scaled,
+# rendering as operate does with placements scaled by hand
+texts = {
+    "title": places["title"],
+    "caption": dict(places["title"], text="Caption", fit=False),
+}
+
+for scale in [0.25, 0.1]:
+    scaled = {
+        area_name: dict(
+            area_data,
+            xy=[round(side * scale) for side in area_data["xy"]],
+            wh=[round(side * scale) for side in area_data["wh"]],
+            font_size=round(area_data["font_size"] * scale),
+        )
+        for area_name, area_data in texts.items()
+    }
+    base = thumbnail.resize(
+        (round(3000 * scale), round(4001 * scale)), Image.BICUBIC, reducing_gap=2.0
+    )
+    expected = printingpress.operate(
+        image=base, placements=placements.Placements.parse(scaled), suppress=True
+    )
+
+    rendered, = multiscale.render_scales(
+        image=thumbnail, placements=texts, scales=[scale], suppress=True
+    )
+    assert rendered.tobytes() == expected.tobytes(), scale
+
+# Unparsed placements are parsed once, before any scale is timed, and text is
+# fitted at each
+events = []
+multiscale.render_scales(
+    image=thumbnail,
+    placements=places,
+    scales=[1, 0.5],
+    suppress=True,
+    hook=events.append,
+)
+stages = [event.stage for event in events]
+assert stages.count("render") == 2 and stages.count("fit") == 2
+
+# Image areas are reduced by whole factors before they are resized
+assert multiscale.scale_area(parsed["viewfinder"], 0.1).wh == [280, 210]
+assert multiscale.scale_area(parsed["viewfinder"], 0.1).image.size == (667, 1000)
+
+# Placements resolved by templates are rendered as they are, .meta and all
+template = Template({".meta": {"version": 1}, **places})
+resolved = template.resolve({"title": {"text": "Meta"}})
+half, = multiscale.render_scales(
+    image=thumbnail, placements=resolved, scales=[0.5], suppress=True
+)
+assert half.size == (1500, 2000)
@@ -0,0 +1,97 @@
+from src.PrintingPress import assets, operate, Placements, renders, Template
+from src.PrintingPress.encoding import encode
+from json import load
+from os import listdir, path
+from PIL import Image
+from shutil import copyfile
+from tempfile import TemporaryDirectory
+from time import time
+
+with open("tests/ii/placements.json", "r", encoding="utf-8") as pf:
+    places = load(pf)
+
+base = "tests/ii/template-text.png"
+
+with TemporaryDirectory() as directory, TemporaryDirectory() as images:
+    cache = renders.RenderCache(directory=directory)
+
+    stime = time()
+    rendered = cache.render(base, places, suppress=True)
+    print(time() - stime)
+
+    expected = encode(
+        operate(Image.open(base), Placements.parse(places), suppress=True)
+    )
+    assert rendered == expected
+
+    assert cache.render(base, places, suppress=True) == rendered
+    assert cache.info().memory_hits == 1 and cache.info().misses == 1
+
+    # Renders on disk are found by other caches, without loading anything
+    assets.clear_cache()
+    other = renders.RenderCache(directory=directory)
+
+    stime = time()
+    assert other.render(base, places, suppress=True) == rendered
+    print(time() - stime)
+
+    assert other.info().disk_hits == 1
+    assert assets.cache_info().source_misses == 0
+
+    # Keys change with anything rendered, and not with defaults filled in
+    key = renders.render_key(base, Placements.parse(places, lazy=True))
+    changed = [
+        {**places, "title": {**places["title"], "text": "Another Title"}},
+        {**places, "title": {**places["title"], "xy": [101, 2300]}},
+        {**places, "title": {**places["title"], "font_variant": "Regular"}},
+    ]
+
+    for changed_places in changed:
+        assert renders.render_key(
+            base, Placements.parse(changed_places, lazy=True)
+        ) != key
+
+    defaulted = {**places, "title": {**places["title"], "rotation": 0}}
+    assert renders.render_key(base, Placements.parse(defaulted, lazy=True)) == key
+
+    assert (
+        renders.render_key(base, Placements.parse(places, lazy=True), format="JPEG")
+        != key
+    )
+
+    # Images are keyed by content rather than path
+    copied = path.join(images, "copied.png")
+    copyfile(places["viewfinder"]["path"], copied)
+
+    moved = {**places, "viewfinder": {**places["viewfinder"], "path": copied}}
+    assert renders.render_key(base, Placements.parse(moved, lazy=True)) == key
+
+    Image.new("RGB", (4, 4)).save(copied)
+    assert renders.render_key(base, Placements.parse(moved, lazy=True)) != key
+
+    # Both tiers keep to their budgets, without leaving partial files behind
+    small = renders.RenderCache(
+        maxbytes=len(rendered), directory=directory, maxdiskbytes=len(rendered) * 2
+    )
+
+    for title in ["One", "Two", "Three"]:
+        small.render(
+            base, {**places, "title": {**places["title"], "text": title}}, suppress=True
+        )
+
+    info = small.info()
+    assert info.currbytes <= len(rendered) and info.diskbytes <= len(rendered) * 2
+    assert not [name for name in listdir(directory) if name.endswith(".tmp")]
+
+    small.clear()
+    assert listdir(directory) == []
+
+# Placements resolved by templates are rendered as they are, .meta and all
+with TemporaryDirectory() as directory:
+    template = Template({".meta": {"version": 1}, **places})
+    resolved = template.resolve({"title": {"text": "Meta"}})
+    cache = renders.RenderCache(directory=directory)
+
+    assert cache.render(base, resolved, suppress=True) == encode(
+        template.render(Image.open(base), {"title": {"text": "Meta"}}, suppress=True)
+    )
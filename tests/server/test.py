@@ -0,0 +1,116 @@
+from src.PrintingPress import Template, exceptions, metrics, server
+from os import path as os_path
+from PIL import Image
+from tempfile import TemporaryDirectory
+from threading import Event, Thread
+from time import sleep, time
+
+places = {
+    "title": {
+        "type": "text",
+        "text": "Episode 12",
+        "path": "tests/Manrope.ttf",
+        "xy": [20, 20],
+        "wh": [360, 80],
+        "font_size": 40,
+        "font_variant": "Bold",
+    }
+}
+overrides = {"title": {"text": "Episode 13"}}
+
+# Histograms estimate percentiles by bucket, never above the longest duration
+histogram = metrics.Histogram()
+
+for millisecond in range(1, 101):
+    histogram.observe(millisecond / 1000)
+
+summary = histogram.summary()
+assert summary.count == 100 and summary.max == 0.1
+assert 0.05 <= summary.p50 <= 0.05 * 1.19 and summary.p99 == 0.1
+assert sum(count for _, count in histogram.buckets()) == 100
+
+with TemporaryDirectory() as directory:
+    image_path = os_path.join(directory, "base.png")
+    socket_path = os_path.join(directory, "server.sock")
+    Image.new("RGBA", (400, 300), (20, 60, 120, 255)).save(image_path)
+
+    service = server.RenderService(workers=1)
+    httpd = server.make_server(service, socket_path)
+    Thread(target=httpd.serve_forever, daemon=True).start()
+
+    client = server.RenderClient(socket_path)
+    client.register("episode", places, image_path)
+    assert client.templates() == ["episode"]
+
+    # Renders are what rendering the template in-process encodes
+    stime = time()
+    rendered = client.render("episode", overrides)
+    print(time() - stime)
+
+    expected = Template(places).render(
+        Image.open(image_path), overrides, suppress=True, format="PNG"
+    )
+    assert rendered == expected
+
+    # Identical requests in flight are rendered once. The only worker is held, so
+    # the first request's render is queued while the others arrive.
+    gate = Event()
+    service._executor.submit(gate.wait)
+    results = []
+
+    def request() -> None:
+        try:
+            results.append(client.render("episode", {"title": {"text": "Same"}}))
+        finally:
+            client.close()  # This thread's connection
+
+    before = client.metrics()["counts"]
+    threads = [Thread(target=request) for _ in range(4)]
+
+    for thread in threads:
+        thread.start()
+
+    while client.metrics()["counts"]["requests"] < before["requests"] + 4:
+        sleep(0.01)
+
+    assert client.metrics()["queue_depth"] == 1
+    gate.set()
+
+    for thread in threads:
+        thread.join()
+
+    after = client.metrics()
+    assert after["counts"]["renders"] == before["renders"] + 1
+    assert after["counts"]["coalesced"] == before["coalesced"] + 3
+    assert len(set(results)) == 1 and after["queue_depth"] == 0
+
+    # Latencies and cache statistics are reported
+    assert after["latency"]["request"]["count"] == after["counts"]["requests"]
+    assert after["latency"]["render"]["count"] == after["counts"]["renders"]
+    assert set(after["caches"]) == {"fonts", "assets", "fits", "masks"}
+
+    # Errors are answered with their status, and leave the server serving
+    for name, request_overrides, params, status in [
+        ("missing", None, {}, 404),
+        ("episode", {"subtitle": {"text": "Nope"}}, {}, 400),
+        ("episode", overrides, {"suppress": False}, 400),
+        ("episode", overrides, {"compositor": "numpy", "file": "out.png"}, 400),
+    ]:
+        try:
+            client.render(name, request_overrides, **params)
+        except exceptions.ServerError as e:
+            assert e.status == status
+        else:
+            raise AssertionError(f"rendering {name} did not fail")
+
+    assert client.render("episode", overrides) == expected
+
+    client.unregister("episode")
+    assert client.templates() == []
+
+    client.close()
+    httpd.shutdown()
+    httpd.server_close()
+    service.close()
+
+    assert not os_path.exists(socket_path)
@@ -0,0 +1,57 @@
+from src.PrintingPress import printingpress, placements, template
+from json import load
+from PIL import Image, ImageChops
+from time import time
+
+thumbnail = Image.open("tests/ii/template-text.png")
+
+with open("tests/ii/placements.json", "r", encoding="utf-8") as pf:
+    places = load(pf)
+
+places[".meta"] = {"name": "ii"}
+untouched = repr(places)
+
+compiled = template.Template(places)
+assert repr(places) == untouched, "Template modified the placements passed in"
+
+titles = ["Short Title", "A Somewhat Longer Title For The Catalogue Entry"]
+
+stime = time()
+
+for title in titles:
+    output = compiled.render(
+        image=thumbnail, overrides={"title": {"text": title}}, suppress=True
+    )
+
+    # Renders must match parsing and operating with the override applied
+    overridden = placements.Placements.parse(
+        {**places, "title": {**places["title"], "text": title}}
+    )
+    expected = printingpress.operate(
+        image=thumbnail, placements=overridden, suppress=True
+    )
+
+    assert output.tobytes() == expected.tobytes(), title
+
+# Areas not overridden are not parsed again
+assert compiled.resolve({"title": {"text": "x"}})["viewfinder"] is compiled.areas[
+    "viewfinder"
+]
+
+# Static areas are flattened once, and renders only differ from operate by rounding
+flattened = template.Template(places, flatten=True, variable=["title"])
+
+for title in titles:
+    output = flattened.render(
+        image=thumbnail, overrides={"title": {"text": title}}, suppress=True
+    )
+    expected = compiled.render(
+        image=thumbnail, overrides={"title": {"text": title}}, suppress=True
+    )
+
+    extrema = ImageChops.difference(output, expected).getextrema()
+    assert max(band[1] for band in extrema) <= 1, title
+
+assert repr(places) == untouched, "Template modified the placements passed in"
+
+print(time() - stime)
@@ -0,0 +1,89 @@
+from src.PrintingPress import batch, printingpress, template
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from PIL import Image
+from time import time
+
+base = Image.new(mode="RGBA", size=(800, 600), color=(32, 32, 32, 255))
+
+compiled = template.Template(
+    {
+        "background": {
+            "type": "image",
+            "path": "tests/ii/verycool23ar.png",
+            "xy": [0, 0],
+            "wh": [800, 600],
+            "filter": "gaussian_blur",
+            "filter_data": [4],
+            "beneath": True,
+        },
+        "title": {
+            "type": "text",
+            "path": "tests/Manrope.ttf",
+            "text": "placeholder",
+            "xy": [40, 40],
+            "wh": [720, 300],
+            "font_size": 120,
+            "font_variant": "Bold",
+            "fit": True,
+        },
+        "caption": {
+            "type": "text",
+            "path": "tests/Manrope.ttf",
+            "text": "placeholder",
+            "xy": [40, 380],
+            "wh": [500, 160],
+            "font_size": 28,
+            "rotation": 8,
+            "bg_colour": [0, 0, 0],
+            "bg_opacity": 128,
+        },
+    }
+)
+
+jobs = [
+    {
+        "title": {"text": f"Entry number {number} " * (number % 4 + 1)},
+        "caption": {"text": "a caption that rolls over several lines " * (number % 3)},
+    }
+    for number in range(24)
+]
+
+expected = [
+    compiled.render(image=base, overrides=overrides, suppress=True).tobytes()
+    for overrides in jobs
+]
+
+stime = time()
+
+# Many threads operating on the same parsed placements at once
+with ThreadPoolExecutor(max_workers=8) as executor:
+    outputs = list(
+        executor.map(
+            lambda overrides: printingpress.operate(
+                image=base, placements=compiled.resolve(overrides), suppress=True
+            ).tobytes(),
+            jobs,
+        )
+    )
+
+assert outputs == expected, "Threaded operate differs from serial rendering"
+
+# The thread backend of render_batch
+outputs = list(
+    batch.render_batch(
+        template=compiled,
+        jobs=jobs,
+        image=base,
+        workers=8,
+        chunksize=3,
+        backend="thread",
+        format="PNG",
+    )
+)
+
+# Renders are opaque, so they are encoded without alpha
+decoded = [Image.open(BytesIO(output)).convert("RGBA") for output in outputs]
+assert [image.tobytes() for image in decoded] == expected
+
+print(time() - stime)
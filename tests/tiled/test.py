@@ -0,0 +1,54 @@
+from src.PrintingPress import operate, Placements, tiled
+from json import load
+from os import path
+from PIL import Image
+from tempfile import TemporaryDirectory
+from time import time
+
+thumbnail = Image.open("tests/ii/template-text.png")
+
+with open("tests/ii/placements.json", "r", encoding="utf-8") as pf:
+    places = load(pf)
+
+places["badge"] = {
+    "type": "image",
+    "path": "tests/ii/verycool23ar.png",
+    "xy": [2500, -100],
+    "wh": [600, 600],
+    "rotation": 30,
+    "opacity": 160,
+    "beneath": True,
+}
+
+parsed = Placements.parse(places)
+expected = operate(image=thumbnail, placements=parsed, suppress=True).tobytes()
+
+for tile_size in [256, 700, 4096]:
+    output = Image.new("RGBA", thumbnail.size)
+
+    stime = time()
+
+    for box, tile in tiled.render_tiles(
+        thumbnail, parsed, tile_size=tile_size, suppress=True
+    ):
+        assert tile.size == (box[2] - box[0], box[3] - box[1])
+        assert max(tile.size) <= tile_size
+
+        output.paste(tile, box[:2])
+
+    print(time() - stime)
+
+    assert output.tobytes() == expected, tile_size
+
+with TemporaryDirectory() as directory:
+    raw = path.join(directory, "output.raw")
+    size = tiled.write_raw(thumbnail, parsed, raw, tile_size=512, suppress=True)
+
+    with open(raw, "rb") as rf:
+        assert size == thumbnail.size and rf.read() == expected
+
+    png = path.join(directory, "output.png")
+    tiled.write_png(thumbnail, parsed, png, tile_size=512, suppress=True)
+
+    with Image.open(png) as output:
+        assert output.mode == "RGBA" and output.tobytes() == expected
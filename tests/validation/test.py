@@ -0,0 +1,75 @@
+from src.PrintingPress import exceptions, Placements
+from json import load
+from subprocess import PIPE, run
+from sys import executable
+from time import time
+
+with open("tests/ii/placements.json", "r", encoding="utf-8") as pf:
+    places = load(pf)
+
+invalid = dict(places)
+invalid["title"] = dict(places["title"], font_colour=[255, 0, 300], xy=[1])
+del invalid["title"]["text"]
+invalid["viewfinder"] = dict(
+    places["viewfinder"], filter="gaussian_blur", filter_data=["2"], opacity="full"
+)
+invalid["missing"] = dict(places["viewfinder"], path="tests/ii/missing.png")
+invalid["untyped"] = {"xy": [0, 0]}
+invalid["unknown"] = dict(places["viewfinder"], type="video")
+invalid["listed"] = ["image"]
+
+stime = time()
+
+try:
+    Placements.parse(invalid)
+except exceptions.PlacementsError as e:
+    problems = e.problems
+else:
+    raise AssertionError("Invalid placements parsed")
+
+print(time() - stime)
+
+# Every problem in every area is reported, not only the first
+found = {(problem.area, problem.key) for problem in problems}
+expected = {
+    ("title", "font_colour"),
+    ("title", "xy"),
+    ("title", "text"),
+    ("viewfinder", "filter_data"),
+    ("viewfinder", "opacity"),
+    ("missing", "path"),
+    ("untyped", "type"),
+    ("unknown", "type"),
+    ("listed", None),
+}
+assert found == expected, found
+
+# Handlers written for the errors raised before are still caught
+for error in [KeyError, TypeError, AssertionError]:
+    try:
+        Placements.parse_area("untyped", invalid["untyped"])
+    except error:
+        pass
+    else:
+        raise AssertionError(f"invalid area did not raise {error.__name__}")
+
+assert Placements.parse(places).keys() == places.keys()
+
+# Validation does not rely on assert, so still raises under python -O
+optimised = run(
+    [
+        executable,
+        "-O",
+        "-c",
+        "from src.PrintingPress import exceptions, Placements\n"
+        "try:\n"
+        "    Placements.parse({'area': {'type': 'text'}})\n"
+        "except exceptions.PlacementsError:\n"
+        "    print('raised')\n",
+    ],
+    stdout=PIPE,
+    stderr=PIPE,
+    universal_newlines=True,
+)
+
+assert optimised.stdout.strip() == "raised", optimised.stderr